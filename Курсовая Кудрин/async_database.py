@@ -0,0 +1,88 @@
+"""
+Модуль асинхронного доступа к базе данных VR-оборудования для кода на asyncio
+"""
+import asyncio
+import functools
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+
+from database import Database
+
+
+class AsyncDatabase:
+    """Асинхронная обертка над Database.
+
+    Предоставляет awaitable-версии всех публичных методов Database
+    (add_booking, get_available_equipment, get_all_bookings и т.д.) с теми же
+    аргументами и результатами. Методы записи (отмеченные декоратором _writer)
+    выполняются последовательно в отдельном потоке со своим соединением, методы
+    чтения - в ограниченном пуле потоков. Генераторы (iter_all_*) становятся
+    асинхронными генераторами.
+
+    Назначение обертки - не блокировать цикл событий asyncio запросами к базе.
+    Пропускную способность она не увеличивает: большая часть работы методов
+    выполняется на Python под GIL, и с учетом передачи вызовов между потоками
+    операции выполняются не быстрее последовательных вызовов Database
+    (см. замер benchmark.py async).
+    """
+
+    def __init__(self, db_name="vr_equipment.db", max_readers=4, max_pending=256, profile=None, db=None):
+        """
+        max_readers - число потоков чтения, max_pending - максимальное число
+        одновременно ожидающих выполнения операций; db - уже открытая база в режиме пула
+        """
+        self.db = db or Database(db_name, pooled=True, profile=profile)
+        if not self.db.pooled:
+            raise ValueError("AsyncDatabase требует базу данных в режиме пула соединений (pooled=True)")
+
+        self._readers = ThreadPoolExecutor(max_workers=max_readers, thread_name_prefix="vr-db-reader")
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vr-db-writer")
+        self._pending = asyncio.Semaphore(max_pending)
+
+    def _executor_for(self, name):
+        """Выбирает исполнителя для метода: поток записи или пул чтения"""
+        return self._writer if getattr(getattr(type(self.db), name, None), "writes_data", False) else self._readers
+
+    async def _run(self, executor, function, *args, **kwargs):
+        """Выполняет блокирующий вызов в исполнителе, ограничивая число ожидающих операций"""
+        async with self._pending:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(executor, functools.partial(function, *args, **kwargs))
+
+    def __getattr__(self, name):
+        attribute = getattr(self.db, name)
+        if name.startswith("_") or not callable(attribute):
+            return attribute
+
+        executor = self._executor_for(name)
+
+        if inspect.isgeneratorfunction(getattr(type(self.db), name, None)):
+            async def iterate(*args, **kwargs):
+                generator = attribute(*args, **kwargs)
+                finished = object()
+                while True:
+                    chunk = await self._run(executor, next, generator, finished)
+                    if chunk is finished:
+                        return
+                    yield chunk
+            return iterate
+
+        async def method(*args, **kwargs):
+            return await self._run(executor, attribute, *args, **kwargs)
+
+        method.__name__ = name
+        method.__doc__ = attribute.__doc__
+        return method
+
+    async def close(self):
+        """Дожидается завершения операций и закрывает базу данных"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._writer.shutdown)
+        await loop.run_in_executor(None, self._readers.shutdown)
+        self.db.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
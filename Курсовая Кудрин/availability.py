@@ -0,0 +1,184 @@
+"""
+Модуль индекса занятости оборудования для быстрого поиска свободного оборудования
+"""
+import threading
+from bisect import bisect_left
+
+
+class DaySchedule:
+    """Отсортированные интервалы бронирований одного оборудования за один день"""
+
+    __slots__ = ("starts", "ends", "ids", "max_ends")
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+        self.ids = []
+        # Префиксный максимум окончаний: корректен даже для пересекающихся старых записей
+        self.max_ends = []
+
+    def add(self, booking_id, start_minute, end_minute):
+        """Добавляет интервал с сохранением сортировки по началу"""
+        position = bisect_left(self.starts, start_minute)
+        self.starts.insert(position, start_minute)
+        self.ends.insert(position, end_minute)
+        self.ids.insert(position, booking_id)
+        self._rebuild_max_ends(position)
+
+    def remove(self, booking_id):
+        """Удаляет интервал бронирования"""
+        position = self.ids.index(booking_id)
+        del self.starts[position]
+        del self.ends[position]
+        del self.ids[position]
+        del self.max_ends[position]
+        self._rebuild_max_ends(position)
+
+    def _rebuild_max_ends(self, position):
+        """Пересчитывает префиксный максимум, начиная с указанной позиции"""
+        del self.max_ends[position:]
+        current = self.max_ends[-1] if self.max_ends else -1
+        for end_minute in self.ends[position:]:
+            current = max(current, end_minute)
+            self.max_ends.append(current)
+
+    def is_free(self, start_minute, end_minute, exclude_id=None):
+        """Проверяет, свободен ли интервал [начало, конец) за O(log n)"""
+        position = bisect_left(self.starts, end_minute)
+        if position == 0 or self.max_ends[position - 1] <= start_minute:
+            return True
+        if exclude_id is None or exclude_id not in self.ids:
+            return False
+        # Редкий случай редактирования: проверяем пересечения без исключаемой записи
+        return all(
+            booking_id == exclude_id or self.ends[i] <= start_minute
+            for i, booking_id in enumerate(self.ids[:position])
+        )
+
+
+class DaySnapshot:
+    """Неизменяемый снимок занятости доступного оборудования за один день.
+
+    Свободное оборудование для любого интервала этого дня вычисляется в памяти,
+    без обращения к базе данных; последующие изменения базы в снимке не
+    отражаются, поэтому при сохранении бронирование проверяется в базе заново.
+    """
+
+    __slots__ = ("iso_date", "equipment", "_schedules")
+
+    def __init__(self, iso_date, equipment, intervals):
+        """
+        equipment - строки доступного оборудования (id, name, model, serial_number, status),
+        intervals - строки бронирований дня (id, equipment_id, start_minute, end_minute)
+        """
+        self.iso_date = iso_date
+        self.equipment = equipment
+        self._schedules = {}
+        for booking_id, equipment_id, start_minute, end_minute in sorted(intervals, key=lambda row: row[2]):
+            self._schedules.setdefault(equipment_id, DaySchedule()).add(booking_id, start_minute, end_minute)
+
+    def get_available(self, start_minute, end_minute, exclude_id=None):
+        """Возвращает доступное оборудование, свободное в указанный интервал"""
+        schedules = self._schedules
+        return [
+            item for item in self.equipment
+            if item[0] not in schedules or schedules[item[0]].is_free(start_minute, end_minute, exclude_id)
+        ]
+
+
+class AvailabilityIndex:
+    """Индекс занятости оборудования по дням.
+
+    Дни загружаются из базы лениво при первом обращении, после чего
+    изменения бронирований применяются к индексу напрямую. Все операции
+    защищены блокировкой, поэтому индекс можно использовать из разных потоков.
+    """
+
+    def __init__(self, load_day, load_equipment):
+        """
+        load_day(дата ISO) возвращает строки (id, equipment_id, start_minute, end_minute),
+        load_equipment() - строки доступного оборудования (id, name, model, serial_number, status)
+        """
+        self._load_day = load_day
+        self._load_equipment = load_equipment
+        self._days = {}
+        self._booking_days = {}
+        self._equipment = None
+        self._lock = threading.RLock()
+
+    @property
+    def lock(self):
+        """Блокировка индекса. Метод записи удерживает ее от фиксации транзакции до
+        обновления индекса: иначе другой поток может в этот промежуток загрузить день
+        уже с новой строкой, и запись добавит ее интервал в индекс второй раз."""
+        return self._lock
+
+    def _get_day(self, iso_date):
+        """Возвращает расписание дня, загружая его из базы при необходимости"""
+        day = self._days.get(iso_date)
+        if day is None:
+            day = {}
+            for booking_id, equipment_id, start_minute, end_minute in self._load_day(iso_date):
+                day.setdefault(equipment_id, DaySchedule()).add(booking_id, start_minute, end_minute)
+                self._booking_days[booking_id] = (iso_date, equipment_id)
+            self._days[iso_date] = day
+        return day
+
+    def get_available(self, iso_date, start_minute, end_minute, exclude_id=None):
+        """Возвращает доступное оборудование, свободное в указанный интервал"""
+        with self._lock:
+            if self._equipment is None:
+                self._equipment = list(self._load_equipment())
+
+            day = self._get_day(iso_date)
+            return [
+                item for item in self._equipment
+                if item[0] not in day or day[item[0]].is_free(start_minute, end_minute, exclude_id)
+            ]
+
+    def snapshot(self, iso_date):
+        """Возвращает снимок занятости за день (DaySnapshot)"""
+        with self._lock:
+            if self._equipment is None:
+                self._equipment = list(self._load_equipment())
+
+            intervals = [
+                (booking_id, equipment_id, start_minute, end_minute)
+                for equipment_id, schedule in self._get_day(iso_date).items()
+                for booking_id, start_minute, end_minute in zip(schedule.ids, schedule.starts, schedule.ends)
+            ]
+            return DaySnapshot(iso_date, list(self._equipment), intervals)
+
+    def is_free(self, equipment_id, iso_date, start_minute, end_minute, exclude_id=None):
+        """Проверяет, свободно ли оборудование в указанный интервал"""
+        with self._lock:
+            schedule = self._get_day(iso_date).get(equipment_id)
+            return schedule is None or schedule.is_free(start_minute, end_minute, exclude_id)
+
+    def add_booking(self, booking_id, equipment_id, iso_date, start_minute, end_minute):
+        """Учитывает новое бронирование (если день уже загружен)"""
+        with self._lock:
+            day = self._days.get(iso_date)
+            if day is not None:
+                day.setdefault(equipment_id, DaySchedule()).add(booking_id, start_minute, end_minute)
+                self._booking_days[booking_id] = (iso_date, equipment_id)
+
+    def remove_booking(self, booking_id):
+        """Убирает бронирование из индекса (если его день загружен)"""
+        with self._lock:
+            location = self._booking_days.pop(booking_id, None)
+            if location is not None:
+                iso_date, equipment_id = location
+                self._days[iso_date][equipment_id].remove(booking_id)
+
+    def invalidate_equipment(self):
+        """Сбрасывает кэш списка оборудования"""
+        with self._lock:
+            self._equipment = None
+
+    def invalidate(self):
+        """Полностью сбрасывает индекс (например, после изменений другим процессом)"""
+        with self._lock:
+            self._days.clear()
+            self._booking_days.clear()
+            self._equipment = None
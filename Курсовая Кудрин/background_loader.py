@@ -0,0 +1,111 @@
+"""
+Модуль фоновой загрузки данных для окон интерфейса
+"""
+import queue
+import threading
+
+# Интервал проверки очереди результатов в миллисекундах
+POLL_INTERVAL_MS = 50
+
+
+class BackgroundLoader:
+    """Загрузка данных в рабочем потоке с передачей результатов в главный цикл Tk.
+
+    Функция загрузки produce(cancelled) выполняется в рабочем потоке и является
+    генератором: каждая порция данных передается через очередь, которую главный
+    поток проверяет с помощью after(), и обрабатывается функцией on_chunk уже
+    в главном потоке. Запуск новой загрузки отменяет предыдущую: ее оставшиеся
+    порции не обрабатываются, а сама функция может проверять cancelled.is_set()
+    между запросами, чтобы завершиться раньше.
+    """
+
+    def __init__(self, widget, threaded=True):
+        """
+        widget - виджет, через который планируется проверка очереди;
+        threaded=False выполняет загрузку в главном потоке (для базы без пула соединений)
+        """
+        self.widget = widget
+        self.threaded = threaded
+        self._queue = queue.Queue()
+        self._generation = 0
+        self._cancelled = None
+        self._callbacks = None
+        self._poll_job = None
+
+    @property
+    def busy(self):
+        """Выполняется ли загрузка"""
+        return self._callbacks is not None
+
+    def start(self, produce, on_chunk, on_done=None, on_error=None):
+        """Запускает загрузку, отменяя текущую.
+
+        on_chunk(порция) вызывается для каждой порции, on_done() - после последней,
+        on_error(сообщение) - при ошибке в функции загрузки.
+        """
+        self.cancel()
+        self._generation += 1
+        self._cancelled = threading.Event()
+        self._callbacks = (on_chunk, on_done, on_error)
+
+        if not self.threaded:
+            self._run(self._generation, produce, self._cancelled)
+            self._poll()
+            return
+
+        threading.Thread(
+            target=self._run, args=(self._generation, produce, self._cancelled), daemon=True
+        ).start()
+        if self._poll_job is None:
+            self._poll_job = self.widget.after(POLL_INTERVAL_MS, self._poll)
+
+    def cancel(self):
+        """Отменяет текущую загрузку"""
+        if self._cancelled is not None:
+            self._cancelled.set()
+        self._cancelled = None
+        self._callbacks = None
+
+    def close(self):
+        """Отменяет загрузку и прекращает проверку очереди (перед закрытием окна)"""
+        self.cancel()
+        if self._poll_job is not None:
+            self.widget.after_cancel(self._poll_job)
+            self._poll_job = None
+
+    def _run(self, generation, produce, cancelled):
+        """Выполняет функцию загрузки и складывает порции в очередь (в рабочем потоке)"""
+        try:
+            for chunk in produce(cancelled):
+                if cancelled.is_set():
+                    return
+                self._queue.put((generation, "chunk", chunk))
+            self._queue.put((generation, "done", None))
+        except Exception as e:
+            self._queue.put((generation, "error", str(e)))
+
+    def _poll(self):
+        """Обрабатывает накопившиеся порции текущей загрузки (в главном потоке)"""
+        self._poll_job = None
+        while True:
+            try:
+                generation, kind, payload = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            # Порции отмененных загрузок пропускаются
+            if generation != self._generation or self._callbacks is None:
+                continue
+
+            on_chunk, on_done, on_error = self._callbacks
+            if kind == "chunk":
+                on_chunk(payload)
+                continue
+
+            self._callbacks = None
+            if kind == "done" and on_done:
+                on_done()
+            elif kind == "error" and on_error:
+                on_error(payload)
+
+        if self.busy and self.threaded:
+            self._poll_job = self.widget.after(POLL_INTERVAL_MS, self._poll)
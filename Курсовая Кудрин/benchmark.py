@@ -0,0 +1,267 @@
+"""
+Модуль замеров производительности работы с базой данных VR-оборудования
+
+Запуск: python benchmark.py [название замера ...]
+"""
+import asyncio
+import datetime
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+from async_database import AsyncDatabase
+from database import Database
+from db_profiles import PROFILES
+from instrumentation import StartupTimer
+
+# Рабочие часы, в которые генерируются бронирования (08:00 - 21:00)
+WORK_START_HOUR = 8
+WORK_END_HOUR = 21
+
+
+def _fill_database(db, equipment_count, booking_count, days=30, seed=1):
+    """Заполняет базу оборудованием и непересекающимися часовыми бронированиями"""
+    rng = random.Random(seed)
+    db.add_equipment_many([(f"VR {i:04d}", "Benchmark") for i in range(equipment_count)])
+    _, equipment = db.get_all_equipment()
+    equipment_ids = [row[0] for row in equipment]
+
+    first_day = datetime.date.today()
+    slots_per_day = WORK_END_HOUR - WORK_START_HOUR
+    per_equipment = booking_count // len(equipment_ids)
+
+    bookings = []
+    for equipment_id in equipment_ids:
+        for slot in rng.sample(range(days * slots_per_day), per_equipment):
+            day, hour = divmod(slot, slots_per_day)
+            start_hour = WORK_START_HOUR + hour
+            bookings.append((
+                equipment_id,
+                (first_day + datetime.timedelta(days=day)).isoformat(),
+                f"{start_hour:02d}:00",
+                f"{start_hour + 1:02d}:00",
+                "101"
+            ))
+
+    db.add_bookings_many(bookings)
+    return first_day, days
+
+
+def _measure(function, repeats):
+    """Возвращает среднее время выполнения функции в миллисекундах"""
+    started = time.perf_counter()
+    for _ in range(repeats):
+        function()
+    return (time.perf_counter() - started) * 1000 / repeats
+
+
+def bench_availability(equipment_count=1000, booking_count=100000, queries=200):
+    """Сравнение индекса занятости с SQL-запросом при поиске свободного оборудования"""
+    db = Database(":memory:")
+    first_day, days = _fill_database(db, equipment_count, booking_count)
+
+    rng = random.Random(2)
+    requests = []
+    for _ in range(queries):
+        start_minute = rng.randrange(WORK_START_HOUR * 60, (WORK_END_HOUR - 1) * 60, 15)
+        requests.append((
+            (first_day + datetime.timedelta(days=rng.randrange(days))).isoformat(),
+            start_minute,
+            start_minute + 60
+        ))
+
+    iterator = iter(requests * 3)
+
+    sql_ms = _measure(lambda: db._query_available_equipment(*next(iterator)), queries)
+    cold_ms = _measure(lambda: db.availability.get_available(*next(iterator)), queries)
+    warm_ms = _measure(lambda: db.availability.get_available(*next(iterator)), queries)
+
+    print(f"Поиск свободного оборудования: {equipment_count} единиц, {booking_count} бронирований")
+    print(f"  SQL-запрос:                  {sql_ms:8.3f} мс/запрос")
+    print(f"  индекс (с загрузкой дней):   {cold_ms:8.3f} мс/запрос")
+    print(f"  индекс (дни уже загружены):  {warm_ms:8.3f} мс/запрос")
+    db.close()
+
+
+def _profile_commit_latency(db_path, profile, commits):
+    """Задержка фиксации одиночных бронирований в миллисекундах: (среднее, 95-й перцентиль)"""
+    with Database(db_path, profile=profile) as db:
+        _, equipment_id = db.add_equipment("Benchmark VR", profile)
+        day = datetime.date.today() + datetime.timedelta(days=3650)
+        latencies = []
+        for i in range(commits):
+            booking_day = (day + datetime.timedelta(days=i // 12)).isoformat()
+            start_hour = WORK_START_HOUR + i % 12
+            started = time.perf_counter()
+            db.add_booking(equipment_id, booking_day, f"{start_hour:02d}:00", f"{start_hour + 1:02d}:00", "101")
+            latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+    return sum(latencies) / len(latencies), latencies[int(len(latencies) * 0.95)]
+
+
+def _profile_read_concurrency(db_path, profile, readers, duration):
+    """Количество чтений за время непрерывной записи другим соединением: (чтений, ошибок)"""
+    writer_profile = "interactive" if PROFILES[profile].get("query_only") == "ON" else profile
+    stop = threading.Event()
+    counters = {"reads": 0, "errors": 0}
+    lock = threading.Lock()
+
+    def write_loop():
+        with Database(db_path, profile=writer_profile) as db:
+            _, equipment_id = db.add_equipment("Writer VR", profile)
+            day = datetime.date.today() + datetime.timedelta(days=7300)
+            i = 0
+            while not stop.is_set():
+                booking_day = (day + datetime.timedelta(days=i // 12)).isoformat()
+                start_hour = WORK_START_HOUR + i % 12
+                db.add_booking(equipment_id, booking_day, f"{start_hour:02d}:00", f"{start_hour + 1:02d}:00", "101")
+                i += 1
+
+    def read_loop(db):
+        while not stop.is_set():
+            success, _ = db.get_equipment_bookings(1)
+            with lock:
+                counters["reads" if success else "errors"] += 1
+
+    with Database(db_path, pooled=True, profile=profile) as reader_db:
+        threads = [threading.Thread(target=write_loop)]
+        threads += [threading.Thread(target=read_loop, args=(reader_db,)) for _ in range(readers)]
+        for thread in threads:
+            thread.start()
+        time.sleep(duration)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    return counters["reads"], counters["errors"]
+
+
+def bench_profiles(source_db="vr_equipment.db", commits=200, readers=4, duration=2.0):
+    """Задержка фиксации и параллельное чтение для каждого профиля на копии рабочей базы"""
+    print(f"Профили соединений (копия {source_db}, {commits} фиксаций, {readers} читателя, {duration} с)")
+    for profile in PROFILES:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db_path = os.path.join(temp_dir, "profile.db")
+            if os.path.exists(source_db):
+                shutil.copyfile(source_db, db_path)
+            else:
+                with Database(db_path, profile="bulk-load") as db:
+                    _fill_database(db, 100, 10000)
+
+            if PROFILES[profile].get("query_only") == "ON":
+                commit_info = "только чтение"
+            else:
+                mean_ms, p95_ms = _profile_commit_latency(db_path, profile, commits)
+                commit_info = f"фиксация {mean_ms:7.3f} мс (p95 {p95_ms:7.3f} мс)"
+
+            reads, errors = _profile_read_concurrency(db_path, profile, readers, duration)
+            print(f"  {profile:<13} {commit_info:<42} чтений/с: {reads / duration:9.1f}, ошибок: {errors}")
+
+
+def _client_operations(rng, equipment_count, first_day, days, operations):
+    """Сценарий клиента: три чтения на одну попытку бронирования"""
+    for _ in range(operations // 4):
+        booking_day = (first_day + datetime.timedelta(days=rng.randrange(days))).isoformat()
+        start_hour = rng.randrange(WORK_START_HOUR, WORK_END_HOUR - 1)
+        start_time, end_time = f"{start_hour:02d}:00", f"{start_hour + 1:02d}:00"
+        yield "get_available_equipment", (booking_day, start_time, end_time)
+        yield "get_equipment_bookings", (rng.randrange(1, equipment_count + 1),)
+        yield "get_booking_details", (rng.randrange(1, 1000),)
+        yield "add_booking", (rng.randrange(1, equipment_count + 1), booking_day, start_time, end_time, "101")
+
+
+def bench_async(clients=100, operations=40, equipment_count=100, booking_count=10000):
+    """Пропускная способность AsyncDatabase при одновременной работе множества клиентов
+    в сравнении с последовательными вызовами (AsyncDatabase не должна заметно уступать им:
+    ее задача - не блокировать цикл событий, а не ускорить работу с базой)"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, "async.db")
+        with Database(db_path) as db:
+            first_day, days = _fill_database(db, equipment_count, booking_count)
+
+        # Последовательное выполнение того же объема работы одним соединением
+        with Database(db_path) as db:
+            started = time.perf_counter()
+            for client in range(clients):
+                for name, args in _client_operations(random.Random(client), equipment_count, first_day, days,
+                                                     operations):
+                    getattr(db, name)(*args)
+            sequential = time.perf_counter() - started
+
+        async def client(db, number):
+            for name, args in _client_operations(random.Random(number), equipment_count, first_day, days,
+                                                 operations):
+                await getattr(db, name)(*args)
+
+        async def run_clients():
+            async with AsyncDatabase(db_path) as db:
+                started = time.perf_counter()
+                await asyncio.gather(*(client(db, number) for number in range(clients)))
+                return time.perf_counter() - started
+
+        # Повторяем на свежей копии данных: бронирования первого прогона уже добавлены
+        with Database(db_path) as db:
+            db.conn.execute("DELETE FROM booking WHERE id > ?", (booking_count,))
+            db.conn.commit()
+        concurrent = asyncio.run(run_clients())
+
+    total = clients * (operations // 4) * 4
+    print(f"AsyncDatabase: {clients} клиентов, {total} операций (3 чтения на 1 запись)")
+    print(f"  последовательно (Database): {total / sequential:9.1f} операций/с")
+    print(f"  AsyncDatabase:              {total / concurrent:9.1f} операций/с")
+
+
+def bench_startup(sizes=(10000, 100000, 1000000), equipment_count=1000, timeout=60.0):
+    """Время первой отрисовки и готовности к работе главного окна для баз разного размера"""
+    import tkinter as tk
+    try:
+        from main import VREquipmentApp
+    except ImportError as e:
+        print(f"Запуск приложения: замер недоступен ({e})")
+        return
+
+    print(f"Запуск приложения ({equipment_count} единиц оборудования)")
+    for booking_count in sizes:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db_path = os.path.join(temp_dir, "startup.db")
+            # Бронирования занимают не больше половины часовых интервалов периода
+            days = max(30, 2 * booking_count // equipment_count // (WORK_END_HOUR - WORK_START_HOUR) + 1)
+            with Database(db_path, profile="bulk-load") as db:
+                _fill_database(db, equipment_count, booking_count, days=days)
+
+            startup = StartupTimer()
+            try:
+                app = VREquipmentApp(db_path, startup=startup)
+            except tk.TclError as e:
+                print(f"  замер недоступен: {e}")
+                return
+
+            deadline = time.perf_counter() + timeout
+            while startup.elapsed("interactive") is None and time.perf_counter() < deadline:
+                app.update()
+                time.sleep(0.001)
+            app._on_close()
+
+            interactive_ms = startup.elapsed("interactive")
+            print(
+                f"  {booking_count:>8} бронирований: база открыта {startup.elapsed('database_opened'):8.1f} мс, "
+                f"первая отрисовка {startup.elapsed('first_paint') or 0:8.1f} мс, "
+                + (f"готовность {interactive_ms:8.1f} мс" if interactive_ms else "готовность не достигнута")
+            )
+
+
+BENCHMARKS = {
+    "availability": bench_availability,
+    "profiles": bench_profiles,
+    "async": bench_async,
+    "startup": bench_startup,
+}
+
+
+if __name__ == "__main__":
+    for name in sys.argv[1:] or BENCHMARKS:
+        BENCHMARKS[name]()
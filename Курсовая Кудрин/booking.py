@@ -3,6 +3,19 @@ from tkinter import ttk, messagebox
 from tkcalendar import DateEntry
 import datetime
 
+from background_loader import BackgroundLoader
+from booking_model import BookingColumns, filter_period
+from date_utils import display_to_iso, to_minutes
+from incremental_search import IncrementalSearch, NARROW_MAX_ROWS, SEARCH_DELAY_MS
+from virtual_tree import VirtualTreeview, QuerySource
+
+# Количество бронирований, загружаемых из базы данных за один запрос при прокрутке
+BOOKING_PAGE_SIZE = 200
+
+# Наибольшее число измененных бронирований, которые показываются без перезагрузки списка
+IN_PLACE_MAX_CHANGES = 50
+
+
 class BookingFrame(ttk.Frame):
     """Класс для отображения и управления разделом 'Бронирование'"""
     
@@ -11,6 +24,20 @@ class BookingFrame(ttk.Frame):
         self.parent = parent
         self.db = db
         
+        # Отложенный поиск и результат предыдущего поиска для сужения в памяти
+        self._search_job = None
+        self.incremental_search = IncrementalSearch()
+        
+        # Последний результат поиска в памяти: (запрос, период, BookingColumns)
+        self._search_result = None
+        
+        # Запросы списка выполняются в фоне, если база данных использует пул соединений
+        self.loader = BackgroundLoader(self, threaded=db.pooled)
+        
+        # Изменения данных, сделанные в любом разделе, приходят событиями хранилища
+        # (в строках бронирований показываются и название, и модель оборудования)
+        db.subscribe(self.on_data_changed)
+        
         # Создаем и размещаем элементы интерфейса
         self._create_widgets()
         
@@ -82,7 +109,7 @@ class BookingFrame(ttk.Frame):
         # Поиск
         ttk.Label(filter_frame, text="Поиск:").pack(side=tk.LEFT, padx=5)
         self.search_var = tk.StringVar()
-        self.search_var.trace("w", lambda name, index, mode: self.filter_booking_list())
+        self.search_var.trace("w", lambda name, index, mode: self.schedule_search())
         ttk.Entry(
             filter_frame, 
             textvariable=self.search_var, 
@@ -93,14 +120,15 @@ class BookingFrame(ttk.Frame):
         table_frame = ttk.Frame(self)
         table_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
-        # Создаем Treeview для отображения данных бронирований
+        # Создаем виртуальный список: элементы Treeview создаются только для видимых строк
         columns = ('id', 'equipment', 'model', 'date', 'start_time', 'end_time', 'room', 'booked_by')
-        self.booking_tree = ttk.Treeview(
+        self.booking_view = VirtualTreeview(
             table_frame, 
             columns=columns, 
-            show='headings', 
+            row_tags=self._booking_tags,
             selectmode='browse'
         )
+        self.booking_tree = self.booking_view.tree
         
         # Устанавливаем заголовки столбцов
         self.booking_tree.heading('id', text='ID')
@@ -122,15 +150,13 @@ class BookingFrame(ttk.Frame):
         self.booking_tree.column('room', width=80, anchor='center')
         self.booking_tree.column('booked_by', width=150)
         
+        # Настраиваем тег для прошедших бронирований
+        self.booking_tree.tag_configure('past', foreground='gray')
+        
         # Привязываем двойной клик к открытию окна редактирования
         self.booking_tree.bind('<Double-1>', self.on_booking_double_click)
         
-        # Добавляем полосу прокрутки
-        scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=self.booking_tree.yview)
-        self.booking_tree.configure(yscrollcommand=scrollbar.set)
-        
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        self.booking_tree.pack(fill=tk.BOTH, expand=True)
+        self.booking_view.pack(fill=tk.BOTH, expand=True)
         
         # Добавляем контекстное меню
         self.context_menu = tk.Menu(self.booking_tree, tearoff=0)
@@ -147,100 +173,166 @@ class BookingFrame(ttk.Frame):
         self.status_label = ttk.Label(info_frame, text="Всего бронирований: 0")
         self.status_label.pack(side=tk.LEFT, padx=5)
     
-    def load_booking_data(self):
-        """Загружает данные о бронированиях из базы данных"""
-        # Очищаем таблицу
-        for i in self.booking_tree.get_children():
-            self.booking_tree.delete(i)
-        
-        # Загружаем данные
-        success, data = self.db.get_all_bookings()
+    def load_booking_data(self, narrow=False, keep_position=False):
+        """Загружает бронирования из базы данных с учетом фильтра по дате и строки поиска.
+
+        narrow=True разрешает получить результат сужением предыдущего поиска в памяти
+        (после изменения данных список нужно загружать заново), keep_position=True
+        сохраняет положение прокрутки и выделение.
+        """
+        date_from, date_to = self._date_filter_period()
+        search = self.search_var.get().strip() or None
+
+        if not narrow:
+            self.incremental_search.reset()
+            self._search_result = None
+
+        # Дописанный запрос или более узкий период сужают предыдущий результат без обращения к базе
+        period = (date_from, date_to)
+        data = self.incremental_search.narrow(search, period) if search else None
+        if data is not None:
+            self.loader.cancel()
+            self._show_search_result(search, period, BookingColumns(data, date_index=3), keep_position)
+            return
+        data = self._narrow_period(search, date_from, date_to) if search else None
+        if data is not None:
+            self.loader.cancel()
+            self._show_search_result(search, period, data, keep_position, remember=False)
+            return
+
+        def produce(cancelled):
+            # Фильтр по дате, поиск и сортировка выполняются в базе данных; первая страница
+            # загружается вместе с количеством подходящих строк (при поиске - с текстом
+            # строк и целиком, если результат небольшой)
+            result = self.db.get_bookings(
+                date_from, date_to, search=search,
+                limit=NARROW_MAX_ROWS if search else BOOKING_PAGE_SIZE, with_text=bool(search)
+            )
+            if cancelled.is_set():
+                return
+            _, total = self.db.count_bookings()
+            yield result, total
+
+        def show(chunk):
+            (success, result), total = chunk
+            if not success:
+                show_error(result)
+                return
+
+            first_page, matched = result
+            if search:
+                if matched <= NARROW_MAX_ROWS:
+                    data = self.incremental_search.remember(search, first_page, period)
+                    self._show_search_result(
+                        search, period, BookingColumns(data, date_index=3), keep_position, total=total
+                    )
+                    return
+                first_page = [row[:-1] for row in first_page[:BOOKING_PAGE_SIZE]]
+
+            def fetch(offset, limit):
+                success, result = self.db.get_bookings(
+                    date_from, date_to, search=search, limit=limit, offset=offset, count=False
+                )
+                return (True, result[0]) if success else (False, result)
+
+            self.booking_view.set_source(
+                QuerySource(fetch, matched, page_size=BOOKING_PAGE_SIZE, first_page=first_page), keep_position
+            )
+            self._update_status(matched, total)
+
+        def show_error(message):
+            self.status_label.config(text="Не удалось загрузить бронирования")
+            messagebox.showerror("Ошибка", f"Не удалось загрузить данные: {message}")
+
+        self.status_label.config(text="Загрузка бронирований...")
+        self.loader.start(produce, show, on_error=show_error)
+
+    def _show_search_result(self, search, period, data, keep_position, remember=True, total=None):
+        """Показывает результат поиска, хранящийся в памяти; remember=True запоминает его
+        для сужения при выборе более узкого периода"""
+        if remember:
+            self._search_result = (search, period, data)
+        self.booking_view.set_source(data, keep_position)
+        self._update_status(data.count(), total)
+
+    def _narrow_period(self, search, date_from, date_to):
+        """Строки результата того же поиска за более узкий период или None"""
+        if self._search_result is None:
+            return None
+        previous_search, (previous_from, previous_to), data = self._search_result
+        inside = (
+            previous_search == search
+            and (previous_from is None or (date_from is not None and date_from >= previous_from))
+            and (previous_to is None or (date_to is not None and date_to <= previous_to))
+        )
+        return data.between(date_from, date_to) if inside else None
+
+    def on_data_changed(self, event):
+        """Показывает изменения данных (событие хранилища данных): измененные и удаленные
+        бронирования обновляются на месте, список загружается заново, только если это невозможно"""
+        if event.table == "equipment":
+            if event.updated or event.removed or event.reload:
+                self.load_booking_data(keep_position=True)
+            return
         
-        if success:
-            # Заполняем таблицу данными
-            self._fill_booking_tree(data)
+        self.incremental_search.reset()
+        self._search_result = None
+        in_place = (
+            not (event.reload or event.added or self.loader.busy)
+            and len(event.updated) + len(event.removed) <= IN_PLACE_MAX_CHANGES
+            and all(self.booking_view.remove_row(booking_id) for booking_id in event.removed)
+            and all(self.refresh_booking(booking_id) for booking_id in event.updated)
+        )
+        if in_place:
+            self._update_status(self.booking_view.count())
         else:
-            messagebox.showerror("Ошибка", f"Не удалось загрузить данные: {data}")
-    
-    def _fill_booking_tree(self, data):
-        """Заполняет дерево бронирований данными с учетом фильтров"""
-        # Очищаем таблицу
-        for i in self.booking_tree.get_children():
-            self.booking_tree.delete(i)
-        
-        # Получаем текущую дату для сравнения
-        today = datetime.datetime.now().date()
-        
-        # Применяем фильтр по дате
-        filtered_data = []
+            self.load_booking_data(keep_position=True)
+
+    def refresh_booking(self, booking_id):
+        """Заменяет строку измененного бронирования на месте; возвращает False, если
+        для этого список нужно загрузить заново"""
+        success, details = self.db.get_booking_details(booking_id)
+        if not (success and details) or self.search_var.get().strip():
+            return False
+        row = (details[0], details[9], details[10], details[2], details[3], details[4], details[5], details[7])
+        date_from, date_to = self._date_filter_period()
+        iso_date = display_to_iso(row[3])
+        in_period = (
+            (date_from is None or iso_date >= date_from.isoformat())
+            and (date_to is None or iso_date <= date_to.isoformat())
+        )
+        # Строку можно заменить на месте, если она осталась в списке и не сменила позицию
+        return in_period and self.booking_view.update_row(row, sort_key=lambda booking: booking[3:5])
+
+    def _update_status(self, matched, total=None):
+        """Обновляет информацию о количестве бронирований"""
+        if total is None:
+            _, total = self.db.count_bookings()
+        self.status_label.config(text=f"Показано бронирований: {matched} из {total}")
+
+    def _date_filter_period(self):
+        """Возвращает границы периода (с, по) для выбранного фильтра по дате"""
         date_filter = self.date_filter_var.get()
-        
-        for booking in data:
-            booking_id, equipment_name, equipment_model, booking_date, start_time, end_time, room, booked_by = booking
-            
-            # Преобразуем строку даты в объект datetime
-            try:
-                booking_date_parts = booking_date.split('.')
-                if len(booking_date_parts) == 3:
-                    day, month, year = map(int, booking_date_parts)
-                    booking_date_obj = datetime.date(year, month, day)
-                elif booking_date.count('-') == 2:
-                    year, month, day = map(int, booking_date.split('-'))
-                    booking_date_obj = datetime.date(year, month, day)
-                else:
-                    booking_date_obj = today  # Если не удалось распознать формат
-            except Exception:
-                booking_date_obj = today  # Если возникла ошибка при преобразовании даты
-            
-            # Применяем фильтр
-            include_booking = True
-            
-            if date_filter == "Сегодня":
-                include_booking = booking_date_obj == today
-            elif date_filter == "Будущие":
-                include_booking = booking_date_obj >= today
-            elif date_filter == "Прошедшие":
-                include_booking = booking_date_obj < today
-            elif date_filter == "Выбрать...":
-                selected_date = self.calendar.get_date()
-                include_booking = booking_date_obj == selected_date
-            
-            # Применяем поиск
-            search_text = self.search_var.get().lower()
-            if search_text:
-                search_matched = False
-                for value in booking:
-                    if search_text in str(value).lower():
-                        search_matched = True
-                        break
-                include_booking = include_booking and search_matched
-            
-            if include_booking:
-                filtered_data.append(booking)
-                
-                # Определяем, прошло ли бронирование
-                is_past = booking_date_obj < today
-                
-                # Добавляем строку с тегом, если бронирование прошло
-                item = self.booking_tree.insert('', 'end', values=booking)
-                if is_past:
-                    self.booking_tree.item(item, tags=('past',))
-        
-        # Настраиваем тег для прошедших бронирований
-        self.booking_tree.tag_configure('past', foreground='gray')
-        
-        # Обновляем информацию о количестве
-        self.status_label.config(text=f"Показано бронирований: {len(filtered_data)} из {len(data)}")
+        selected_date = self.calendar.get_date() if date_filter == "Выбрать..." else None
+        return filter_period(date_filter, selected_date)
+
+    @staticmethod
+    def _booking_tags(booking):
+        """Теги строки бронирования: прошедшие бронирования выделяются цветом"""
+        return ('past',) if display_to_iso(booking[3]) < datetime.date.today().isoformat() else ()
     
+    def schedule_search(self):
+        """Откладывает поиск до паузы в наборе текста"""
+        if self._search_job is not None:
+            self.after_cancel(self._search_job)
+        self._search_job = self.after(SEARCH_DELAY_MS, self.filter_booking_list)
+
     def filter_booking_list(self):
         """Фильтрует список бронирований по введенному тексту и выбранной дате"""
-        # Загружаем данные и применяем фильтры
-        success, data = self.db.get_all_bookings()
-        
-        if success:
-            self._fill_booking_tree(data)
-        else:
-            messagebox.showerror("Ошибка", f"Не удалось загрузить данные: {data}")
+        if self._search_job is not None:
+            self.after_cancel(self._search_job)
+            self._search_job = None
+        self.load_booking_data(narrow=True)
     
     def on_date_filter_change(self, event):
         """Обработчик изменения фильтра по дате"""
@@ -257,6 +349,13 @@ class BookingFrame(ttk.Frame):
         """Применяет фильтр по выбранной в календаре дате"""
         self.filter_booking_list()
     
+    def show_date(self, date):
+        """Показывает бронирования за указанную дату (фильтр "Выбрать...")"""
+        self.date_filter_var.set("Выбрать...")
+        self.calendar.set_date(date)
+        self.calendar_frame.pack(side=tk.LEFT, padx=5)
+        self.filter_booking_list()
+    
     def open_add_booking_window(self):
         """Открывает окно для добавления нового бронирования"""
         booking_window = BookingWindow(self, self.db)
@@ -306,7 +405,6 @@ class BookingFrame(ttk.Frame):
             
             if success:
                 messagebox.showinfo("Успех", "Бронирование успешно удалено")
-                self.load_booking_data()  # Перезагружаем данные
             else:
                 messagebox.showerror("Ошибка", f"Не удалось удалить бронирование: {error_message}")
     
@@ -331,6 +429,11 @@ class BookingWindow(tk.Toplevel):
         self.db = db
         self.booking_data = booking_data
         
+        # Снимки занятости по дням (ISO): список оборудования при смене времени
+        # вычисляется в памяти, соседние дни загружаются заранее во время простоя
+        self._snapshots = {}
+        self._prefetch_job = None
+        
         # Настраиваем окно
         self.title("Бронирование оборудования" if not booking_data else "Редактирование бронирования")
         self.geometry("550x550")
@@ -394,7 +497,7 @@ class BookingWindow(tk.Toplevel):
         ttk.Button(
             time_frame_start, 
             text="Обновить список", 
-            command=self.refresh_available_equipment
+            command=self.reload_available_equipment
         ).pack(side=tk.LEFT, padx=10)
         
         # Время окончания
@@ -423,6 +526,11 @@ class BookingWindow(tk.Toplevel):
             state="readonly"
         ).pack(side=tk.LEFT)
         
+        # Список оборудования пересчитывается сразу при выборе времени
+        for combobox in (*time_frame_start.winfo_children(), *time_frame_end.winfo_children()):
+            if isinstance(combobox, ttk.Combobox):
+                combobox.bind("<<ComboboxSelected>>", self.refresh_available_equipment)
+        
         # Оборудование
         ttk.Label(form_frame, text="Оборудование*:").grid(row=4, column=0, sticky=tk.W, pady=5, padx=5)
         
@@ -489,24 +597,33 @@ class BookingWindow(tk.Toplevel):
         self.refresh_available_equipment()
     
     def refresh_available_equipment(self, event=None):
-        """Обновляет список доступного оборудования на выбранную дату и время"""
-        booking_date = self.booking_date.get_date().strftime("%d.%m.%Y")
-        start_time = f"{self.start_hour_var.get()}:{self.start_minute_var.get()}"
-        end_time = f"{self.end_hour_var.get()}:{self.end_minute_var.get()}"
+        """Обновляет список доступного оборудования на выбранную дату и время.
+
+        Бронирования дня загружаются из базы одним запросом (снимок дня), после чего
+        список для любого времени этого дня вычисляется без обращения к базе.
+        """
+        booking_date = self.booking_date.get_date()
+        start_minute = to_minutes(f"{self.start_hour_var.get()}:{self.start_minute_var.get()}")
+        end_minute = to_minutes(f"{self.end_hour_var.get()}:{self.end_minute_var.get()}")
+        
+        # Проверка корректности времени: при выборе в списках сообщение показывается
+        # вместо списка оборудования, чтобы не прерывать ввод
+        warning = None
+        if start_minute is None or end_minute is None:
+            warning = "Некорректное время"
+        elif start_minute >= end_minute:
+            warning = "Время окончания должно быть позже времени начала"
+        if warning:
+            if event is None:
+                messagebox.showwarning("Предупреждение", warning)
+            else:
+                self.equipment_listbox.delete(0, tk.END)
+                self.equipment_listbox.insert(tk.END, warning)
+                self.equipment_ids = []
+            return
         
-        # Проверка корректности времени
-        try:
-            start_hour, start_minute = map(int, self.start_hour_var.get()), map(int, self.start_minute_var.get())
-            end_hour, end_minute = map(int, self.end_hour_var.get()), map(int, self.end_minute_var.get())
-            
-            if int(self.start_hour_var.get()) > int(self.end_hour_var.get()) or (
-                int(self.start_hour_var.get()) == int(self.end_hour_var.get()) and 
-                int(self.start_minute_var.get()) >= int(self.end_minute_var.get())
-            ):
-                messagebox.showwarning("Предупреждение", "Время окончания должно быть позже времени начала")
-                return
-        except ValueError:
-            messagebox.showwarning("Предупреждение", "Некорректное время")
+        snapshot = self._day_snapshot(booking_date)
+        if snapshot is None:
             return
         
         # Сохраняем текущий выбор (ID оборудования)
@@ -517,33 +634,76 @@ class BookingWindow(tk.Toplevel):
         # Очищаем список
         self.equipment_listbox.delete(0, tk.END)
         
-        # Получаем доступное оборудование
-        success, equipment_list = self.db.get_available_equipment(booking_date, start_time, end_time)
+        # Получаем доступное оборудование (при редактировании не учитываем само бронирование)
+        equipment_list = snapshot.get_available(
+            start_minute, end_minute, exclude_id=self.booking_data[0] if self.booking_data else None
+        )
+        self._schedule_prefetch(booking_date)
         
-        if success:
-            self.equipment_ids = []  # Сохраняем ID оборудования
+        self.equipment_ids = []  # Сохраняем ID оборудования
+        
+        for item in equipment_list:
+            equipment_id, name, model, serial, status = item
+            self.equipment_ids.append(equipment_id)
+            self.equipment_listbox.insert(tk.END, f"{name} - {model}")
             
-            for item in equipment_list:
-                equipment_id, name, model, serial, status = item
-                self.equipment_ids.append(equipment_id)
-                self.equipment_listbox.insert(tk.END, f"{name} - {model}")
-                
-            # Если редактируем существующее бронирование, то добавляем текущее оборудование
-            if self.booking_data and not current_selection in self.equipment_ids:
-                # Получаем данные текущего оборудования
-                _, current_equipment_id, _, _, _, _, _, _, _, equipment_name, equipment_model = self.booking_data
-                
-                # Добавляем в список и выбираем
-                self.equipment_listbox.insert(0, f"{equipment_name} - {equipment_model} (текущий выбор)")
-                self.equipment_ids.insert(0, current_equipment_id)
-                self.equipment_listbox.selection_set(0)
+        # Если редактируем существующее бронирование, то добавляем текущее оборудование
+        if self.booking_data and not current_selection in self.equipment_ids:
+            # Получаем данные текущего оборудования
+            _, current_equipment_id, _, _, _, _, _, _, _, equipment_name, equipment_model = self.booking_data
             
-            # Если список пуст
-            if not equipment_list and not (self.booking_data and current_selection):
-                self.equipment_listbox.insert(tk.END, "Нет доступного оборудования на выбранное время")
-                self.equipment_ids = []
-        else:
-            messagebox.showerror("Ошибка", f"Не удалось получить список оборудования: {equipment_list}")
+            # Добавляем в список и выбираем
+            self.equipment_listbox.insert(0, f"{equipment_name} - {equipment_model} (текущий выбор)")
+            self.equipment_ids.insert(0, current_equipment_id)
+            self.equipment_listbox.selection_set(0)
+        elif self.booking_data:
+            # Текущее оборудование свободно - выбираем его в списке
+            self.equipment_listbox.selection_set(self.equipment_ids.index(current_selection))
+        
+        # Если список пуст
+        if not equipment_list and not (self.booking_data and current_selection):
+            self.equipment_listbox.insert(tk.END, "Нет доступного оборудования на выбранное время")
+            self.equipment_ids = []
+    
+    def reload_available_equipment(self):
+        """Заново загружает занятость из базы данных и обновляет список оборудования"""
+        self._snapshots.clear()
+        self.refresh_available_equipment()
+    
+    def _day_snapshot(self, booking_date):
+        """Снимок занятости за день из уже загруженных или из базы данных"""
+        iso_date = booking_date.isoformat()
+        snapshot = self._snapshots.get(iso_date)
+        if snapshot is None:
+            success, snapshot = self.db.get_day_snapshot(iso_date)
+            if not success:
+                messagebox.showerror("Ошибка", f"Не удалось получить список оборудования: {snapshot}")
+                return None
+            self._snapshots[iso_date] = snapshot
+        return snapshot
+    
+    def _schedule_prefetch(self, booking_date):
+        """Планирует загрузку снимков соседних дней на время простоя"""
+        if self._prefetch_job is not None:
+            self.after_cancel(self._prefetch_job)
+        self._prefetch_job = self.after_idle(self._prefetch_adjacent, booking_date)
+    
+    def _prefetch_adjacent(self, booking_date):
+        """Загружает снимки занятости за предыдущий и следующий день"""
+        self._prefetch_job = None
+        for delta in (1, -1):
+            iso_date = (booking_date + datetime.timedelta(days=delta)).isoformat()
+            if iso_date not in self._snapshots:
+                success, snapshot = self.db.get_day_snapshot(iso_date)
+                if success:
+                    self._snapshots[iso_date] = snapshot
+    
+    def destroy(self):
+        """Закрывает окно, отменяя отложенную загрузку снимков"""
+        if self._prefetch_job is not None:
+            self.after_cancel(self._prefetch_job)
+            self._prefetch_job = None
+        super().destroy()
     
     def _fill_booking_data(self):
         """Заполняет форму данными для редактирования"""
@@ -651,10 +811,10 @@ class BookingWindow(tk.Toplevel):
             
             if success:
                 messagebox.showinfo("Успех", "Оборудование успешно забронировано")
-                self.parent.load_booking_data()  # Обновляем данные в родительском окне
                 self.destroy()  # Закрываем окно
             else:
                 messagebox.showerror("Ошибка", f"Не удалось забронировать оборудование: {result}")
+                self.reload_available_equipment()  # Занятость могла измениться после загрузки снимка
         else:
             # Редактирование существующего бронирования
             booking_id = self.booking_data[0]
@@ -664,7 +824,7 @@ class BookingWindow(tk.Toplevel):
             
             if success:
                 messagebox.showinfo("Успех", "Бронирование успешно обновлено")
-                self.parent.load_booking_data()  # Обновляем данные в родительском окне
                 self.destroy()  # Закрываем окно
             else:
                 messagebox.showerror("Ошибка", f"Не удалось обновить бронирование: {error_message}")
+                self.reload_available_equipment()  # Занятость могла измениться после загрузки снимка
@@ -0,0 +1,233 @@
+"""
+Модуль компактного хранения списков бронирований в памяти
+"""
+import datetime
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+
+from date_utils import minutes_to_time, to_minutes
+
+
+def date_ordinal(value):
+    """Номер дня (date.toordinal) для даты ДД.ММ.ГГГГ, ГГГГ-ММ-ДД или date, либо None"""
+    if isinstance(value, datetime.date):
+        return value.toordinal()
+    try:
+        if value[2] == ".":
+            return datetime.date(int(value[6:]), int(value[3:5]), int(value[:2])).toordinal()
+        return datetime.date.fromisoformat(value).toordinal()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def filter_period(date_filter, selected_date=None, today=None):
+    """Границы периода (с, по) для фильтра по дате из интерфейса; None - без ограничения"""
+    today = today or datetime.date.today()
+    if date_filter == "Сегодня":
+        return today, today
+    if date_filter == "Будущие":
+        return today, None
+    if date_filter == "Прошедшие":
+        return None, today - datetime.timedelta(days=1)
+    if date_filter == "Выбрать..." and selected_date is not None:
+        return selected_date, selected_date
+    return None, None
+
+
+def _negated(ordinal):
+    """Ключ двоичного поиска по номерам дней, упорядоченным по убыванию"""
+    return -ordinal
+
+
+class BookingColumns:
+    """Список бронирований, хранящийся по столбцам.
+
+    Строки имеют вид (id, *поля, дата, начало, окончание, *поля), где date_index -
+    позиция даты. Дата и время разбираются один раз при добавлении строки и хранятся
+    в массивах как номер дня и минуты от полуночи, остальные поля - в списках
+    с общими (интернированными) строками, поэтому список занимает в несколько раз
+    меньше памяти, чем список кортежей. Строки упорядочены по убыванию даты, как их
+    возвращает база данных: выборка за период - двоичный поиск по номерам дней.
+    Объект можно использовать как источник строк VirtualTreeview.
+    """
+
+    def __init__(self, rows=(), date_index=1):
+        self.date_index = date_index
+        self.ids = array('q')
+        self.ordinals = array('l')
+        self.starts = array('H')
+        self.ends = array('H')
+        self.fields = None
+        self._positions = None
+        self.extend(rows)
+
+    def extend(self, rows):
+        """Добавляет строки в конец списка (строки должны продолжать порядок по убыванию даты)"""
+        if isinstance(rows, BookingColumns):
+            self._extend_columns(rows)
+            return
+
+        # Даты и время в списке повторяются, поэтому каждое значение разбирается один раз
+        ordinals, minutes = {}, {}
+        date_index = self.date_index
+        for row in rows:
+            if self.fields is None:
+                self.fields = [[] for _ in range(len(row) - 4)]
+            date, start, end = row[date_index:date_index + 3]
+            ordinal = ordinals.get(date)
+            if ordinal is None:
+                ordinal = ordinals[date] = date_ordinal(date)
+                if ordinal is None:
+                    raise ValueError(f"Некорректная дата бронирования: {date}")
+            if start not in minutes:
+                minutes[start] = to_minutes(start)
+            if end not in minutes:
+                minutes[end] = to_minutes(end)
+            self.ids.append(row[0])
+            self.ordinals.append(ordinal)
+            self.starts.append(minutes[start])
+            self.ends.append(minutes[end])
+            for column, value in zip(self.fields, row[1:date_index] + row[date_index + 3:]):
+                column.append(sys.intern(value) if isinstance(value, str) else value)
+        self._positions = None
+
+    def _extend_columns(self, other):
+        """Добавляет строки другого списка без повторного разбора"""
+        if other.fields is None:
+            return
+        if self.fields is None:
+            self.fields = [[] for _ in other.fields]
+        self.ids.extend(other.ids)
+        self.ordinals.extend(other.ordinals)
+        self.starts.extend(other.starts)
+        self.ends.extend(other.ends)
+        for column, values in zip(self.fields, other.fields):
+            column.extend(values)
+        self._positions = None
+
+    def count(self):
+        """Количество строк"""
+        return len(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def row(self, index):
+        """Строка в исходном виде (даты и время - в формате интерфейса)"""
+        date = datetime.date.fromordinal(self.ordinals[index])
+        values = [column[index] for column in self.fields]
+        split = self.date_index - 1
+        return (
+            self.ids[index], *values[:split],
+            f"{date.day:02d}.{date.month:02d}.{date.year}",
+            minutes_to_time(self.starts[index]), minutes_to_time(self.ends[index]),
+            *values[split:]
+        )
+
+    def rows(self, offset, limit):
+        """Строки с offset по offset + limit"""
+        return [self.row(index) for index in range(offset, min(offset + limit, len(self.ids)))]
+
+    def index(self, row_id):
+        """Позиция строки по ID или None"""
+        if self._positions is None:
+            self._positions = {row_id: index for index, row_id in enumerate(self.ids)}
+        return self._positions.get(row_id)
+
+    def get(self, row_id):
+        """Строка по ID или None"""
+        index = self.index(row_id)
+        return None if index is None else self.row(index)
+
+    def update(self, row):
+        """Заменяет строку с тем же ID на месте; возвращает False, если строки нет"""
+        index = self.index(row[0])
+        if index is None:
+            return False
+        replacement = BookingColumns([row], self.date_index)
+        self.ordinals[index] = replacement.ordinals[0]
+        self.starts[index] = replacement.starts[0]
+        self.ends[index] = replacement.ends[0]
+        for column, values in zip(self.fields, replacement.fields):
+            column[index] = values[0]
+        return True
+
+    def remove(self, row_id):
+        """Удаляет строку по ID; возвращает False, если строки нет"""
+        index = self.index(row_id)
+        if index is None:
+            return False
+        for column in (self.ids, self.ordinals, self.starts, self.ends, *self.fields):
+            del column[index]
+        self._positions = None
+        return True
+
+    def period_range(self, date_from=None, date_to=None):
+        """Диапазон позиций (начало, конец) строк с датой в периоде; None - без ограничения"""
+        start = 0 if date_to is None else bisect_left(self.ordinals, -date_to.toordinal(), key=_negated)
+        end = len(self.ids) if date_from is None else bisect_right(
+            self.ordinals, -date_from.toordinal(), key=_negated
+        )
+        return start, max(start, end)
+
+    def between(self, date_from=None, date_to=None):
+        """Новый список из строк с датой в периоде (без разбора строк)"""
+        start, end = self.period_range(date_from, date_to)
+        result = BookingColumns(date_index=self.date_index)
+        result.ids = self.ids[start:end]
+        result.ordinals = self.ordinals[start:end]
+        result.starts = self.starts[start:end]
+        result.ends = self.ends[start:end]
+        if self.fields is not None:
+            result.fields = [column[start:end] for column in self.fields]
+        return result
+
+    def is_past(self, index, today=None):
+        """Прошло ли бронирование (дата раньше сегодняшней)"""
+        return self.ordinals[index] < (today or datetime.date.today()).toordinal()
+
+
+class DayTimeline:
+    """Бронирования одного дня, сгруппированные по оборудованию для временной шкалы.
+
+    Каждому оборудованию соответствует строка шкалы; интервалы строки упорядочены
+    по началу, поэтому бронирования видимой части шкалы находятся двоичным
+    поиском, без перебора всех бронирований дня.
+    """
+
+    def __init__(self, equipment, bookings):
+        """
+        equipment - строки оборудования (id, name, ...) в порядке строк шкалы,
+        bookings - строки (id, equipment_id, start_minute, end_minute, ...)
+        """
+        self.equipment = list(equipment)
+        rows = {item[0]: index for index, item in enumerate(self.equipment)}
+        self.bookings = [[] for _ in self.equipment]
+        for booking in sorted(bookings, key=lambda booking: booking[2]):
+            row = rows.get(booking[1])
+            if row is not None:
+                self.bookings[row].append(booking)
+
+        self._starts = [[booking[2] for booking in row] for row in self.bookings]
+        # Префиксный максимум окончаний: корректен и для пересекающихся старых записей
+        self._max_ends = [list(accumulate((booking[3] for booking in row), max)) for row in self.bookings]
+
+    def row_count(self):
+        """Количество строк шкалы (единиц оборудования)"""
+        return len(self.equipment)
+
+    def booking_count(self):
+        """Количество бронирований за день"""
+        return sum(len(row) for row in self.bookings)
+
+    def visible(self, first_row, last_row, start_minute, end_minute):
+        """Бронирования строк first_row..last_row - 1, пересекающие интервал [начало, конец):
+        список пар (номер строки, бронирование)"""
+        result = []
+        for row in range(max(0, first_row), min(last_row, len(self.bookings))):
+            low = bisect_right(self._max_ends[row], start_minute)
+            high = bisect_left(self._starts[row], end_minute)
+            result.extend((row, booking) for booking in self.bookings[row][low:high] if booking[3] > start_minute)
+        return result
@@ -0,0 +1,132 @@
+"""
+Модуль отслеживания изменений общей базы данных, сделанных другими копиями программы
+"""
+# Интервал проверки базы данных в миллисекундах
+WATCH_INTERVAL_MS = 3000
+
+# Наибольшее число изменений за одну проверку, передаваемых разделам построчно;
+# при большем числе разделы загружают данные заново
+MAX_CHANGES = 1000
+
+# Количество последних записей журнала изменений, остающихся после очистки при запуске
+CHANGE_LOG_KEEP = 10000
+
+# Поле ChangeEvent для каждой операции журнала изменений
+_EVENT_FIELDS = {"insert": "added", "update": "updated", "delete": "removed"}
+
+
+class ChangeWatcher:
+    """Периодическая проверка общего файла базы данных на изменения других пользователей.
+
+    Проверка в простое - один запрос PRAGMA data_version, значение которого меняется,
+    только когда изменения фиксирует другое соединение. После изменения читаются
+    записи журнала changes (его ведут триггеры, см. миграцию 6) с номером больше
+    последнего прочитанного, и хранилище данных (DataStore) передает их разделам
+    как обычные события изменений. Собственные изменения программы разделы уже
+    получили от хранилища, поэтому их записи в журнале пропускаются; записи reload
+    массовой загрузки подписаны номером сеанса базы данных (Database.session_id)
+    и пропускаются по нему, сколько бы пакетов ни было добавлено.
+    """
+
+    def __init__(self, widget, store, interval_ms=WATCH_INTERVAL_MS):
+        """widget - виджет, через который планируются проверки; store - DataStore"""
+        self.widget = widget
+        self.store = store
+        self.interval_ms = interval_ms
+        self._version = None
+        self._last_id = 0
+        self._own = set()
+        self._publishing = False
+        self._job = None
+
+    def start(self):
+        """Запоминает текущее состояние базы и запускает периодическую проверку"""
+        self.store.prune_changes(CHANGE_LOG_KEEP)
+        _, self._version = self.store.get_data_version()
+        success, last_id = self.store.get_last_change_id()
+        self._last_id = last_id if success else 0
+        self.store.subscribe(self._remember_own)
+        self._job = self.widget.after(self.interval_ms, self._tick)
+
+    def stop(self):
+        """Останавливает проверку"""
+        self.store.unsubscribe(self._remember_own)
+        if self._job is not None:
+            self.widget.after_cancel(self._job)
+            self._job = None
+
+    def _tick(self):
+        """Выполняет проверку и планирует следующую"""
+        self._job = None
+        self.check()
+        self._job = self.widget.after(self.interval_ms, self._tick)
+
+    def check(self):
+        """Проверяет базу и передает разделам внешние изменения; возвращает True, если они были"""
+        success, version = self.store.get_data_version()
+        if not success or version == self._version:
+            return False
+        self._version = version
+
+        success, changes = self.store.get_changes(self._last_id, MAX_CHANGES + 1)
+        if not success or not changes:
+            return False
+
+        # Пропуск в номерах означает, что журнал очищен после последней проверки
+        if changes[0][0] != self._last_id + 1 or len(changes) > MAX_CHANGES:
+            _, self._last_id = self.store.get_last_change_id()
+            self._own.clear()
+            self._publish_reload()
+            return True
+
+        self._last_id = changes[-1][0]
+        session_id = self.store.session_id
+        events = {}
+        for _, table, row_id, operation in changes:
+            if operation == "reload" and row_id == session_id:
+                continue
+            key = (table, operation, row_id)
+            if key in self._own:
+                self._own.discard(key)
+                continue
+            fields = events.setdefault(table, {field: set() for field in _EVENT_FIELDS.values()})
+            # Запись reload оставляет массовая загрузка другого сеанса (Database.add_bookings_bulk)
+            if operation == "reload":
+                fields["reload"] = True
+            else:
+                fields[_EVENT_FIELDS[operation]].add(row_id)
+
+        # Оборудование передается первым: строки бронирований показывают его название
+        for table, fields in sorted(events.items(), key=lambda item: item[0] != "equipment"):
+            # Строка, добавленная и затем измененная или удаленная, учитывается один раз
+            fields["added"] -= fields["removed"]
+            fields["updated"] -= fields["added"] | fields["removed"]
+            self._publish(table, **fields)
+        return bool(events)
+
+    def _publish(self, table, **fields):
+        """Передает событие хранилищу, не принимая его за собственное изменение"""
+        self._publishing = True
+        try:
+            self.store.publish(table, **fields)
+        finally:
+            self._publishing = False
+
+    def _publish_reload(self):
+        """Сообщает разделам, что данные нужно загрузить заново"""
+        self._publishing = True
+        try:
+            self.store.reload()
+        finally:
+            self._publishing = False
+
+    def _remember_own(self, event):
+        """Запоминает собственные изменения программы, чтобы пропустить их записи в журнале"""
+        # Собственные записи reload узнаются по номеру сеанса
+        if self._publishing or event.reload:
+            return
+        # После массовых изменений журнал все равно будет прочитан как перезагрузка
+        if len(self._own) > MAX_CHANGES:
+            self._own.clear()
+        for operation, field in _EVENT_FIELDS.items():
+            self._own.update((event.table, operation, row_id) for row_id in getattr(event, field))
@@ -0,0 +1,62 @@
+"""
+Модуль пула соединений SQLite для работы с базой данных из нескольких потоков
+"""
+import threading
+
+
+class ConnectionPool:
+    """Пул соединений: у каждого потока свое соединение, запись выполняет один поток.
+
+    Соединения завершившихся потоков (например, потоков BackgroundLoader, который
+    запускает новый поток для каждой загрузки) закрываются, когда соединение
+    открывает следующий поток, поэтому число открытых соединений не превышает
+    числа работающих потоков плюс одного.
+    """
+
+    def __init__(self, connect):
+        """connect() открывает новое соединение с базой данных"""
+        self._connect = connect
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+        self._closed = False
+        # Блокировка записи: SQLite допускает только одного писателя
+        self.write_lock = threading.RLock()
+
+    def connection(self):
+        """Возвращает соединение текущего потока, открывая его при первом обращении"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError("Пул соединений закрыт")
+                conn = self._connect()
+                # Новое соединение открывается до закрытия старых: база в памяти
+                # существует, пока открыто хотя бы одно ее соединение
+                finished = [item for item in self._connections if not item[0].is_alive()]
+                self._connections = [item for item in self._connections if item[0].is_alive()]
+                self._connections.append((threading.current_thread(), conn))
+            for _, finished_conn in finished:
+                finished_conn.close()
+            self._local.conn = conn
+            self._local.cursor = conn.cursor()
+        return conn
+
+    def cursor(self):
+        """Возвращает курсор соединения текущего потока"""
+        self.connection()
+        return self._local.cursor
+
+    def close_all(self):
+        """Закрывает все соединения пула"""
+        with self._lock:
+            self._closed = True
+            connections, self._connections = self._connections, []
+        for _, conn in connections:
+            conn.close()
+
+    @property
+    def size(self):
+        """Количество открытых соединений"""
+        with self._lock:
+            return len(self._connections)
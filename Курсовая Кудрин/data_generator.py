@@ -1,15 +1,54 @@
 """
 Модуль генерации случайных данных для базы данных VR-оборудования
+
+Запуск из командной строки (массовая генерация для нагрузочного тестирования):
+    python data_generator.py БАЗА [--equipment N] [--bookings N] [--seed N] [--start ГГГГ-ММ-ДД]
 """
+import argparse
 import random
 import sqlite3
 import datetime
-from tkinter import messagebox
+import threading
+import time
+from collections import namedtuple
+from tkinter import messagebox, ttk
 import tkinter as tk
+from background_loader import BackgroundLoader
 from database import Database
+from date_utils import DAY_START_MINUTE, DAY_END_MINUTE
+
+# Количество бронирований, добавляемых одной транзакцией при массовой генерации
+BULK_BATCH_SIZE = 50000
+
+# Шаг сетки времени бронирований, промежутки между бронированиями и их длительности в минутах
+SLOT_MINUTES = 30
+BULK_GAPS = (0, 0, 30, 60, 90, 120)
+BULK_DURATIONS = (30, 60, 60, 90, 120)
+
+# Размер пакета бронирований в окне генерации: после каждого пакета обновляется
+# индикатор выполнения и проверяется запрос отмены
+DIALOG_BATCH_SIZE = 10000
+
+# Сообщение о прерванной генерации (добавленные данные удалены)
+GENERATION_CANCELLED = "Генерация отменена"
+
+
+class GenerationResult(namedtuple("GenerationResult", "bookings days seconds")):
+    """Итог массовой генерации: точное число добавленных бронирований,
+    число использованных дней и время работы в секундах"""
+
+    @property
+    def rows_per_second(self):
+        """Скорость добавления бронирований"""
+        return self.bookings / self.seconds if self.seconds else 0.0
+
 
 class DataGenerator:
-    """Класс для генерации случайных данных"""
+    """Класс для генерации случайных данных.
+
+    При заданном seed генератор детерминирован: одинаковое зерно и одинаковое
+    исходное состояние базы дают одинаковые данные.
+    """
 
     # Списки для генерации случайных значений
     vr_names = [
@@ -56,29 +95,42 @@ class DataGenerator:
              "Исследовательский проект учащихся",
              "Открытый урок с использованием VR-технологий"]
 
-    def __init__(self, db):
+    def __init__(self, db, seed=None):
         """Инициализация генератора данных"""
         self.db = db
+        self.rng = random.Random(seed)
 
     def generate_random_equipment(self, count=10):
         """Генерирует случайное оборудование"""
+        success, result = self.add_random_equipment(count)
+        if not success:
+            print(f"Ошибка при добавлении оборудования: {result}")
+            return 0
+        return len(result)
+
+    def add_random_equipment(self, count=10):
+        """Добавляет случайное оборудование; возвращает (успех, список ID или сообщение об ошибке)"""
+        equipment_items = []
         for _ in range(count):
-            name = random.choice(self.vr_names)
-            model = random.choice(self.vr_models)
-            serial_number = f"SN-{random.randint(10000, 99999)}"
-            description = random.choice(self.descriptions)
+            name = self.rng.choice(self.vr_names)
+            model = self.rng.choice(self.vr_models)
+            serial_number = f"SN-{self.rng.randint(10000, 99999)}"
+            description = self.rng.choice(self.descriptions)
 
             # Генерация случайной даты покупки за последние 5 лет
-            days_back = random.randint(0, 5*365)
+            days_back = self.rng.randint(0, 5*365)
             purchase_date = (datetime.datetime.now() - datetime.timedelta(days=days_back)).strftime("%d.%m.%Y")
 
-            # Добавление оборудования в базу данных
-            try:
-                success, result = self.db.add_equipment(name, model, serial_number, description, purchase_date)
-                if not success:
-                    print(f"Ошибка при добавлении оборудования: {result}")
-            except sqlite3.Error as e:
-                print(f"Ошибка при добавлении оборудования: {e}")
+            equipment_items.append((name, model, serial_number, description, purchase_date))
+
+        # Добавление всего оборудования в базу данных одной транзакцией
+        try:
+            success, result = self.db.add_equipment_many(equipment_items)
+            if not success:
+                return False, result
+            return True, [equipment_id for row_success, equipment_id in result if row_success]
+        except sqlite3.Error as e:
+            return False, str(e)
 
     def generate_random_bookings(self, count=20):
         """Генерирует случайные бронирования"""
@@ -100,9 +152,10 @@ class DataGenerator:
                 print(f"Некорректный формат данных оборудования: {item}")
                 return False
 
+        bookings = []
         for _ in range(count):
             # Выбираем случайное оборудование
-            equipment = random.choice(equipment_list)
+            equipment = self.rng.choice(equipment_list)
 
             # Проверяем формат данных оборудования
             if isinstance(equipment, tuple) and len(equipment) > 0:
@@ -112,37 +165,187 @@ class DataGenerator:
                 continue  # Пропускаем этот элемент
 
             # Генерация случайной даты бронирования (от сегодня до +30 дней)
-            days_ahead = random.randint(0, 30)
+            days_ahead = self.rng.randint(0, 30)
             booking_date = (datetime.datetime.now() + datetime.timedelta(days=days_ahead)).strftime("%d.%m.%Y")
 
             # Генерация случайного времени (часы работы учреждения 8:00 - 18:00)
-            start_hour = random.randint(8, 16)
-            duration = random.randint(1, 2)  # Длительность 1-2 часа
+            start_hour = self.rng.randint(8, 16)
+            duration = self.rng.randint(1, 2)  # Длительность 1-2 часа
             end_hour = min(start_hour + duration, 18)
 
             start_time = f"{start_hour:02d}:00"
             end_time = f"{end_hour:02d}:00"
 
-            room = random.choice(self.rooms)
-            booked_by = random.choice(self.users)
-            notes = random.choice(self.notes)
+            room = self.rng.choice(self.rooms)
+            booked_by = self.rng.choice(self.users)
+            notes = self.rng.choice(self.notes)
 
-            # Добавление бронирования в базу данных
-            try:
-                success, result = self.db.add_booking(equipment_id, booking_date, start_time, end_time, room, booked_by, notes)
-                if not success:
+            bookings.append((equipment_id, booking_date, start_time, end_time, room, booked_by, notes))
+
+        # Добавление всех бронирований в базу данных одной транзакцией
+        try:
+            success, results = self.db.add_bookings_many(bookings)
+            if not success:
+                print(f"Ошибка при добавлении бронирований: {results}")
+                return False
+            for row_success, result in results:
+                if not row_success:
                     print(f"Ошибка при добавлении бронирования: {result}")
-            except sqlite3.Error as e:
-                print(f"Ошибка при добавлении бронирования: {e}")
+        except sqlite3.Error as e:
+            print(f"Ошибка при добавлении бронирования: {e}")
 
         return True
 
 
-def show_generator_dialog(parent, db):
-    """Показывает диалоговое окно для генерации тестовых данных"""
+    def generate_bulk_bookings(self, count, start_date=None, batch_size=BULK_BATCH_SIZE, progress=None,
+                               cancelled=None):
+        """Массовая генерация ровно count бронирований без пересечений (см. iter_bulk_bookings).
+
+        progress(добавлено, всего) вызывается после каждого пакета.
+        Возвращает (успех, GenerationResult или сообщение об ошибке).
+        """
+        result = GenerationResult(0, 0, 0.0)
+        try:
+            for result in self.iter_bulk_bookings(count, start_date, batch_size, cancelled):
+                if progress:
+                    progress(result.bookings, count)
+        except (sqlite3.Error, ValueError) as e:
+            return False, str(e)
+        if result.bookings < count:
+            return False, GENERATION_CANCELLED
+        return True, result
+
+    def iter_bulk_bookings(self, count, start_date=None, batch_size=BULK_BATCH_SIZE, cancelled=None):
+        """Массовая генерация бронирований с передачей хода работы.
+
+        Дни, начиная со start_date (по умолчанию - сегодня), заполняются по очереди:
+        для каждого оборудования бронирования идут одно за другим со случайными
+        промежутками в пределах рабочего дня и обходят существующие бронирования.
+        Бронирования добавляются пакетами по batch_size через Database.add_bookings_bulk,
+        которая пропускает строки, пересекающиеся с бронированиями, добавленными после
+        чтения расписания дня; вместо пропущенных генерируются следующие, поэтому
+        добавляется ровно count бронирований. После каждого пакета генератор
+        возвращает GenerationResult с итогом на этот момент.
+
+        Если установлен cancelled (threading.Event) или произошла ошибка, добавленные
+        пакеты удаляются (Database.delete_bookings_bulk). После отмены последний
+        результат содержит 0 бронирований, ошибка передается исключением
+        sqlite3.Error или ValueError.
+        """
+        started = time.perf_counter()
+        if count <= 0:
+            return
+        success, equipment_list = self.db.get_all_equipment()
+        if not success:
+            raise sqlite3.Error(equipment_list)
+        if not equipment_list:
+            raise ValueError("Нет оборудования для бронирования")
+        equipment_ids = [row[0] for row in equipment_list]
+        first_day = start_date or datetime.date.today()
+
+        added = 0
+        days = 0
+        batch = []
+        id_ranges = []
+        try:
+            for day_bookings in self._iter_bulk_days(equipment_ids, first_day):
+                days += 1
+                for booking in day_bookings:
+                    batch.append(booking)
+                    if added + len(batch) < count and len(batch) < batch_size:
+                        continue
+                    if cancelled is not None and cancelled.is_set():
+                        self._delete_bulk_bookings(id_ranges)
+                        yield GenerationResult(0, days, time.perf_counter() - started)
+                        return
+                    success, result = self.db.add_bookings_bulk(batch)
+                    if not success:
+                        raise sqlite3.Error(result)
+                    batch = []
+                    if result is None:
+                        continue
+                    id_ranges.append(result)
+                    added += result[1] - result[0] + 1
+                    yield GenerationResult(added, days, time.perf_counter() - started)
+                    if added == count:
+                        return
+        except sqlite3.Error:
+            self._delete_bulk_bookings(id_ranges)
+            raise
+
+    def _delete_bulk_bookings(self, id_ranges):
+        """Удаляет пакеты бронирований, добавленные массовой генерацией"""
+        if not id_ranges:
+            return
+        success, result = self.db.delete_bookings_bulk(id_ranges)
+        if not success:
+            raise sqlite3.Error(f"Не удалось удалить добавленные бронирования: {result}")
+
+    def _iter_bulk_days(self, equipment_ids, first_day):
+        """Бесконечная последовательность дней: для каждого дня - список бронирований
+        (equipment_id, дата ГГГГ-ММ-ДД, начало, окончание, room, booked_by, notes)"""
+        # Значения выбираются по rng.random(): на миллионах строк это заметно быстрее rng.choice
+        random_value = self.rng.random
+        rooms, users, notes = self.rooms, self.users, self.notes
+        day = first_day
+        while True:
+            success, day_bookings = self.db.get_day_bookings(day)
+            if not success:
+                raise sqlite3.Error(day_bookings)
+            # Существующие бронирования дня по оборудованию, упорядоченные по началу
+            busy = {}
+            for _, equipment_id, start_minute, end_minute, _, _ in day_bookings:
+                busy.setdefault(equipment_id, []).append((start_minute, end_minute))
+
+            iso_date = day.isoformat()
+            bookings = []
+            for equipment_id in equipment_ids:
+                existing = busy.get(equipment_id, ())
+                position = 0
+                cursor = DAY_START_MINUTE
+                while True:
+                    start = cursor + BULK_GAPS[int(random_value() * len(BULK_GAPS))]
+                    end = start + BULK_DURATIONS[int(random_value() * len(BULK_DURATIONS))]
+                    if end > DAY_END_MINUTE:
+                        break
+                    # Пропускаем закончившиеся бронирования и обходим пересекающееся
+                    while position < len(existing) and existing[position][1] <= start:
+                        position += 1
+                    if position < len(existing) and existing[position][0] < end:
+                        cursor = -(-existing[position][1] // SLOT_MINUTES) * SLOT_MINUTES
+                        position += 1
+                        continue
+                    bookings.append((
+                        equipment_id, iso_date, start, end,
+                        rooms[int(random_value() * len(rooms))],
+                        users[int(random_value() * len(users))],
+                        notes[int(random_value() * len(notes))]
+                    ))
+                    cursor = end
+            yield bookings
+            day += datetime.timedelta(days=1)
+
+def _delete_equipment(db, equipment_ids):
+    """Удаляет оборудование отмененной генерации одной транзакцией; возвращает ID удаленного оборудования"""
+    success, result = db.delete_equipment_many(equipment_ids)
+    if not success:
+        raise sqlite3.Error(f"Не удалось удалить добавленное оборудование: {result}")
+    return result
+
+
+def show_generator_dialog(parent, store):
+    """Показывает диалоговое окно для генерации тестовых данных.
+
+    store - DataStore. Генерация выполняется в рабочем потоке (если база данных
+    использует пул соединений), поэтому окно программы не блокируется: ход работы
+    передается через очередь BackgroundLoader в индикатор выполнения, а отмена
+    удаляет уже добавленные данные. Изменения передаются разделам через хранилище:
+    оборудование - построчно сразу после добавления, бронирования - одной
+    повторной загрузкой по окончании.
+    """
     dialog = tk.Toplevel(parent)
     dialog.title("Генерация тестовых данных")
-    dialog.geometry("400x250")
+    dialog.geometry("400x360")
     dialog.resizable(False, False)
     dialog.grab_set()  # Блокирует взаимодействие с родительским окном
 
@@ -193,49 +396,131 @@ def show_generator_dialog(parent, db):
     booking_label.pack(side=tk.LEFT)
 
     booking_var = tk.StringVar(value="20")
-    booking_entry = tk.Entry(booking_frame, textvariable=booking_var, width=5)
+    booking_entry = tk.Entry(booking_frame, textvariable=booking_var, width=8)
     booking_entry.pack(side=tk.LEFT)
 
+    # Фрейм для ввода зерна генератора (пустое значение - случайные данные)
+    seed_frame = tk.Frame(content_frame)
+    seed_frame.pack(fill=tk.X, pady=5)
+
+    seed_label = tk.Label(seed_frame, text="Зерно:", width=15, anchor=tk.W)
+    seed_label.pack(side=tk.LEFT)
+
+    seed_var = tk.StringVar(value="")
+    seed_entry = tk.Entry(seed_frame, textvariable=seed_var, width=8)
+    seed_entry.pack(side=tk.LEFT)
+
+    # Индикатор выполнения: количество бронирований, скорость и оставшееся время
+    progress_bar = ttk.Progressbar(content_frame, mode="determinate")
+    progress_bar.pack(fill=tk.X, pady=(15, 5))
+
+    progress_label = tk.Label(content_frame, text="", font=("Arial", 9), anchor=tk.W)
+    progress_label.pack(fill=tk.X)
+
     # Фрейм для кнопок
     button_frame = tk.Frame(content_frame)
-    button_frame.pack(fill=tk.X, pady=(20, 0))
+    button_frame.pack(fill=tk.X, pady=(10, 0))
+
+    # Генерация выполняется в фоне; stop - запрос отмены с удалением добавленных данных
+    loader = BackgroundLoader(dialog, threaded=store.pooled)
+    stop = threading.Event()
+    generated = {"equipment": [], "bookings": None}
 
     def on_generate():
         try:
             equipment_count = int(equipment_var.get())
             booking_count = int(booking_var.get())
-
-            if equipment_count <= 0 or booking_count <= 0:
-                messagebox.showerror("Ошибка", "Количество должно быть положительным числом")
+            seed = int(seed_var.get()) if seed_var.get().strip() else None
+        except ValueError:
+            messagebox.showerror("Ошибка", "Введите корректное число")
+            return
+
+        if equipment_count <= 0 or booking_count <= 0:
+            messagebox.showerror("Ошибка", "Количество должно быть положительным числом")
+            return
+
+        def produce(cancelled):
+            """Генерация данных (в рабочем потоке): порции ("equipment", ID оборудования),
+            ("bookings", GenerationResult) и после отмены ("removed", ID оборудования)"""
+            generator = DataGenerator(store.db, seed)
+            success, equipment_ids = generator.add_random_equipment(equipment_count)
+            if not success:
+                raise sqlite3.Error(equipment_ids)
+            yield "equipment", equipment_ids
+
+            result = None
+            try:
+                for result in generator.iter_bulk_bookings(
+                        booking_count, batch_size=DIALOG_BATCH_SIZE, cancelled=stop):
+                    yield "bookings", result
+            except (sqlite3.Error, ValueError):
+                _delete_equipment(store.db, equipment_ids)
+                raise
+            # Бронирования отмененной генерации уже удалены, удаляем и оборудование
+            if result is None or result.bookings < booking_count:
+                yield "removed", _delete_equipment(store.db, equipment_ids)
+
+        def on_chunk(chunk):
+            kind, payload = chunk
+            if kind == "equipment":
+                generated["equipment"] = payload
+                store.publish("equipment", added=payload)
+            elif kind == "removed":
+                generated["equipment"] = []
+                store.publish("equipment", removed=payload)
+            else:
+                generated["bookings"] = payload
+                if stop.is_set():
+                    return
+                progress_bar.config(value=payload.bookings)
+                speed = payload.rows_per_second
+                remaining = (booking_count - payload.bookings) / speed if speed else 0
+                progress_label.config(
+                    text=f"Бронирования: {payload.bookings} из {booking_count}, "
+                         f"{speed:.0f} записей/с, осталось ~{remaining:.0f} с"
+                )
+
+        def on_done():
+            # Разделы загружают бронирования заново один раз, после окончания генерации
+            store.publish("booking", reload=True)
+            result = generated["bookings"]
+            dialog.destroy()
+            if result is None or result.bookings < booking_count:
+                messagebox.showinfo("Отменено", f"{GENERATION_CANCELLED}, добавленные данные удалены")
                 return
-
-            # Генерируем данные
-            generator = DataGenerator(db)
-            generator.generate_random_equipment(equipment_count)
-
-            # Генерируем бронирования только если есть оборудование
-            booking_result = generator.generate_random_bookings(booking_count)
-
-            # Показываем сообщение об успехе
             messagebox.showinfo(
                 "Успешно",
                 f"Данные успешно сгенерированы:\n"
-                f"• Оборудование: {equipment_count} шт.\n"
-                f"• Бронирования: {'успешно добавлены' if booking_result else 'не добавлены (нет оборудования)'}"
+                f"• Оборудование: {len(generated['equipment'])} шт.\n"
+                f"• Бронирования: {result.bookings} шт. за {result.days} дн. "
+                f"({result.rows_per_second:.0f} записей/с)"
             )
 
-            # Закрываем окно
+        def on_error(message):
+            store.publish("booking", reload=True)
+            if generated["equipment"]:
+                store.publish("equipment", removed=generated["equipment"])
             dialog.destroy()
-
-            # Обновляем данные в основном приложении
-            if hasattr(parent, "equipment_frame") and hasattr(parent.equipment_frame, "load_equipment_data"):
-                parent.equipment_frame.load_equipment_data()
-
-            if hasattr(parent, "booking_frame") and hasattr(parent.booking_frame, "load_booking_data"):
-                parent.booking_frame.load_booking_data()
-
-        except ValueError:
-            messagebox.showerror("Ошибка", "Введите корректное число")
+            messagebox.showerror("Ошибка", f"Не удалось сгенерировать данные: {message}")
+
+        # Во время генерации можно работать с программой: окно больше не модальное
+        dialog.grab_release()
+        for entry in (equipment_entry, booking_entry, seed_entry):
+            entry.config(state=tk.DISABLED)
+        generate_button.config(state=tk.DISABLED)
+        progress_bar.config(maximum=booking_count, value=0)
+        progress_label.config(text="Добавление оборудования...")
+        loader.start(produce, on_chunk, on_done=on_done, on_error=on_error)
+
+    def on_cancel():
+        if not loader.busy:
+            loader.close()
+            dialog.destroy()
+            return
+        # Генерация прерывается после текущего пакета, добавленные данные удаляются
+        stop.set()
+        cancel_button.config(state=tk.DISABLED)
+        progress_label.config(text="Отмена: удаление добавленных данных...")
 
     # Кнопка генерации
     generate_button = tk.Button(
@@ -253,13 +538,14 @@ def show_generator_dialog(parent, db):
     cancel_button = tk.Button(
         button_frame,
         text="Отмена",
-        command=dialog.destroy,
+        command=on_cancel,
         bg="#f1f1f1",
         fg="black",
         font=("Arial", 10),
         padx=10
     )
     cancel_button.pack(side=tk.RIGHT, padx=5)
+    dialog.protocol("WM_DELETE_WINDOW", on_cancel)
 
     # Центрируем диалог относительно родительского окна
     dialog.update_idletasks()
@@ -267,4 +553,36 @@ def show_generator_dialog(parent, db):
     height = dialog.winfo_height()
     x = parent.winfo_x() + (parent.winfo_width() // 2) - (width // 2)
     y = parent.winfo_y() + (parent.winfo_height() // 2) - (height // 2)
-    dialog.geometry(f"{width}x{height}+{x}+{y}")
\ No newline at end of file
+    dialog.geometry(f"{width}x{height}+{x}+{y}")
+
+
+def main():
+    """Массовая генерация данных из командной строки"""
+    parser = argparse.ArgumentParser(description="Генерация тестовых данных VR-оборудования")
+    parser.add_argument("database", help="путь к файлу базы данных")
+    parser.add_argument("--equipment", type=int, default=1000, help="количество оборудования")
+    parser.add_argument("--bookings", type=int, default=1000000, help="количество бронирований")
+    parser.add_argument("--seed", type=int, default=1, help="зерно генератора")
+    parser.add_argument("--start", type=datetime.date.fromisoformat, default=None,
+                        help="первый день бронирований (ГГГГ-ММ-ДД, по умолчанию - сегодня)")
+    args = parser.parse_args()
+
+    with Database(args.database, profile="bulk-load", cache_size=0) as db:
+        generator = DataGenerator(db, args.seed)
+        equipment_added = generator.generate_random_equipment(args.equipment)
+        print(f"Оборудование: {equipment_added} шт.")
+
+        def progress(added, total):
+            print(f"  бронирований: {added} из {total}", end="\r", flush=True)
+
+        success, result = generator.generate_bulk_bookings(args.bookings, args.start, progress=progress)
+        if not success:
+            raise SystemExit(f"Не удалось добавить бронирования: {result}")
+        print(
+            f"Бронирования: {result.bookings} шт. за {result.days} дн., "
+            f"{result.seconds:.1f} с ({result.rows_per_second:.0f} записей/с)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Модуль общего хранилища данных интерфейса с уведомлениями об изменениях
+"""
+import threading
+from bisect import insort
+from collections import namedtuple
+
+# Событие изменения таблицы: множества ID добавленных, измененных и удаленных строк;
+# reload=True - изменения нельзя перечислить (например, после работы другого процесса)
+ChangeEvent = namedtuple("ChangeEvent", "table added updated removed reload")
+
+# Наибольшее число добавленных или измененных единиц оборудования, которые вносятся
+# в сохраненный список по одной (при большем числе список загружается заново)
+APPLY_MAX_ROWS = 100
+
+
+def _equipment_key(row):
+    """Порядок оборудования в списке: по названию, затем по ID"""
+    return row[1], row[0]
+
+
+class DataStore:
+    """Общее хранилище данных для разделов интерфейса.
+
+    Методы чтения Database доступны напрямую (get_bookings, search_equipment и т.д.),
+    а изменения данных выполняются через методы хранилища с теми же аргументами
+    и результатами, что и у Database. После успешного изменения подписчики
+    получают ChangeEvent с ID затронутых строк и обновляют только их, вместо
+    повторной загрузки списков. Список оборудования хранится целиком и
+    изменяется на месте; бронирования из-за их количества остаются в базе
+    данных, разделы загружают их постранично.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self._subscribers = []
+        self._equipment = None
+        self._equipment_generation = 0
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        return getattr(self.db, name)
+
+    # Подписка на изменения
+    def subscribe(self, callback, *tables):
+        """Подписывает callback(event) на изменения указанных таблиц (по умолчанию - всех)"""
+        self._subscribers.append((callback, frozenset(tables or ("equipment", "booking"))))
+
+    def unsubscribe(self, callback):
+        """Отменяет подписку"""
+        self._subscribers = [(subscriber, tables) for subscriber, tables in self._subscribers if subscriber != callback]
+
+    def publish(self, table, added=(), updated=(), removed=(), reload=False):
+        """Сообщает подписчикам об изменении таблицы"""
+        event = ChangeEvent(table, frozenset(added), frozenset(updated), frozenset(removed), reload)
+        if not (event.added or event.updated or event.removed or event.reload):
+            return
+        if table == "equipment":
+            self._apply_equipment_event(event)
+        for callback, tables in list(self._subscribers):
+            if table in tables:
+                callback(event)
+
+    def reload(self):
+        """Сообщает, что данные могли измениться целиком (например, другим процессом)"""
+        self.publish("equipment", reload=True)
+        self.publish("booking", reload=True)
+
+    # Список оборудования
+    def equipment_rows(self):
+        """Все оборудование (id, name, model, serial_number, status) в порядке названий"""
+        with self._lock:
+            if self._equipment is not None:
+                return list(self._equipment)
+        return [row for chunk in self.iter_equipment() for row in chunk]
+
+    def iter_equipment(self, chunk_size=500):
+        """Оборудование порциями: из хранилища или, при первом обращении, из базы данных
+        (загруженный список сохраняется в хранилище)"""
+        with self._lock:
+            rows = None if self._equipment is None else list(self._equipment)
+            generation = self._equipment_generation
+        if rows is not None:
+            for start in range(0, len(rows), chunk_size):
+                yield rows[start:start + chunk_size]
+            return
+
+        loaded = []
+        for chunk in self.db.iter_all_equipment(chunk_size):
+            loaded.extend(chunk)
+            yield chunk
+        with self._lock:
+            # Список, прочитанный во время изменения данных, не сохраняется
+            if generation == self._equipment_generation:
+                self._equipment = loaded
+
+    def _apply_equipment_event(self, event):
+        """Изменяет сохраненный список оборудования по событию"""
+        changed = event.added | event.updated
+        rows = []
+        if not event.reload and len(changed) <= APPLY_MAX_ROWS:
+            for equipment_id in changed:
+                success, details = self.db.get_equipment_details(equipment_id)
+                if success and details:
+                    rows.append((details[0], details[1], details[2], details[3], details[6]))
+
+        with self._lock:
+            self._equipment_generation += 1
+            if self._equipment is None:
+                return
+            # Список, который дешевле прочитать заново, загружается при следующем обращении
+            if len(rows) != len(changed) or event.reload:
+                self._equipment = None
+                return
+            stale = changed | event.removed
+            self._equipment = [row for row in self._equipment if row[0] not in stale]
+            for row in rows:
+                insort(self._equipment, row, key=_equipment_key)
+
+    # Изменение оборудования
+    def add_equipment(self, *args, **kwargs):
+        success, result = self.db.add_equipment(*args, **kwargs)
+        if success:
+            self.publish("equipment", added=[result])
+        return success, result
+
+    def add_equipment_many(self, equipment_items):
+        success, results = self.db.add_equipment_many(equipment_items)
+        if success:
+            self.publish("equipment", added=[result for ok, result in results if ok])
+        return success, results
+
+    def update_equipment(self, equipment_id, *args, **kwargs):
+        success, result = self.db.update_equipment(equipment_id, *args, **kwargs)
+        if success:
+            self.publish("equipment", updated=[int(equipment_id)])
+        return success, result
+
+    def delete_equipment(self, equipment_id):
+        # Прошедшие бронирования удаляются вместе с оборудованием, их ID нужны подписчикам
+        _, bookings = self.db.get_equipment_bookings(equipment_id)
+        success, result = self.db.delete_equipment(equipment_id)
+        if success:
+            self.publish("equipment", removed=[int(equipment_id)])
+            if isinstance(bookings, list):
+                self.publish("booking", removed=[booking[0] for booking in bookings])
+            else:
+                self.publish("booking", reload=True)
+        return success, result
+
+    # Изменение бронирований
+    def add_booking(self, *args, **kwargs):
+        success, result = self.db.add_booking(*args, **kwargs)
+        if success:
+            self.publish("booking", added=[result])
+        return success, result
+
+    def add_bookings_many(self, bookings):
+        success, results = self.db.add_bookings_many(bookings)
+        if success:
+            self.publish("booking", added=[result for ok, result in results if ok])
+        return success, results
+
+    def add_bookings_bulk(self, rows):
+        success, result = self.db.add_bookings_bulk(rows)
+        if success and result:
+            # Массовую загрузку разделы показывают повторной загрузкой списков
+            self.publish("booking", reload=True)
+        return success, result
+
+    def update_booking(self, booking_id, *args, **kwargs):
+        success, result = self.db.update_booking(booking_id, *args, **kwargs)
+        if success:
+            self.publish("booking", updated=[int(booking_id)])
+        return success, result
+
+    def delete_booking(self, booking_id):
+        success, result = self.db.delete_booking(booking_id)
+        if success:
+            self.publish("booking", removed=[int(booking_id)])
+        return success, result
@@ -1,53 +1,297 @@
+import functools
+import inspect
+import re
 import sqlite3
 import os
+import random
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 
+from availability import AvailabilityIndex, DaySchedule
+from connection_pool import ConnectionPool
+from date_utils import DAY_END_MINUTE, DAY_START_MINUTE, to_iso_date, to_minutes
+from db_profiles import apply_profile, resolve_profile
+from migrations import migrate
+from query_cache import ResultCache, copy_result
+
+# Выражения для вывода даты и времени бронирования в формате интерфейса
+BOOKING_DATE_SQL = "COALESCE(strftime('%d.%m.%Y', b.booking_date), b.booking_date)"
+START_TIME_SQL = "printf('%02d:%02d', b.start_minute / 60, b.start_minute % 60)"
+END_TIME_SQL = "printf('%02d:%02d', b.end_minute / 60, b.end_minute % 60)"
+
+# Текст, индексируемый полнотекстовым поиском, для сужения результатов поиска в памяти
+EQUIPMENT_TEXT_SQL = (
+    "e.name || ' ' || e.model || ' ' || COALESCE(e.serial_number, '') || ' ' || COALESCE(e.description, '')"
+)
+BOOKING_TEXT_SQL = (
+    f"e.name || ' ' || e.model || ' ' || {BOOKING_DATE_SQL} || ' ' || b.room"
+    " || ' ' || COALESCE(b.booked_by, '') || ' ' || COALESCE(b.notes, '')"
+)
+
+# Ранжирование bm25 дорого для неизбирательных запросов: при большем числе совпадений
+# результаты поиска бронирований выводятся от новых к старым
+RANK_MAX_MATCHES = 10000
+
+
+def fts_query(text):
+    """Преобразует строку поиска в запрос FTS5: все слова должны встречаться как префиксы"""
+    words = re.findall(r"\w+", text.lower())
+    return " ".join(f'"{word}"*' for word in words) or None
+
+
+def _writer(*tables):
+    """Декоратор методов записи: одновременно изменять базу может только один поток.
+
+    Метод выполняется в транзакции BEGIN IMMEDIATE, открытой декоратором, и фиксирует
+    ее через Database._commit. tables - изменяемые методом таблицы; закэшированные
+    результаты, зависящие от них, удаляются после выполнения метода.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self._write_lock:
+                # Счетчик увеличивается до и после записи, чтобы параллельная проверка
+                # не приняла изменения этого метода за внешние
+                self._write_generation += 1
+                try:
+                    try:
+                        self._begin_write()
+                    except sqlite3.Error as e:
+                        return False, str(e)
+                    return method(self, *args, **kwargs)
+                finally:
+                    # Транзакция, оставленная открытой (ранний выход или ошибка без отката),
+                    # откатывается, иначе следующий BEGIN IMMEDIATE не выполнится
+                    if self.conn.in_transaction:
+                        self.conn.rollback()
+                    self._write_generation += 1
+                    self.cache.invalidate(tables)
+        # Признак метода записи (по нему AsyncDatabase выбирает поток записи)
+        wrapper.writes_data = True
+        return wrapper
+    return decorator
+
+
+def _cached(*tables):
+    """Декоратор методов чтения: успешные результаты сохраняются в кэше Database.
+
+    tables - таблицы, от которых зависит результат метода.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            self._check_external_changes()
+            if not self.cache.enabled:
+                return method(self, *args, **kwargs)
+
+            key = (method.__name__, args, tuple(sorted(kwargs.items())))
+            found, result = self.cache.get(key)
+            if found:
+                return True, copy_result(result)
+
+            generation = self.cache.generation
+            success, result = method(self, *args, **kwargs)
+            if success:
+                # Вызывающий код может изменять полученный список, поэтому в кэше хранится копия
+                self.cache.put(key, tables, copy_result(result), generation)
+            return success, result
+        return wrapper
+    return decorator
+
 
 class Database:
     """Класс для работы с базой данных SQLite"""
 
-    def __init__(self, db_name="vr_equipment.db"):
-        """Инициализация соединения с базой данных"""
-        # Создаем базу в текущей директории
-        self.db_path = os.path.join(os.getcwd(), db_name)
-        self.conn = sqlite3.connect(self.db_path)
-        self.cursor = self.conn.cursor()
+    def __init__(self, db_name="vr_equipment.db", pooled=False, profile=None, stats=None, cache_size=128):
+        """Инициализация соединения с базой данных.
+
+        В режиме пула (pooled=True) каждый поток получает собственное соединение,
+        поэтому методы класса можно вызывать из фоновых потоков. Профиль
+        (см. db_profiles.PROFILES) задает настройки SQLite; если он не указан,
+        используется переменная окружения VR_DB_PROFILE или профиль "interactive".
+        Если передан stats (instrumentation.QueryStats), время выполнения
+        публичных методов и выполняемые запросы учитываются в статистике.
+        Результаты методов чтения кэшируются (не более cache_size записей,
+        0 отключает кэш); изменения, сделанные другими процессами,
+        обнаруживаются по счетчику журнала изменений.
+        """
+        # Создаем базу в текущей директории (кроме базы в памяти)
+        self.db_path = db_name if db_name == ":memory:" else os.path.join(os.getcwd(), db_name)
+        self.pooled = pooled
+        self.profile = resolve_profile(profile)
+        self.stats = stats
+        self.cache = ResultCache(max_entries=cache_size)
+        # Счетчик записей через этот объект и последний учтенный номер журнала изменений
+        # (общий для всех соединений пула)
+        self._write_generation = 0
+        self._seen_change_id = 0
+        # Значение PRAGMA data_version соединения каждого потока при последней проверке
+        self._local = threading.local()
+        # Номер сеанса: им подписываются записи reload массовой загрузки в журнале изменений,
+        # чтобы ChangeWatcher этого же объекта не принял их за изменения других пользователей
+        self.session_id = random.getrandbits(48) + 1
+
+        if pooled:
+            self._pool = ConnectionPool(self._connect)
+            self._write_lock = self._pool.write_lock
+        else:
+            self._pool = None
+            self._write_lock = threading.RLock()
+            self._conn = self._connect()
+            self._cursor = self._conn.cursor()
+
         self._create_tables()
+        self._seen_change_id = self._change_counter()
 
-    def _create_tables(self):
-        """Создание необходимых таблиц в базе данных, если они не существуют"""
-        # Таблица оборудования
-        self.cursor.execute('''
-        CREATE TABLE IF NOT EXISTS equipment (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            model TEXT NOT NULL,
-            serial_number TEXT,
-            description TEXT,
-            purchase_date TEXT,
-            status TEXT DEFAULT 'Доступно'
-        )
-        ''')
-
-        # Таблица бронирования
-        self.cursor.execute('''
-        CREATE TABLE IF NOT EXISTS booking (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            equipment_id INTEGER NOT NULL,
-            booking_date TEXT NOT NULL,
-            start_time TEXT NOT NULL,
-            end_time TEXT NOT NULL,
-            room TEXT NOT NULL,
-            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-            booked_by TEXT,
-            notes TEXT,
-            FOREIGN KEY (equipment_id) REFERENCES equipment (id) ON DELETE CASCADE
-        )
-        ''')
+        # Индекс занятости оборудования, дни загружаются по мере обращения
+        self.availability = AvailabilityIndex(self._load_day_intervals, self._load_available_equipment)
+
+        if stats:
+            self._instrument(stats)
+
+    def _connect(self):
+        """Открытие нового соединения с базой данных с настройками выбранного профиля"""
+        if not self.pooled:
+            conn = sqlite3.connect(self.db_path)
+        elif self.db_path == ":memory:":
+            # Соединения пула должны видеть одну и ту же базу в памяти
+            conn = sqlite3.connect(
+                f"file:vr_equipment_{id(self)}?mode=memory&cache=shared", uri=True, check_same_thread=False
+            )
+        else:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+
+        apply_profile(conn, self.profile)
+        if self.stats:
+            conn.set_trace_callback(self.stats.trace)
+        return conn
+
+    def _instrument(self, stats):
+        """Оборачивает публичные методы экземпляра замером времени выполнения"""
+        stats.explain = self._explain
+        for name, attribute in inspect.getmembers(type(self), callable):
+            if name.startswith("_") or name in ("close", "connection", "transaction"):
+                continue
+            # Генераторы выполняются по частям, время их вызова не показательно
+            if inspect.isgeneratorfunction(attribute):
+                continue
+            setattr(self, name, stats.wrap(name, getattr(self, name)))
+
+    def _explain(self, statement):
+        """Получение плана выполнения запроса (EXPLAIN QUERY PLAN)"""
+        return self.conn.execute("EXPLAIN QUERY PLAN " + statement).fetchall()
+
+    def _change_counter(self):
+        """Номер последней записи журнала изменений (см. миграцию 6).
+
+        Журнал ведут триггеры для изменений любого соединения, а номер в sqlite_sequence
+        не уменьшается и после очистки журнала, поэтому он служит общим для всех
+        соединений счетчиком изменений оборудования и бронирований.
+        """
+        row = self.conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'changes'").fetchone()
+        return row[0] if row else 0
+
+    def _begin_write(self):
+        """Открывает транзакцию записи и учитывает изменения других процессов.
+
+        После BEGIN IMMEDIATE другие соединения не могут фиксировать изменения до конца
+        транзакции, поэтому рост счетчика журнала к этому моменту - внешние изменения.
+        """
+        self.conn.execute("BEGIN IMMEDIATE")
+        counter = self._change_counter()
+        if counter != self._seen_change_id:
+            self._seen_change_id = counter
+            self.cache.invalidate()
+            self.availability.invalidate()
 
+    def _commit(self):
+        """Фиксирует транзакцию записи. Счетчик журнала читается внутри транзакции,
+        сразу после собственных изменений, и считается учтенным"""
+        self._seen_change_id = self._change_counter()
         self.conn.commit()
 
+    def _check_external_changes(self):
+        """Сбрасывает кэш и индекс занятости, если базу изменил другой процесс.
+
+        PRAGMA data_version соединения текущего потока меняется, только когда изменения
+        фиксирует другое соединение, поэтому при неизменном значении проверка не
+        обращается к таблицам. Иначе счетчик журнала изменений сравнивается
+        с последним учтенным значением, общим для всех соединений пула: соединение
+        фонового потока, открытое уже после внешнего изменения, тоже его обнаруживает.
+        Изменения, сделанные методами записи этого объекта, уже учтены ими; пока такая
+        запись выполняется, сравнение пропускается.
+        """
+        conn = self.conn
+        version = (id(conn), conn.execute("PRAGMA data_version").fetchone()[0])
+        if getattr(self._local, "data_version", None) == version:
+            return
+        generation = self._write_generation
+        counter = self._change_counter()
+        self._local.data_version = version
+        if counter == self._seen_change_id:
+            return
+        # Нечетное или изменившееся значение счетчика означает собственную запись;
+        # внешние изменения до нее учтет сама запись (см. _begin_write)
+        if generation % 2 or generation != self._write_generation:
+            return
+        self._seen_change_id = counter
+        self.cache.invalidate()
+        self.availability.invalidate()
+
+    @property
+    def conn(self):
+        """Соединение с базой данных (в режиме пула - соединение текущего потока)"""
+        return self._pool.connection() if self._pool else self._conn
+
+    @property
+    def cursor(self):
+        """Курсор соединения (в режиме пула - курсор текущего потока)"""
+        return self._pool.cursor() if self._pool else self._cursor
+
+    @contextmanager
+    def connection(self):
+        """Контекстный менеджер, предоставляющий соединение текущего потока для чтения"""
+        yield self.conn
+
+    @contextmanager
+    def transaction(self):
+        """Контекстный менеджер транзакции записи: фиксирует изменения или откатывает их при ошибке"""
+        with self._write_lock:
+            conn = self.conn
+            self._write_generation += 1
+            try:
+                self._begin_write()
+                yield conn.cursor()
+                self._commit()
+            except BaseException:
+                if conn.in_transaction:
+                    conn.rollback()
+                raise
+            finally:
+                # Изменяемые таблицы заранее неизвестны
+                self._write_generation += 1
+                self.cache.invalidate()
+                self.availability.invalidate()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _create_tables(self):
+        """Создание необходимых таблиц и обновление схемы базы данных до текущей версии"""
+        # Обновление схемы разрешено даже для профиля только для чтения
+        query_only = self.conn.execute("PRAGMA query_only").fetchone()[0]
+        self.conn.execute("PRAGMA query_only = OFF")
+        try:
+            migrate(self.conn)
+        finally:
+            self.conn.execute(f"PRAGMA query_only = {query_only}")
+
     # Методы для работы с оборудованием
+    @_writer("equipment")
     def add_equipment(self, name, model, serial_number="", description="", purchase_date=""):
         """Добавление нового оборудования в базу данных"""
         try:
@@ -55,11 +299,48 @@ class Database:
                 "INSERT INTO equipment (name, model, serial_number, description, purchase_date) VALUES (?, ?, ?, ?, ?)",
                 (name, model, serial_number, description, purchase_date)
             )
-            self.conn.commit()
+            self._commit()
+            self.availability.invalidate_equipment()
             return True, self.cursor.lastrowid
         except sqlite3.Error as e:
             return False, str(e)
 
+    @_writer("equipment")
+    def add_equipment_many(self, equipment_items):
+        """Добавление списка оборудования одной транзакцией.
+
+        Каждый элемент - кортеж аргументов add_equipment. Возвращает список
+        результатов (успех, ID или сообщение об ошибке) в порядке входных данных.
+        """
+        def equipment_args(name, model, serial_number="", description="", purchase_date=""):
+            return name, model, serial_number, description, purchase_date
+
+        try:
+            rows = [equipment_args(*item) for item in equipment_items]
+        except TypeError as e:
+            return False, f"Некорректные данные оборудования: {e}"
+
+        if not rows:
+            return True, []
+
+        try:
+            self.cursor.executemany(
+                "INSERT INTO equipment (name, model, serial_number, description, purchase_date) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            last_id = self.cursor.execute("SELECT last_insert_rowid()").fetchone()[0]
+            self._commit()
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            return False, str(e)
+
+        self.availability.invalidate_equipment()
+
+        # В одной транзакции AUTOINCREMENT выдает идентификаторы подряд
+        first_id = last_id - len(rows) + 1
+        return True, [(True, first_id + i) for i in range(len(rows))]
+
+    @_writer("equipment")
     def update_equipment(self, equipment_id, name, model, serial_number="", description="", purchase_date="",
                          status="Доступно"):
         """Обновление информации об оборудовании"""
@@ -70,18 +351,20 @@ class Database:
                    WHERE id=?""",
                 (name, model, serial_number, description, purchase_date, status, equipment_id)
             )
-            self.conn.commit()
+            self._commit()
+            self.availability.invalidate_equipment()
             return True, None
         except sqlite3.Error as e:
             return False, str(e)
 
+    @_writer("equipment", "booking")
     def delete_equipment(self, equipment_id):
         """Удаление оборудования из базы данных"""
         try:
             # Проверяем, есть ли активные бронирования для этого оборудования
             self.cursor.execute(
                 """SELECT COUNT(*) FROM booking 
-                   WHERE equipment_id=? AND date(booking_date) >= date('now')""",
+                   WHERE equipment_id=? AND booking_date >= date('now', 'localtime')""",
                 (equipment_id,)
             )
             active_bookings = self.cursor.fetchone()[0]
@@ -90,19 +373,124 @@ class Database:
                 return False, "Невозможно удалить оборудование с активными бронированиями"
 
             self.cursor.execute("DELETE FROM equipment WHERE id=?", (equipment_id,))
-            self.conn.commit()
+            self._commit()
+            self.availability.invalidate_equipment()
             return True, None
         except sqlite3.Error as e:
             return False, str(e)
 
+    @_writer("equipment", "booking")
+    def delete_equipment_many(self, equipment_ids):
+        """Удаление списка оборудования одной транзакцией (например, при отмене генерации данных).
+
+        Оборудование с активными бронированиями, как и в delete_equipment, не удаляется.
+        Возвращает список ID удаленного оборудования.
+        """
+        try:
+            deleted = []
+            for equipment_id in equipment_ids:
+                self.cursor.execute(
+                    """SELECT COUNT(*) FROM booking
+                       WHERE equipment_id=? AND booking_date >= date('now', 'localtime')""",
+                    (equipment_id,)
+                )
+                if self.cursor.fetchone()[0] == 0:
+                    self.cursor.execute("DELETE FROM equipment WHERE id=?", (equipment_id,))
+                    deleted.append(equipment_id)
+            self._commit()
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            return False, str(e)
+
+        self.availability.invalidate_equipment()
+        return True, deleted
+
+    @_cached("equipment")
     def get_all_equipment(self):
         """Получение всего списка оборудования"""
         try:
-            self.cursor.execute("SELECT id, name, model, serial_number, status FROM equipment ORDER BY name")
+            self.cursor.execute("SELECT id, name, model, serial_number, status FROM equipment ORDER BY name, id")
+            return True, self.cursor.fetchall()
+        except sqlite3.Error as e:
+            return False, str(e)
+
+    def get_equipment_page(self, limit=100, cursor=None):
+        """Постраничное получение списка оборудования (keyset-пагинация по названию).
+
+        cursor - токен, полученный с предыдущей страницей (None для первой).
+        Возвращает (строки, токен следующей страницы или None).
+        """
+        try:
+            if cursor is None:
+                self.cursor.execute(
+                    "SELECT id, name, model, serial_number, status FROM equipment ORDER BY name, id LIMIT ?",
+                    (limit + 1,)
+                )
+            else:
+                name, equipment_id = cursor
+                self.cursor.execute(
+                    """SELECT id, name, model, serial_number, status FROM equipment
+                       WHERE name >= ? AND (name > ? OR id > ?)
+                       ORDER BY name, id LIMIT ?""",
+                    (name, name, equipment_id, limit + 1)
+                )
+            rows = self.cursor.fetchall()
+        except sqlite3.Error as e:
+            return False, str(e)
+
+        if len(rows) <= limit:
+            return True, (rows, None)
+        rows = rows[:limit]
+        return True, (rows, (rows[-1][1], rows[-1][0]))
+
+    def iter_all_equipment(self, chunk_size=500):
+        """Потоковое получение всего оборудования порциями (генератор списков строк)"""
+        cursor = None
+        while True:
+            success, result = self.get_equipment_page(chunk_size, cursor)
+            if not success:
+                raise sqlite3.Error(result)
+            rows, cursor = result
+            if rows:
+                yield rows
+            if cursor is None:
+                return
+
+    @_cached("equipment")
+    def count_equipment(self):
+        """Получение количества оборудования"""
+        try:
+            self.cursor.execute("SELECT COUNT(*) FROM equipment")
+            return True, self.cursor.fetchone()[0]
+        except sqlite3.Error as e:
+            return False, str(e)
+
+    @_cached("equipment")
+    def search_equipment(self, query, limit=None, with_text=False):
+        """Полнотекстовый поиск оборудования по названию, модели, серийному номеру и описанию.
+
+        Каждое слово запроса ищется как префикс; результаты упорядочены по релевантности.
+        with_text=True добавляет к строкам столбец с индексируемым текстом.
+        """
+        match = fts_query(query)
+        if match is None:
+            return True, []
+
+        text = f", {EQUIPMENT_TEXT_SQL}" if with_text else ""
+        try:
+            self.cursor.execute(f"""
+                SELECT e.id, e.name, e.model, e.serial_number, e.status{text}
+                FROM equipment_fts
+                JOIN equipment e ON e.id = equipment_fts.rowid
+                WHERE equipment_fts MATCH ?
+                ORDER BY bm25(equipment_fts), e.name
+                LIMIT ?
+            """, (match, -1 if limit is None else limit))
             return True, self.cursor.fetchall()
         except sqlite3.Error as e:
             return False, str(e)
 
+    @_cached("equipment")
     def get_equipment_details(self, equipment_id):
         """Получение подробной информации об оборудовании"""
         try:
@@ -111,35 +499,100 @@ class Database:
         except sqlite3.Error as e:
             return False, str(e)
 
-    def get_available_equipment(self, booking_date, start_time, end_time):
-        """Получение доступного оборудования на указанную дату и время"""
+    def get_available_equipment(self, booking_date, start_time, end_time, exclude_booking_id=None):
+        """Получение доступного оборудования на указанную дату и время (по индексу занятости)"""
+        slot, error = self._parse_booking_slot(booking_date, start_time, end_time)
+        if error:
+            return False, error
+
         try:
-            self.cursor.execute("""
-                SELECT id, name, model, serial_number, status 
-                FROM equipment 
-                WHERE status = 'Доступно' 
-                AND id NOT IN (
-                    SELECT equipment_id FROM booking 
-                    WHERE booking_date = ? 
-                    AND ((start_time <= ? AND end_time > ?) OR (start_time < ? AND end_time >= ?))
-                )
-                ORDER BY name
-            """, (booking_date, start_time, start_time, end_time, end_time))
-            return True, self.cursor.fetchall()
+            self._check_external_changes()
+            return True, self.availability.get_available(
+                *slot, exclude_id=int(exclude_booking_id) if exclude_booking_id is not None else None
+            )
         except sqlite3.Error as e:
             return False, str(e)
 
+    def get_day_snapshot(self, booking_date):
+        """Снимок занятости доступного оборудования за день (DaySnapshot).
+
+        Бронирования дня загружаются одним запросом; по снимку свободное оборудование
+        для любого времени этого дня определяется без обращения к базе.
+        """
+        iso_date = to_iso_date(booking_date)
+        if iso_date is None:
+            return False, "Некорректная дата бронирования"
+
+        try:
+            self._check_external_changes()
+            return True, self.availability.snapshot(iso_date)
+        except sqlite3.Error as e:
+            return False, str(e)
+
+    def _query_available_equipment(self, iso_date, start_minute, end_minute):
+        """Поиск доступного оборудования запросом к базе без использования индекса занятости"""
+        self.cursor.execute("""
+            SELECT e.id, e.name, e.model, e.serial_number, e.status 
+            FROM equipment e
+            WHERE e.status = 'Доступно' 
+            AND NOT EXISTS (
+                SELECT 1 FROM booking b
+                WHERE b.equipment_id = e.id
+                AND b.booking_date = ? 
+                AND b.start_minute < ? AND b.end_minute > ?
+            )
+            ORDER BY e.name
+        """, (iso_date, end_minute, start_minute))
+        return self.cursor.fetchall()
+
+    def _load_day_intervals(self, iso_date):
+        """Загрузка интервалов всех бронирований за день для индекса занятости"""
+        self.cursor.execute(
+            "SELECT id, equipment_id, start_minute, end_minute FROM booking WHERE booking_date = ?",
+            (iso_date,)
+        )
+        return self.cursor.fetchall()
+
+    def _load_available_equipment(self):
+        """Загрузка списка доступного оборудования для индекса занятости"""
+        self.cursor.execute(
+            "SELECT id, name, model, serial_number, status FROM equipment WHERE status = 'Доступно' ORDER BY name"
+        )
+        return self.cursor.fetchall()
+
     # Методы для работы с бронированием
+    @staticmethod
+    def _parse_booking_slot(booking_date, start_time, end_time):
+        """Преобразует дату и время бронирования к формату хранения: ((дата ISO, начало, конец), ошибка)"""
+        iso_date = to_iso_date(booking_date)
+        if iso_date is None:
+            return None, "Некорректная дата бронирования"
+
+        start_minute, end_minute = to_minutes(start_time), to_minutes(end_time)
+        if start_minute is None or end_minute is None:
+            return None, "Некорректное время бронирования"
+
+        if start_minute >= end_minute:
+            return None, "Время окончания должно быть позже времени начала"
+
+        return (iso_date, start_minute, end_minute), None
+
+    @_writer("booking")
     def add_booking(self, equipment_id, booking_date, start_time, end_time, room, booked_by="", notes=""):
         """Добавление нового бронирования"""
+        slot, error = self._parse_booking_slot(booking_date, start_time, end_time)
+        if error:
+            return False, error
+        iso_date, start_minute, end_minute = slot
+
         try:
             # Проверяем, доступно ли оборудование на указанное время
             self.cursor.execute("""
                 SELECT COUNT(*) FROM booking 
                 WHERE equipment_id = ? 
                 AND booking_date = ? 
-                AND ((start_time <= ? AND end_time > ?) OR (start_time < ? AND end_time >= ?))
-            """, (equipment_id, booking_date, start_time, start_time, end_time, end_time))
+                AND start_minute < ? AND end_minute > ?
+            """, (equipment_id, iso_date, end_minute, start_minute))
 
             if self.cursor.fetchone()[0] > 0:
                 return False, "Оборудование уже забронировано на указанное время"
@@ -147,70 +600,460 @@ class Database:
             # Если оборудование доступно, создаем бронирование
             self.cursor.execute(
                 """INSERT INTO booking 
-                   (equipment_id, booking_date, start_time, end_time, room, booked_by, notes, created_at) 
+                   (equipment_id, booking_date, start_minute, end_minute, room, booked_by, notes, created_at) 
                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
-                (equipment_id, booking_date, start_time, end_time, room, booked_by, notes,
+                (equipment_id, iso_date, start_minute, end_minute, room, booked_by, notes,
                  datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
             )
-            self.conn.commit()
-            return True, self.cursor.lastrowid
+            booking_id = self.cursor.lastrowid
+            # Фиксация и обновление индекса занятости выполняются под блокировкой индекса
+            with self.availability.lock:
+                self._commit()
+                self.availability.add_booking(booking_id, int(equipment_id), iso_date, start_minute, end_minute)
+            return True, booking_id
         except sqlite3.Error as e:
             return False, str(e)
 
+    @_writer("booking")
+    def add_bookings_many(self, bookings):
+        """Добавление списка бронирований одной транзакцией.
+
+        Каждый элемент - кортеж аргументов add_booking. Пересечения проверяются
+        как с бронированиями в базе, так и между записями самого пакета.
+        Возвращает список результатов (успех, ID или сообщение об ошибке)
+        в порядке входных данных; конфликтующие записи не добавляются.
+        """
+        def booking_args(equipment_id, booking_date, start_time, end_time, room, booked_by="", notes=""):
+            return equipment_id, booking_date, start_time, end_time, room, booked_by, notes
+
+        try:
+            items = [booking_args(*booking) for booking in bookings]
+        except TypeError as e:
+            return False, f"Некорректные данные бронирования: {e}"
+
+        results = [None] * len(items)
+        parsed = []
+        for index, (equipment_id, booking_date, start_time, end_time, room, booked_by, notes) in enumerate(items):
+            # ID приводится к int: в базе он хранится числом, а add_booking принимает и строку "1"
+            try:
+                equipment_id = int(equipment_id)
+            except (TypeError, ValueError):
+                results[index] = (False, f"Некорректный ID оборудования: {equipment_id}")
+                continue
+            slot, error = self._parse_booking_slot(booking_date, start_time, end_time)
+            if error:
+                results[index] = (False, error)
+            else:
+                parsed.append((index, equipment_id, slot, room, booked_by, notes))
+
+        if not parsed:
+            return True, results
+
+        created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        try:
+            # Запись заблокирована с начала транзакции (BEGIN IMMEDIATE в _writer),
+            # поэтому проверка и вставка согласованы
+
+            # Загружаем занятые интервалы по всем парам (оборудование, дата) пакета
+            keys = {(equipment_id, slot[0]) for _, equipment_id, slot, _, _, _ in parsed}
+            dates = [date for _, date in keys]
+            self.cursor.execute(
+                """SELECT id, equipment_id, booking_date, start_minute, end_minute FROM booking
+                   WHERE booking_date BETWEEN ? AND ?""",
+                (min(dates), max(dates))
+            )
+            busy = {key: DaySchedule() for key in keys}
+            for booking_id, equipment_id, booking_date, start_minute, end_minute in self.cursor.fetchall():
+                schedule = busy.get((equipment_id, booking_date))
+                if schedule is not None:
+                    schedule.add(booking_id, start_minute, end_minute)
+
+            rows = []
+            accepted = []
+            for index, equipment_id, (iso_date, start_minute, end_minute), room, booked_by, notes in parsed:
+                # Проверка по префиксному максимуму окончаний учитывает и пересекающиеся старые записи
+                schedule = busy[(equipment_id, iso_date)]
+                if not schedule.is_free(start_minute, end_minute):
+                    results[index] = (False, "Оборудование уже забронировано на указанное время")
+                    continue
+
+                schedule.add(None, start_minute, end_minute)
+                rows.append((equipment_id, iso_date, start_minute, end_minute, room, booked_by, notes, created_at))
+                accepted.append(index)
+
+            if rows:
+                self.cursor.executemany(
+                    """INSERT INTO booking 
+                       (equipment_id, booking_date, start_minute, end_minute, room, booked_by, notes, created_at) 
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                    rows
+                )
+                last_id = self.cursor.execute("SELECT last_insert_rowid()").fetchone()[0]
+            with self.availability.lock:
+                self._commit()
+                # В одной транзакции AUTOINCREMENT выдает идентификаторы подряд
+                if rows:
+                    first_id = last_id - len(rows) + 1
+                    for offset, index in enumerate(accepted):
+                        results[index] = (True, first_id + offset)
+                        equipment_id, iso_date, start_minute, end_minute = rows[offset][:4]
+                        self.availability.add_booking(
+                            first_id + offset, equipment_id, iso_date, start_minute, end_minute
+                        )
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            return False, str(e)
+
+        return True, results
+
+    @_writer("booking")
+    def add_bookings_bulk(self, rows):
+        """Массовое добавление бронирований (для генерации данных).
+
+        Каждый элемент - (equipment_id, дата ГГГГ-ММ-ДД, начало и окончание в минутах,
+        room, booked_by, notes). Строка, пересекающаяся с бронированием того же
+        оборудования (в том числе добавленным после того, как вызывающий код прочитал
+        расписание), пропускается. Пакет добавляется одной транзакцией: построчные
+        триггеры вставки отключены (см. миграцию 7), полнотекстовый индекс дополняется
+        одним запросом, а в журнал изменений записывается одна запись reload (с номером
+        сеанса session_id вместо ID строки) вместо записи на каждую строку.
+        Возвращает (ID первой, ID последней добавленной строки) или None, если не добавлено
+        ни одной строки; ID добавленных строк идут подряд, поэтому их количество -
+        последний ID - первый ID + 1.
+        """
+        if not rows:
+            return True, None
+
+        created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        try:
+            self.cursor.execute("INSERT INTO bulk_load (active) VALUES (1)")
+            # Проверка пересечения - поиск по индексу (equipment_id, booking_date, start_minute)
+            self.cursor.executemany(
+                """INSERT INTO booking
+                   (equipment_id, booking_date, start_minute, end_minute, room, booked_by, notes, created_at)
+                   SELECT :equipment_id, :booking_date, :start_minute, :end_minute, :room, :booked_by, :notes,
+                          :created_at
+                   WHERE NOT EXISTS (
+                       SELECT 1 FROM booking
+                       WHERE equipment_id = :equipment_id AND booking_date = :booking_date
+                       AND start_minute < :end_minute AND end_minute > :start_minute
+                   )""",
+                (
+                    {
+                        "equipment_id": equipment_id, "booking_date": booking_date,
+                        "start_minute": start_minute, "end_minute": end_minute,
+                        "room": room, "booked_by": booked_by, "notes": notes, "created_at": created_at,
+                    }
+                    for equipment_id, booking_date, start_minute, end_minute, room, booked_by, notes in rows
+                )
+            )
+            # Для executemany rowcount - общее число добавленных строк
+            inserted = self.cursor.rowcount
+            if not inserted:
+                self.cursor.execute("DELETE FROM bulk_load")
+                self._commit()
+                return True, None
+            last_id = self.cursor.execute("SELECT last_insert_rowid()").fetchone()[0]
+            # В одной транзакции AUTOINCREMENT выдает идентификаторы подряд
+            first_id = last_id - inserted + 1
+            self.cursor.execute(
+                """INSERT INTO booking_fts (rowid, equipment, booking_date, room, booked_by, notes)
+                   SELECT b.id, e.name || ' ' || e.model, strftime('%d.%m.%Y', b.booking_date),
+                          b.room, b.booked_by, b.notes
+                   FROM booking b JOIN equipment e ON b.equipment_id = e.id
+                   WHERE b.id BETWEEN ? AND ?""",
+                (first_id, last_id)
+            )
+            self.cursor.execute(
+                "INSERT INTO changes (table_name, row_id, operation) VALUES ('booking', ?, 'reload')",
+                (self.session_id,)
+            )
+            self.cursor.execute("DELETE FROM bulk_load")
+            self._commit()
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            return False, str(e)
+
+        self.availability.invalidate()
+        return True, (first_id, last_id)
+
+    @_writer("booking")
+    def delete_bookings_bulk(self, id_ranges):
+        """Удаление бронирований, добавленных add_bookings_bulk (отмена массовой загрузки).
+
+        id_ranges - пары (ID первой, ID последней строки) пакетов. Все пакеты удаляются
+        одной транзакцией с отключенными построчными триггерами удаления (см. миграцию 8);
+        в журнал изменений записывается одна запись reload с номером сеанса. Возвращает количество
+        удаленных строк.
+        """
+        try:
+            self.cursor.execute("INSERT INTO bulk_load (active) VALUES (1)")
+            self.cursor.executemany("DELETE FROM booking_fts WHERE rowid BETWEEN ? AND ?", id_ranges)
+            self.cursor.executemany("DELETE FROM booking WHERE id BETWEEN ? AND ?", id_ranges)
+            # Для executemany rowcount - общее число удаленных строк
+            deleted = self.cursor.rowcount
+            self.cursor.execute(
+                "INSERT INTO changes (table_name, row_id, operation) VALUES ('booking', ?, 'reload')",
+                (self.session_id,)
+            )
+            self.cursor.execute("DELETE FROM bulk_load")
+            self._commit()
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            return False, str(e)
+
+        self.availability.invalidate()
+        return True, deleted
+
+    @_writer("booking")
     def update_booking(self, booking_id, equipment_id, booking_date, start_time, end_time, room, booked_by="",
                        notes=""):
         """Обновление информации о бронировании"""
+        slot, error = self._parse_booking_slot(booking_date, start_time, end_time)
+        if error:
+            return False, error
+        iso_date, start_minute, end_minute = slot
+
         try:
             # Проверяем, доступно ли оборудование на указанное время (исключая текущее бронирование)
             self.cursor.execute("""
                 SELECT COUNT(*) FROM booking 
                 WHERE equipment_id = ? 
                 AND booking_date = ? 
-                AND ((start_time <= ? AND end_time > ?) OR (start_time < ? AND end_time >= ?))
+                AND start_minute < ? AND end_minute > ?
                 AND id != ?
-            """, (equipment_id, booking_date, start_time, start_time, end_time, end_time, booking_id))
+            """, (equipment_id, iso_date, end_minute, start_minute, booking_id))
 
             if self.cursor.fetchone()[0] > 0:
                 return False, "Оборудование уже забронировано на указанное время"
 
             self.cursor.execute(
                 """UPDATE booking 
-                   SET equipment_id=?, booking_date=?, start_time=?, end_time=?, room=?, booked_by=?, notes=? 
+                   SET equipment_id=?, booking_date=?, start_minute=?, end_minute=?, room=?, booked_by=?, notes=? 
                    WHERE id=?""",
-                (equipment_id, booking_date, start_time, end_time, room, booked_by, notes, booking_id)
+                (equipment_id, iso_date, start_minute, end_minute, room, booked_by, notes, booking_id)
             )
-            self.conn.commit()
+            with self.availability.lock:
+                self._commit()
+                self.availability.remove_booking(int(booking_id))
+                self.availability.add_booking(int(booking_id), int(equipment_id), iso_date, start_minute, end_minute)
             return True, None
         except sqlite3.Error as e:
             return False, str(e)
 
+    @_writer("booking")
     def delete_booking(self, booking_id):
         """Удаление бронирования"""
         try:
             self.cursor.execute("DELETE FROM booking WHERE id=?", (booking_id,))
-            self.conn.commit()
+            with self.availability.lock:
+                self._commit()
+                self.availability.remove_booking(int(booking_id))
             return True, None
         except sqlite3.Error as e:
             return False, str(e)
 
+    @_cached("booking", "equipment")
     def get_all_bookings(self):
         """Получение всех бронирований с информацией об оборудовании"""
         try:
-            self.cursor.execute("""
-                SELECT b.id, e.name, e.model, b.booking_date, b.start_time, b.end_time, b.room, b.booked_by
+            self.cursor.execute(f"""
+                SELECT b.id, e.name, e.model, {BOOKING_DATE_SQL}, {START_TIME_SQL}, {END_TIME_SQL},
+                       b.room, b.booked_by
                 FROM booking b
                 JOIN equipment e ON b.equipment_id = e.id
-                ORDER BY b.booking_date DESC, b.start_time
+                ORDER BY b.booking_date DESC, b.start_minute, b.id
             """)
             return True, self.cursor.fetchall()
         except sqlite3.Error as e:
             return False, str(e)
 
+    @_cached("booking")
+    def count_bookings(self):
+        """Получение количества бронирований"""
+        try:
+            self.cursor.execute("SELECT COUNT(*) FROM booking")
+            return True, self.cursor.fetchone()[0]
+        except sqlite3.Error as e:
+            return False, str(e)
+
+    @_cached("booking", "equipment")
+    def search_bookings(self, query, limit=None, order="rank"):
+        """Полнотекстовый поиск бронирований по оборудованию, дате, кабинету, автору и примечаниям.
+
+        Каждое слово запроса ищется как префикс. order="rank" упорядочивает результаты
+        по релевантности, order="date" - в порядке get_all_bookings.
+        """
+        match = fts_query(query)
+        if match is None:
+            return True, []
+
+        order_by = {
+            "rank": "bm25(booking_fts), b.booking_date DESC, b.start_minute, b.id",
+            "date": "b.booking_date DESC, b.start_minute, b.id",
+        }[order]
+
+        try:
+            if order == "rank":
+                self.cursor.execute("SELECT COUNT(*) FROM booking_fts WHERE booking_fts MATCH ?", (match,))
+                if self.cursor.fetchone()[0] > RANK_MAX_MATCHES:
+                    order_by = "booking_fts.rowid DESC"
+
+            self.cursor.execute(f"""
+                SELECT b.id, e.name, e.model, {BOOKING_DATE_SQL}, {START_TIME_SQL}, {END_TIME_SQL},
+                       b.room, b.booked_by
+                FROM booking_fts
+                JOIN booking b ON b.id = booking_fts.rowid
+                JOIN equipment e ON b.equipment_id = e.id
+                WHERE booking_fts MATCH ?
+                ORDER BY {order_by}
+                LIMIT ?
+            """, (match, -1 if limit is None else limit))
+            return True, self.cursor.fetchall()
+        except sqlite3.Error as e:
+            return False, str(e)
+
+    @_cached("booking", "equipment")
+    def get_bookings(self, date_from=None, date_to=None, search=None, order="date", limit=None, offset=0,
+                     count=True, with_text=False):
+        """Получение бронирований за период с поиском и сортировкой на стороне базы данных.
+
+        date_from и date_to - границы периода включительно (None - без ограничения),
+        search - строка полнотекстового поиска, order="date" - порядок get_all_bookings,
+        order="rank" - по релевантности поиска; limit и offset выбирают часть списка.
+        Возвращает (строки, число всех подходящих бронирований без учета limit
+        или None, если count=False); with_text=True добавляет к строкам столбец
+        с индексируемым текстом.
+        """
+        order_by = {
+            "rank": "bm25(booking_fts), b.booking_date DESC, b.start_minute, b.id",
+            "date": "b.booking_date DESC, b.start_minute, b.id",
+        }[order]
+
+        conditions = []
+        params = []
+        for value, condition in ((date_from, "b.booking_date >= ?"), (date_to, "b.booking_date <= ?")):
+            if value is None:
+                continue
+            iso_date = to_iso_date(value)
+            if iso_date is None:
+                return False, "Некорректная дата периода"
+            conditions.append(condition)
+            params.append(iso_date)
+
+        source = "booking b"
+        if search is not None:
+            match = fts_query(search)
+            if match is None:
+                return True, ([], 0 if count else None)
+            source = "booking_fts JOIN booking b ON b.id = booking_fts.rowid"
+            conditions.insert(0, "booking_fts MATCH ?")
+            params.insert(0, match)
+        elif order == "rank":
+            order_by = "b.booking_date DESC, b.start_minute, b.id"
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        columns = f"""b.id, e.name, e.model, {BOOKING_DATE_SQL}, {START_TIME_SQL}, {END_TIME_SQL},
+                      b.room, b.booked_by"""
+        if with_text:
+            columns += f", {BOOKING_TEXT_SQL}"
+
+        try:
+            total = None
+            # Для ранжирования число совпадений нужно всегда, чтобы порядок страниц был одинаковым
+            if count or (search is not None and order == "rank"):
+                self.cursor.execute(f"SELECT COUNT(*) FROM {source} {where}", params)
+                total = self.cursor.fetchone()[0]
+                if search is not None and order == "rank" and total > RANK_MAX_MATCHES:
+                    order_by = "booking_fts.rowid DESC"
+
+            if not offset or limit is None:
+                self.cursor.execute(f"""
+                    SELECT {columns}
+                    FROM {source}
+                    JOIN equipment e ON b.equipment_id = e.id
+                    {where}
+                    ORDER BY {order_by}
+                    LIMIT ? OFFSET ?
+                """, params + [-1 if limit is None else limit, offset])
+                return True, (self.cursor.fetchall(), total if count else None)
+
+            # OFFSET пропускает строки по одной, поэтому сначала по индексу выбираются только ID,
+            # а соединение с оборудованием выполняется для строк одной страницы
+            self.cursor.execute(
+                f"SELECT b.id FROM {source} {where} ORDER BY {order_by} LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            )
+            ids = [row[0] for row in self.cursor.fetchall()]
+            rows = []
+            if ids:
+                self.cursor.execute(f"""
+                    SELECT {columns}
+                    FROM booking b
+                    JOIN equipment e ON b.equipment_id = e.id
+                    WHERE b.id IN ({', '.join('?' * len(ids))})
+                """, ids)
+                positions = {booking_id: index for index, booking_id in enumerate(ids)}
+                rows = sorted(self.cursor.fetchall(), key=lambda row: positions[row[0]])
+            return True, (rows, total if count else None)
+        except sqlite3.Error as e:
+            return False, str(e)
+
+    def get_bookings_page(self, limit=100, cursor=None):
+        """Постраничное получение бронирований (keyset-пагинация в порядке get_all_bookings).
+
+        cursor - токен, полученный с предыдущей страницей (None для первой).
+        Возвращает (строки, токен следующей страницы или None).
+        """
+        query = f"""
+            SELECT b.id, e.name, e.model, {BOOKING_DATE_SQL}, {START_TIME_SQL}, {END_TIME_SQL},
+                   b.room, b.booked_by, b.booking_date, b.start_minute
+            FROM booking b
+            JOIN equipment e ON b.equipment_id = e.id
+            {{where}}
+            ORDER BY b.booking_date DESC, b.start_minute, b.id
+            LIMIT ?
+        """
+        try:
+            if cursor is None:
+                self.cursor.execute(query.format(where=""), (limit + 1,))
+            else:
+                booking_date, start_minute, booking_id = cursor
+                # Условие на booking_date вынесено отдельно, чтобы SQLite выбрал диапазон по индексу
+                self.cursor.execute(query.format(where="""
+                    WHERE b.booking_date <= ?
+                    AND (b.booking_date < ? OR b.start_minute > ? OR (b.start_minute = ? AND b.id > ?))
+                """), (booking_date, booking_date, start_minute, start_minute, booking_id, limit + 1))
+            rows = self.cursor.fetchall()
+        except sqlite3.Error as e:
+            return False, str(e)
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = (rows[-1][8], rows[-1][9], rows[-1][0])
+        return True, ([row[:8] for row in rows], next_cursor)
+
+    def iter_all_bookings(self, chunk_size=500):
+        """Потоковое получение всех бронирований порциями (генератор списков строк)"""
+        cursor = None
+        while True:
+            success, result = self.get_bookings_page(chunk_size, cursor)
+            if not success:
+                raise sqlite3.Error(result)
+            rows, cursor = result
+            if rows:
+                yield rows
+            if cursor is None:
+                return
+
+    @_cached("booking", "equipment")
     def get_booking_details(self, booking_id):
         """Получение подробной информации о бронировании"""
         try:
-            self.cursor.execute("""
-                SELECT b.*, e.name, e.model
+            self.cursor.execute(f"""
+                SELECT b.id, b.equipment_id, {BOOKING_DATE_SQL}, {START_TIME_SQL}, {END_TIME_SQL},
+                       b.room, b.created_at, b.booked_by, b.notes, e.name, e.model
                 FROM booking b
                 JOIN equipment e ON b.equipment_id = e.id
                 WHERE b.id=?
@@ -219,20 +1062,188 @@ class Database:
         except sqlite3.Error as e:
             return False, str(e)
 
-    def get_equipment_bookings(self, equipment_id):
-        """Получение всех бронирований для конкретного оборудования"""
+    @_cached("booking")
+    def get_day_bookings(self, booking_date):
+        """Бронирования за день для временной шкалы: (id, equipment_id, start_minute, end_minute, room, booked_by).
+
+        Один запрос по индексу даты; строки упорядочены по времени начала.
+        """
+        iso_date = to_iso_date(booking_date)
+        if iso_date is None:
+            return False, "Некорректная дата бронирования"
+
         try:
             self.cursor.execute("""
-                SELECT id, booking_date, start_time, end_time, room, booked_by
+                SELECT id, equipment_id, start_minute, end_minute, room, booked_by
                 FROM booking
-                WHERE equipment_id=?
-                ORDER BY booking_date DESC, start_time
+                WHERE booking_date = ?
+                ORDER BY start_minute, id
+            """, (iso_date,))
+            return True, self.cursor.fetchall()
+        except sqlite3.Error as e:
+            return False, str(e)
+
+    @_cached("booking", "equipment")
+    def get_daily_utilization(self, month):
+        """Загрузка оборудования по дням месяца одним агрегирующим запросом.
+
+        month - строка ГГГГ-ММ или любая дата месяца. Возвращает строки
+        (дата ISO, количество бронирований, забронировано минут, доля занятости)
+        для дней с бронированиями доступного оборудования: учитывается время в пределах
+        рабочего дня 08:00-21:00, доля - отношение к рабочему времени всего доступного оборудования.
+        """
+        if isinstance(month, str) and re.fullmatch(r"\d{4}-\d{2}", month.strip()):
+            month = f"{month.strip()}-01"
+        iso_date = to_iso_date(month)
+        if iso_date is None:
+            return False, "Некорректный месяц"
+
+        first_day = iso_date[:8] + "01"
+        year, month_number = int(iso_date[:4]), int(iso_date[5:7])
+        next_month = f"{year + month_number // 12:04d}-{month_number % 12 + 1:02d}-01"
+
+        # Бронирования выбираются по покрывающему индексу (дата, начало, окончание, оборудование)
+        # без обращения к таблице; учитывается только оборудование, входящее в знаменатель
+        try:
+            self.cursor.execute("""
+                SELECT b.booking_date, COUNT(*), SUM(MIN(b.end_minute, :day_end) - MAX(b.start_minute, :day_start)),
+                       COALESCE(
+                           SUM(MIN(b.end_minute, :day_end) - MAX(b.start_minute, :day_start)) * 1.0
+                           / NULLIF((SELECT COUNT(*) FROM equipment WHERE status = 'Доступно') * (:day_end - :day_start), 0),
+                           0
+                       )
+                FROM booking b
+                JOIN equipment e ON e.id = b.equipment_id AND e.status = 'Доступно'
+                WHERE b.booking_date >= :first_day AND b.booking_date < :next_month
+                AND b.end_minute > :day_start AND b.start_minute < :day_end
+                GROUP BY b.booking_date
+                ORDER BY b.booking_date
+            """, {
+                "day_start": DAY_START_MINUTE, "day_end": DAY_END_MINUTE,
+                "first_day": first_day, "next_month": next_month,
+            })
+            return True, self.cursor.fetchall()
+        except sqlite3.Error as e:
+            return False, str(e)
+
+    @_cached("booking")
+    def get_equipment_bookings(self, equipment_id):
+        """Получение всех бронирований для конкретного оборудования"""
+        try:
+            self.cursor.execute(f"""
+                SELECT b.id, {BOOKING_DATE_SQL}, {START_TIME_SQL}, {END_TIME_SQL}, b.room, b.booked_by
+                FROM booking b
+                WHERE b.equipment_id=?
+                ORDER BY b.booking_date DESC, b.start_minute
             """, (equipment_id,))
             return True, self.cursor.fetchall()
         except sqlite3.Error as e:
             return False, str(e)
 
+    def get_equipment_bookings_page(self, equipment_id, limit=200, cursor=None, date_from=None, date_to=None):
+        """Постраничное получение бронирований оборудования, начиная с последних
+        (keyset-пагинация по индексу (equipment_id, booking_date)).
+
+        Порядок строк - как у get_equipment_bookings; date_from и date_to - границы
+        периода включительно (None - без ограничения), cursor - токен, полученный
+        с предыдущей страницей (None для первой).
+        Возвращает (строки, токен следующей страницы или None).
+        """
+        conditions = ["b.equipment_id=?"]
+        params = [equipment_id]
+        for value, condition in ((date_from, "b.booking_date >= ?"), (date_to, "b.booking_date <= ?")):
+            if value is None:
+                continue
+            iso_date = to_iso_date(value)
+            if iso_date is None:
+                return False, "Некорректная дата периода"
+            conditions.append(condition)
+            params.append(iso_date)
+
+        if cursor is not None:
+            # Условие на дату отдельно от условия на позицию внутри дня, чтобы
+            # продолжение списка было поиском по диапазону индекса
+            booking_date, start_minute, booking_id = cursor
+            conditions.append("b.booking_date <= ? AND (b.booking_date < ? OR (b.start_minute, b.id) > (?, ?))")
+            params.extend((booking_date, booking_date, start_minute, booking_id))
+
+        try:
+            self.cursor.execute(f"""
+                SELECT b.id, {BOOKING_DATE_SQL}, {START_TIME_SQL}, {END_TIME_SQL}, b.room, b.booked_by,
+                       b.booking_date, b.start_minute
+                FROM booking b
+                WHERE {' AND '.join(conditions)}
+                ORDER BY b.booking_date DESC, b.start_minute, b.id
+                LIMIT ?
+            """, (*params, limit + 1))
+            rows = self.cursor.fetchall()
+        except sqlite3.Error as e:
+            return False, str(e)
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = (rows[-1][6], rows[-1][7], rows[-1][0])
+        return True, ([row[:6] for row in rows], next_cursor)
+
+    @_cached("booking")
+    def get_equipment_booking_stats(self, equipment_id, today=None):
+        """Количество бронирований оборудования одним запросом по индексу:
+        (всего, предстоящих с сегодняшнего дня, прошедших, сегодняшних)"""
+        today = to_iso_date(today or datetime.now())
+        try:
+            self.cursor.execute(
+                """SELECT COUNT(*), TOTAL(booking_date >= ?), TOTAL(booking_date < ?), TOTAL(booking_date = ?)
+                   FROM booking WHERE equipment_id=?""",
+                (today, today, today, equipment_id)
+            )
+            total, upcoming, past, today_count = self.cursor.fetchone()
+            return True, (total, int(upcoming), int(past), int(today_count))
+        except sqlite3.Error as e:
+            return False, str(e)
+
+    def get_data_version(self):
+        """Значение PRAGMA data_version соединения текущего потока: оно меняется,
+        когда изменения в файле базы фиксирует другое соединение"""
+        try:
+            return True, self.conn.execute("PRAGMA data_version").fetchone()[0]
+        except sqlite3.Error as e:
+            return False, str(e)
+
+    def get_last_change_id(self):
+        """Номер последней записи журнала изменений (0, если журнал пуст)"""
+        try:
+            self.cursor.execute("SELECT COALESCE(MAX(id), 0) FROM changes")
+            return True, self.cursor.fetchone()[0]
+        except sqlite3.Error as e:
+            return False, str(e)
+
+    def get_changes(self, after_id, limit=1000):
+        """Записи журнала изменений с номером больше after_id по порядку:
+        (id, table_name, row_id, operation), operation - insert, update или delete"""
+        try:
+            self.cursor.execute(
+                "SELECT id, table_name, row_id, operation FROM changes WHERE id > ? ORDER BY id LIMIT ?",
+                (after_id, limit)
+            )
+            return True, self.cursor.fetchall()
+        except sqlite3.Error as e:
+            return False, str(e)
+
+    @_writer()
+    def prune_changes(self, keep):
+        """Удаляет из журнала изменений записи, кроме последних keep"""
+        try:
+            self.cursor.execute("DELETE FROM changes WHERE id <= (SELECT MAX(id) FROM changes) - ?", (keep,))
+            self._commit()
+            return True, self.cursor.rowcount
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            return False, str(e)
+
     def close(self):
         """Закрытие соединения с базой данных"""
-        if self.conn:
-            self.conn.close()
+        if self._pool:
+            self._pool.close_all()
+        elif self._conn:
+            self._conn.close()
@@ -0,0 +1,59 @@
+"""
+Модуль преобразования дат и времени бронирований между форматами интерфейса и базы данных
+"""
+import datetime
+
+# Границы рабочего дня (временной шкалы бронирований) в минутах от полуночи: 08:00-21:00
+DAY_START_MINUTE = 8 * 60
+DAY_END_MINUTE = 21 * 60
+
+
+def to_iso_date(value):
+    """Преобразует дату (ДД.ММ.ГГГГ, ГГГГ-ММ-ДД или date) в строку ГГГГ-ММ-ДД, либо None"""
+    if isinstance(value, datetime.datetime):
+        return value.date().isoformat()
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    if not isinstance(value, str):
+        return None
+
+    value = value.strip()
+    for date_format in ("%d.%m.%Y", "%Y-%m-%d"):
+        try:
+            return datetime.datetime.strptime(value, date_format).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+def to_minutes(value):
+    """Преобразует время ЧЧ:ММ в количество минут от полуночи, либо None"""
+    if isinstance(value, int):
+        return value if 0 <= value <= 24 * 60 else None
+    try:
+        hours, minutes = map(int, str(value).strip().split(':'))
+    except ValueError:
+        return None
+    if not (0 <= hours <= 24 and 0 <= minutes < 60) or hours * 60 + minutes > 24 * 60:
+        return None
+    return hours * 60 + minutes
+
+
+def minutes_to_time(minutes):
+    """Преобразует количество минут от полуночи в строку ЧЧ:ММ"""
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def iso_to_display(iso_date):
+    """Преобразует дату ГГГГ-ММ-ДД в формат интерфейса ДД.ММ.ГГГГ"""
+    try:
+        return datetime.date.fromisoformat(iso_date).strftime("%d.%m.%Y")
+    except (TypeError, ValueError):
+        return iso_date
+
+
+def display_to_iso(display_date):
+    """Быстрое преобразование даты ДД.ММ.ГГГГ из результатов запросов в ГГГГ-ММ-ДД (без проверки)"""
+    if len(display_date) == 10 and display_date[2] == "." and display_date[5] == ".":
+        return f"{display_date[6:]}-{display_date[3:5]}-{display_date[:2]}"
+    return display_date
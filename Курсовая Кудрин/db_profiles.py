@@ -0,0 +1,66 @@
+"""
+Модуль профилей производительности соединений SQLite
+"""
+import os
+
+# Переменная окружения для выбора профиля без изменения кода
+PROFILE_ENV_VAR = "VR_DB_PROFILE"
+
+DEFAULT_PROFILE = "interactive"
+
+# Настройки PRAGMA для каждого профиля
+PROFILES = {
+    # Работа пользователя в интерфейсе: WAL не блокирует чтение во время записи,
+    # synchronous=NORMAL убирает fsync при каждой фиксации (он выполняется при checkpoint)
+    "interactive": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -16000,
+        "mmap_size": 64 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "foreign_keys": "ON",
+    },
+    # Массовая загрузка данных: максимальная скорость записи ценой надежности при сбое питания
+    "bulk-load": {
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "cache_size": -128000,
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "foreign_keys": "OFF",
+    },
+    # Отчеты: только чтение, большой кэш и отображение файла в память
+    "reporting": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -64000,
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "foreign_keys": "ON",
+        "query_only": "ON",
+    },
+    # База на сетевом диске: WAL требует общей памяти между процессами и на сетевых
+    # файловых системах небезопасен, поэтому используется классический журнал отката
+    "shared-drive": {
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "cache_size": -16000,
+        "mmap_size": 0,
+        "temp_store": "MEMORY",
+        "foreign_keys": "ON",
+    },
+}
+
+
+def resolve_profile(name=None):
+    """Определяет имя профиля: явно указанное, из переменной окружения или по умолчанию"""
+    name = name or os.environ.get(PROFILE_ENV_VAR) or DEFAULT_PROFILE
+    if name not in PROFILES:
+        raise ValueError(f"Неизвестный профиль базы данных: {name}. Доступные: {', '.join(PROFILES)}")
+    return name
+
+
+def apply_profile(conn, name):
+    """Применяет настройки профиля к соединению"""
+    for pragma, value in PROFILES[name].items():
+        conn.execute(f"PRAGMA {pragma} = {value}")
@@ -3,6 +3,26 @@ from tkinter import ttk, messagebox
 from tkcalendar import DateEntry
 import datetime
 
+from background_loader import BackgroundLoader
+from booking_model import BookingColumns, date_ordinal, filter_period
+from incremental_search import IncrementalSearch, SEARCH_DELAY_MS
+from virtual_tree import VirtualTreeview, ListSource, SeekSource
+
+# Количество строк оборудования, загружаемых за одну порцию
+EQUIPMENT_CHUNK_SIZE = 500
+
+# Количество бронирований, загружаемых в окно бронирований оборудования за один запрос при прокрутке
+BOOKINGS_PAGE_SIZE = 200
+
+# Значение столбца "Кем забронировано" для бронирований без указанного сотрудника
+BOOKED_BY_PLACEHOLDER = "Не указано"
+
+
+def _with_booked_by_placeholder(rows):
+    """Строки бронирований оборудования, в которых пустое поле "кем забронировано" заменено заглушкой"""
+    return [row[:-1] + (row[-1] or BOOKED_BY_PLACEHOLDER,) for row in rows]
+
+
 class EquipmentFrame(ttk.Frame):
     """Класс для отображения и управления разделом 'Оборудование'"""
     
@@ -11,6 +31,16 @@ class EquipmentFrame(ttk.Frame):
         self.parent = parent
         self.db = db
         
+        # Отложенный поиск и результат предыдущего поиска для сужения в памяти
+        self._search_job = None
+        self.incremental_search = IncrementalSearch()
+        
+        # Запросы списка выполняются в фоне, если база данных использует пул соединений
+        self.loader = BackgroundLoader(self, threaded=db.pooled)
+        
+        # Изменения оборудования, сделанные в любом разделе, приходят событиями хранилища
+        db.subscribe(self.on_data_changed, "equipment")
+        
         # Создаем и размещаем элементы интерфейса
         self._create_widgets()
         
@@ -51,7 +81,7 @@ class EquipmentFrame(ttk.Frame):
         
         ttk.Label(search_frame, text="Поиск:").pack(side=tk.LEFT, padx=5)
         self.search_var = tk.StringVar()
-        self.search_var.trace("w", lambda name, index, mode: self.filter_equipment_list())
+        self.search_var.trace("w", lambda name, index, mode: self.schedule_search())
         ttk.Entry(
             search_frame, 
             textvariable=self.search_var, 
@@ -62,14 +92,14 @@ class EquipmentFrame(ttk.Frame):
         table_frame = ttk.Frame(self)
         table_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
-        # Создаем Treeview для отображения данных оборудования
+        # Создаем виртуальный список: элементы Treeview создаются только для видимых строк
         columns = ('id', 'name', 'model', 'serial_number', 'status')
-        self.equipment_tree = ttk.Treeview(
+        self.equipment_view = VirtualTreeview(
             table_frame, 
             columns=columns, 
-            show='headings', 
             selectmode='browse'
         )
+        self.equipment_tree = self.equipment_view.tree
         
         # Устанавливаем заголовки столбцов
         self.equipment_tree.heading('id', text='ID')
@@ -88,12 +118,7 @@ class EquipmentFrame(ttk.Frame):
         # Привязываем двойной клик к открытию окна редактирования
         self.equipment_tree.bind('<Double-1>', self.on_equipment_double_click)
         
-        # Добавляем полосу прокрутки
-        scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=self.equipment_tree.yview)
-        self.equipment_tree.configure(yscrollcommand=scrollbar.set)
-        
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        self.equipment_tree.pack(fill=tk.BOTH, expand=True)
+        self.equipment_view.pack(fill=tk.BOTH, expand=True)
         
         # Добавляем контекстное меню
         self.context_menu = tk.Menu(self.equipment_tree, tearoff=0)
@@ -112,49 +137,118 @@ class EquipmentFrame(ttk.Frame):
         self.status_label = ttk.Label(info_frame, text="Всего оборудования: 0")
         self.status_label.pack(side=tk.LEFT, padx=5)
     
-    def load_equipment_data(self):
-        """Загружает данные об оборудовании из базы данных"""
-        # Очищаем таблицу
-        for i in self.equipment_tree.get_children():
-            self.equipment_tree.delete(i)
+    def load_equipment_data(self, narrow=False, keep_position=False):
+        """Загружает данные об оборудовании из базы данных с учетом строки поиска.
+
+        narrow=True разрешает получить результат сужением предыдущего поиска в памяти
+        (после изменения данных список нужно загружать заново), keep_position=True
+        сохраняет положение прокрутки и выделение.
+        """
+        search_text = self.search_var.get().strip()
+
+        if not narrow:
+            self.incremental_search.reset()
+
+        # Дописанный запрос сужает предыдущий результат без обращения к базе
+        data = self.incremental_search.narrow(search_text) if search_text else None
+        if data is not None:
+            self.loader.cancel()
+            self.equipment_view.set_source(ListSource(data), keep_position)
+            self._update_status()
+            return
+
+        def produce(cancelled):
+            # При поиске результат загружается целиком через полнотекстовый индекс вместе
+            # с текстом строк, полный список - порциями по мере чтения из базы
+            if search_text:
+                yield self.db.search_equipment(search_text, with_text=True)
+                return
+            success, total = self.db.count_equipment()
+            if not success:
+                yield False, total
+                return
+            for rows in self.db.iter_equipment(EQUIPMENT_CHUNK_SIZE):
+                if cancelled.is_set():
+                    return
+                yield True, (rows, total)
+
+        # Список хранится в памяти, в таблице - только видимые строки; при сохранении
+        # положения прокрутки старый список показывается до окончания загрузки
+        loaded = ListSource()
+
+        def show(chunk):
+            success, result = chunk
+            if not success:
+                show_error(result)
+                return
+            if search_text:
+                data = self.incremental_search.remember(search_text, result)
+                self.equipment_view.set_source(ListSource(data), keep_position)
+                self._update_status()
+                return
+
+            rows, total = result
+            loaded.data.extend(rows)
+            if not keep_position:
+                self.equipment_view.refresh()
+            self.status_label.config(text=f"Загружено оборудования: {loaded.count()} из {total}")
+
+        def finish():
+            if not search_text:
+                self.equipment_view.set_source(loaded, keep_position=True)
+                self._update_status()
+
+        def show_error(message):
+            self.status_label.config(text="Не удалось загрузить оборудование")
+            messagebox.showerror("Ошибка", f"Не удалось загрузить данные: {message}")
+
+        self.status_label.config(text="Загрузка оборудования...")
+        if not search_text and not keep_position:
+            self.equipment_view.set_source(loaded)
+        self.loader.start(produce, show, finish, show_error)
+
+    def on_data_changed(self, event):
+        """Показывает изменения оборудования (событие хранилища данных)"""
+        self.incremental_search.reset()
+        if event.reload or self.loader.busy:
+            self.load_equipment_data(keep_position=True)
+            return
         
-        # Загружаем данные
-        success, data = self.db.get_all_equipment()
+        if not self.search_var.get().strip():
+            # Список хранилища уже изменен: в таблице перерисуются только затронутые строки
+            self.equipment_view.set_source(ListSource(self.db.equipment_rows()), keep_position=True)
+            self._update_status()
+            return
         
-        if success:
-            # Заполняем таблицу данными
-            for item in data:
-                self.equipment_tree.insert('', 'end', values=item)
-            
-            # Обновляем информацию о количестве
-            self.status_label.config(text=f"Всего оборудования: {len(data)}")
+        # В результатах поиска удаленные строки убираются, остальные изменения требуют нового поиска
+        if event.added or event.updated or not all(
+            self.equipment_view.remove_row(equipment_id) for equipment_id in event.removed
+        ):
+            self.load_equipment_data(keep_position=True)
+        else:
+            self._update_status()
+
+    def _update_status(self):
+        """Обновляет информацию о количестве оборудования"""
+        shown = self.equipment_view.count()
+        if self.search_var.get().strip():
+            _, total = self.db.count_equipment()
+            self.status_label.config(text=f"Найдено оборудования: {shown} из {total}")
         else:
-            messagebox.showerror("Ошибка", f"Не удалось загрузить данные: {data}")
+            self.status_label.config(text=f"Всего оборудования: {shown}")
     
+    def schedule_search(self):
+        """Откладывает поиск до паузы в наборе текста"""
+        if self._search_job is not None:
+            self.after_cancel(self._search_job)
+        self._search_job = self.after(SEARCH_DELAY_MS, self.filter_equipment_list)
+
     def filter_equipment_list(self):
         """Фильтрует список оборудования по введенному тексту"""
-        search_text = self.search_var.get().lower()
-        
-        # Очищаем таблицу
-        for i in self.equipment_tree.get_children():
-            self.equipment_tree.delete(i)
-        
-        # Загружаем данные
-        success, data = self.db.get_all_equipment()
-        
-        if success:
-            # Фильтруем и заполняем таблицу данными
-            filtered_data = []
-            for item in data:
-                # Преобразуем все значения в строки и проверяем вхождение текста поиска
-                if any(search_text in str(value).lower() for value in item):
-                    self.equipment_tree.insert('', 'end', values=item)
-                    filtered_data.append(item)
-            
-            # Обновляем информацию о количестве
-            self.status_label.config(text=f"Найдено оборудования: {len(filtered_data)} из {len(data)}")
-        else:
-            messagebox.showerror("Ошибка", f"Не удалось загрузить данные: {data}")
+        if self._search_job is not None:
+            self.after_cancel(self._search_job)
+            self._search_job = None
+        self.load_equipment_data(narrow=True)
     
     def open_add_equipment_window(self):
         """Открывает окно для добавления нового оборудования"""
@@ -205,7 +299,6 @@ class EquipmentFrame(ttk.Frame):
             
             if success:
                 messagebox.showinfo("Успех", "Оборудование успешно удалено")
-                self.load_equipment_data()  # Перезагружаем данные
             else:
                 messagebox.showerror("Ошибка", f"Не удалось удалить оборудование: {error_message}")
     
@@ -221,15 +314,9 @@ class EquipmentFrame(ttk.Frame):
         equipment_id = self.equipment_tree.item(selected_item[0], 'values')[0]
         equipment_name = self.equipment_tree.item(selected_item[0], 'values')[1]
         
-        # Получаем данные о бронированиях из базы
-        success, bookings_data = self.db.get_equipment_bookings(equipment_id)
-        
-        if success:
-            # Открываем окно с бронированиями
-            booking_window = EquipmentBookingsWindow(self, equipment_id, equipment_name, bookings_data)
-            booking_window.grab_set()  # Делаем окно модальным
-        else:
-            messagebox.showerror("Ошибка", f"Не удалось получить данные о бронированиях: {bookings_data}")
+        # Открываем окно с бронированиями (данные загружаются в фоне)
+        booking_window = EquipmentBookingsWindow(self, self.db, equipment_id, equipment_name)
+        booking_window.grab_set()  # Делаем окно модальным
     
     def show_context_menu(self, event):
         """Показывает контекстное меню при нажатии правой кнопки мыши"""
@@ -384,7 +471,6 @@ class EquipmentWindow(tk.Toplevel):
             
             if success:
                 messagebox.showinfo("Успех", "Оборудование успешно добавлено")
-                self.parent.load_equipment_data()  # Обновляем данные в родительском окне
                 self.destroy()  # Закрываем окно
             else:
                 messagebox.showerror("Ошибка", f"Не удалось добавить оборудование: {result}")
@@ -397,22 +483,26 @@ class EquipmentWindow(tk.Toplevel):
             
             if success:
                 messagebox.showinfo("Успех", "Оборудование успешно обновлено")
-                self.parent.load_equipment_data()  # Обновляем данные в родительском окне
                 self.destroy()  # Закрываем окно
             else:
                 messagebox.showerror("Ошибка", f"Не удалось обновить оборудование: {error_message}")
 
 
 class EquipmentBookingsWindow(tk.Toplevel):
-    """Окно для просмотра бронирований оборудования"""
+    """Окно для просмотра бронирований оборудования.
+
+    Сначала загружаются последние бронирования и количество бронирований (всего,
+    предстоящих, прошедших); более ранние страницы загружаются по мере прокрутки.
+    """
     
-    def __init__(self, parent, equipment_id, equipment_name, bookings_data):
+    def __init__(self, parent, db, equipment_id, equipment_name):
         super().__init__(parent)
         
         self.parent = parent
+        self.db = db
         self.equipment_id = equipment_id
         self.equipment_name = equipment_name
-        self.bookings_data = bookings_data
+        self.loader = BackgroundLoader(self, threaded=db.pooled)
         
         # Настраиваем окно
         self.title(f"Бронирования для '{equipment_name}'")
@@ -432,20 +522,34 @@ class EquipmentBookingsWindow(tk.Toplevel):
             title_frame, 
             text=f"Бронирования для оборудования: {self.equipment_name}", 
             style="Header.TLabel"
-        ).pack(anchor=tk.W)
+        ).pack(side=tk.LEFT)
+        
+        # Фильтр по дате выполняется в базе данных
+        self.date_filter_var = tk.StringVar(value="Все даты")
+        date_filter = ttk.Combobox(
+            title_frame,
+            textvariable=self.date_filter_var,
+            values=["Все даты", "Сегодня", "Будущие", "Прошедшие"],
+            state="readonly",
+            width=15
+        )
+        date_filter.pack(side=tk.RIGHT, padx=5)
+        date_filter.bind("<<ComboboxSelected>>", lambda event: self.apply_date_filter())
+        ttk.Label(title_frame, text="Показать:").pack(side=tk.RIGHT)
         
         # Основная таблица бронирований
         table_frame = ttk.Frame(self, padding=10)
         table_frame.pack(fill=tk.BOTH, expand=True)
         
-        # Создаем Treeview для отображения бронирований
+        # Создаем виртуальный список: элементы Treeview создаются только для видимых строк
         columns = ('id', 'date', 'start_time', 'end_time', 'room', 'booked_by')
-        self.bookings_tree = ttk.Treeview(
+        self.bookings_view = VirtualTreeview(
             table_frame, 
             columns=columns, 
-            show='headings', 
+            row_tags=self._booking_tags,
             selectmode='browse'
         )
+        self.bookings_tree = self.bookings_view.tree
         
         # Устанавливаем заголовки столбцов
         self.bookings_tree.heading('id', text='ID')
@@ -463,65 +567,93 @@ class EquipmentBookingsWindow(tk.Toplevel):
         self.bookings_tree.column('room', width=100, anchor='center')
         self.bookings_tree.column('booked_by', width=200)
         
-        # Добавляем полосу прокрутки
-        scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=self.bookings_tree.yview)
-        self.bookings_tree.configure(yscrollcommand=scrollbar.set)
-        
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        self.bookings_tree.pack(fill=tk.BOTH, expand=True)
+        self.bookings_view.pack(fill=tk.BOTH, expand=True)
         
-        # Заполняем таблицу данными
-        self._fill_bookings_data()
+        # Настраиваем тег для прошедших бронирований
+        self.bookings_tree.tag_configure('past', foreground='gray')
         
-        # Кнопка закрытия
+        # Кнопка закрытия и количество бронирований
         button_frame = ttk.Frame(self, padding=10)
         button_frame.pack(fill=tk.X)
         
+        self.status_label = ttk.Label(button_frame, text="Загрузка бронирований...")
+        self.status_label.pack(side=tk.LEFT, padx=5)
+        
         ttk.Button(
             button_frame,
             text="Закрыть",
             command=self.destroy,
             width=15
         ).pack(side=tk.RIGHT, padx=5)
-    
-    def _fill_bookings_data(self):
-        """Заполняет таблицу данными о бронированиях"""
-        # Очищаем таблицу
-        for i in self.bookings_tree.get_children():
-            self.bookings_tree.delete(i)
         
         # Заполняем таблицу данными
-        if self.bookings_data:
-            today = datetime.datetime.now().date()
+        self.load_bookings_data()
+    
+    def load_bookings_data(self):
+        """Загружает в фоне количество бронирований и первую страницу за выбранный период"""
+        date_filter = self.date_filter_var.get()
+        date_from, date_to = filter_period(date_filter)
+        today = datetime.date.today()
+        
+        def produce(cancelled):
+            stats = self.db.get_equipment_booking_stats(self.equipment_id, today)
+            if cancelled.is_set():
+                return
+            yield stats, self.db.get_equipment_bookings_page(
+                self.equipment_id, BOOKINGS_PAGE_SIZE, date_from=date_from, date_to=date_to
+            )
+        
+        def show(chunk):
+            (stats_success, stats), (page_success, page) = chunk
+            if not stats_success or not page_success:
+                show_error(page if stats_success else stats)
+                return
             
-            for booking in self.bookings_data:
-                booking_id, booking_date, start_time, end_time, room, booked_by = booking
-                
-                # Проверяем, прошло ли бронирование
-                is_past = False
-                try:
-                    # Преобразуем строку даты в объект datetime
-                    booking_date_parts = booking_date.split('.')
-                    if len(booking_date_parts) == 3:
-                        day, month, year = map(int, booking_date_parts)
-                        booking_date_obj = datetime.date(year, month, day)
-                    elif booking_date.count('-') == 2:
-                        year, month, day = map(int, booking_date.split('-'))
-                        booking_date_obj = datetime.date(year, month, day)
-                    else:
-                        booking_date_obj = today  # Если не удалось распознать формат
-                    
-                    is_past = booking_date_obj < today
-                except Exception:
-                    pass  # Если возникла ошибка при преобразовании даты
-                
-                # Добавляем данные с соответствующим стилем (серый для прошедших бронирований)
-                item = self.bookings_tree.insert('', 'end', values=(
-                    booking_id, booking_date, start_time, end_time, room, booked_by if booked_by else "Не указано"
-                ))
-                
-                if is_past:
-                    self.bookings_tree.item(item, tags=('past',))
+            total, upcoming, past, today_count = stats
+            matched = {"Сегодня": today_count, "Будущие": upcoming, "Прошедшие": past}.get(date_filter, total)
             
-            # Настраиваем тег для прошедших бронирований
-            self.bookings_tree.tag_configure('past', foreground='gray')
+            def fetch(cursor, limit):
+                success, result = self.db.get_equipment_bookings_page(
+                    self.equipment_id, limit, cursor, date_from=date_from, date_to=date_to
+                )
+                if not success:
+                    return success, result
+                next_rows, next_cursor = result
+                return True, (_with_booked_by_placeholder(next_rows), next_cursor)
+            
+            rows, cursor = page
+            # Загруженные строки хранятся по столбцам: даты разбираются один раз
+            self.bookings_view.set_source(SeekSource(
+                fetch, matched, page_size=BOOKINGS_PAGE_SIZE, loaded=BookingColumns(),
+                first_page=_with_booked_by_placeholder(rows), cursor=cursor
+            ))
+            self._update_status(matched, stats)
+        
+        def show_error(message):
+            self.status_label.config(text="Не удалось загрузить бронирования")
+            messagebox.showerror("Ошибка", f"Не удалось получить данные о бронированиях: {message}", parent=self)
+        
+        self.status_label.config(text="Загрузка бронирований...")
+        self.loader.start(produce, show, on_error=show_error)
+    
+    def apply_date_filter(self):
+        """Показывает бронирования за выбранный период"""
+        self.load_bookings_data()
+    
+    def _update_status(self, matched, stats):
+        """Обновляет информацию о количестве бронирований"""
+        total, upcoming, past, _ = stats
+        text = f"Всего бронирований: {total} (предстоящих: {upcoming}, прошедших: {past})"
+        if matched != total:
+            text = f"Показано бронирований: {matched}. {text}"
+        self.status_label.config(text=text)
+    
+    @staticmethod
+    def _booking_tags(booking):
+        """Теги строки бронирования: прошедшие бронирования выделяются цветом"""
+        return ('past',) if date_ordinal(booking[1]) < datetime.date.today().toordinal() else ()
+    
+    def destroy(self):
+        """Закрывает окно, отменяя незавершенную загрузку"""
+        self.loader.close()
+        super().destroy()
@@ -0,0 +1,197 @@
+"""
+Модуль календаря загрузки оборудования по дням месяца (тепловая карта)
+"""
+import calendar
+import datetime
+import tkinter as tk
+from tkinter import ttk, messagebox
+
+from background_loader import BackgroundLoader
+from ui_styles import PRIMARY_COLOR, LIGHT_GREY, TEXT_COLOR, FONT_FAMILY, FONT_SIZE_SMALL, FONT_SIZE_NORMAL
+
+MONTH_NAMES = [
+    "Январь", "Февраль", "Март", "Апрель", "Май", "Июнь",
+    "Июль", "Август", "Сентябрь", "Октябрь", "Ноябрь", "Декабрь"
+]
+WEEKDAY_NAMES = ["Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс"]
+
+# Размеры клеток календаря в пикселях
+CELL_WIDTH = 96
+CELL_HEIGHT = 64
+HEADER_HEIGHT = 24
+
+# Цвета клетки без бронирований и клетки с полной загрузкой
+EMPTY_COLOR = "#f8fafc"
+FULL_COLOR = PRIMARY_COLOR
+
+
+def _blend(start_color, end_color, ratio):
+    """Цвет между двумя цветами #rrggbb в пропорции ratio (0..1)"""
+    ratio = max(0.0, min(1.0, ratio))
+    start = [int(start_color[i:i + 2], 16) for i in (1, 3, 5)]
+    end = [int(end_color[i:i + 2], 16) for i in (1, 3, 5)]
+    return "#" + "".join(f"{round(a + (b - a) * ratio):02x}" for a, b in zip(start, end))
+
+
+class UtilizationFrame(ttk.Frame):
+    """Класс для отображения раздела 'Загрузка по дням': календарь месяца, в котором
+    цвет дня показывает долю забронированного рабочего времени доступного оборудования.
+
+    Данные месяца загружаются одним агрегирующим запросом (Database.get_daily_utilization);
+    клетки календаря создаются один раз и при смене месяца только перекрашиваются.
+    """
+
+    def __init__(self, parent, db, on_day_selected=None):
+        """on_day_selected(date) вызывается при щелчке по дню календаря"""
+        super().__init__(parent)
+        self.parent = parent
+        self.db = db
+        self.on_day_selected = on_day_selected
+
+        today = datetime.date.today()
+        self.month = datetime.date(today.year, today.month, 1)
+        self._cells = []
+        self._cell_dates = {}
+        self._reload_job = None
+
+        # Данные месяца загружаются в фоне, если база данных использует пул соединений
+        self.loader = BackgroundLoader(self, threaded=db.pooled)
+
+        # После изменения данных в любом разделе данные загружаются заново
+        db.subscribe(self.on_data_changed)
+
+        # Создаем и размещаем элементы интерфейса
+        self._create_widgets()
+
+        # Загружаем данные при инициализации
+        self.load_month()
+
+    def _create_widgets(self):
+        """Создает все виджеты для раздела загрузки по дням"""
+        # Верхняя панель с выбором месяца
+        control_frame = ttk.Frame(self)
+        control_frame.pack(fill=tk.X, padx=10, pady=10)
+
+        ttk.Label(
+            control_frame,
+            text="Загрузка оборудования по дням",
+            style="Header.TLabel"
+        ).pack(side=tk.LEFT, padx=5)
+
+        ttk.Button(control_frame, text="Обновить", command=self.load_month).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(control_frame, text="▶", width=3, command=lambda: self.shift_month(1)).pack(side=tk.RIGHT, padx=5)
+        self.month_label = ttk.Label(
+            control_frame, width=16, anchor=tk.CENTER, font=(FONT_FAMILY, FONT_SIZE_NORMAL, "bold")
+        )
+        self.month_label.pack(side=tk.RIGHT)
+        ttk.Button(control_frame, text="◀", width=3, command=lambda: self.shift_month(-1)).pack(side=tk.RIGHT, padx=5)
+
+        # Календарь: 7 дней недели и до 6 недель месяца
+        self.canvas = tk.Canvas(
+            self, width=CELL_WIDTH * 7 + 1, height=HEADER_HEIGHT + CELL_HEIGHT * 6 + 1,
+            background="white", highlightthickness=0
+        )
+        self.canvas.pack(padx=10, pady=5)
+
+        for column, name in enumerate(WEEKDAY_NAMES):
+            self.canvas.create_text(
+                column * CELL_WIDTH + CELL_WIDTH // 2, HEADER_HEIGHT // 2, text=name,
+                fill=TEXT_COLOR, font=(FONT_FAMILY, FONT_SIZE_SMALL, "bold")
+            )
+        for week in range(6):
+            for column in range(7):
+                x, y = column * CELL_WIDTH, HEADER_HEIGHT + week * CELL_HEIGHT
+                rectangle = self.canvas.create_rectangle(
+                    x, y, x + CELL_WIDTH, y + CELL_HEIGHT, outline=LIGHT_GREY, tags=("day",)
+                )
+                day = self.canvas.create_text(
+                    x + 6, y + 4, anchor=tk.NW, font=(FONT_FAMILY, FONT_SIZE_SMALL, "bold"), tags=("day",)
+                )
+                value = self.canvas.create_text(
+                    x + CELL_WIDTH // 2, y + CELL_HEIGHT // 2 + 8, font=(FONT_FAMILY, FONT_SIZE_SMALL), tags=("day",)
+                )
+                self._cells.append((rectangle, day, value))
+
+        self.canvas.tag_bind("day", "<Button-1>", self._on_day_click)
+
+        # Информация внизу
+        info_frame = ttk.Frame(self)
+        info_frame.pack(fill=tk.X, padx=10, pady=5)
+
+        self.status_label = ttk.Label(info_frame, text="")
+        self.status_label.pack(side=tk.LEFT, padx=5)
+
+    def shift_month(self, months):
+        """Переходит на несколько месяцев вперед или назад"""
+        index = self.month.year * 12 + self.month.month - 1 + months
+        self.month = datetime.date(index // 12, index % 12 + 1, 1)
+        self.load_month()
+
+    def load_month(self):
+        """Загружает загрузку оборудования по дням выбранного месяца"""
+        month = self.month
+
+        def produce(cancelled):
+            yield self.db.get_daily_utilization(month)
+
+        def show(chunk):
+            success, result = chunk
+            if not success:
+                show_error(result)
+                return
+            self._show_month(month, {row[0]: row for row in result})
+
+        def show_error(message):
+            self.status_label.config(text="Не удалось загрузить данные")
+            messagebox.showerror("Ошибка", f"Не удалось загрузить данные: {message}")
+
+        self.month_label.config(text=f"{MONTH_NAMES[month.month - 1]} {month.year}")
+        self.status_label.config(text="Загрузка данных...")
+        self.loader.start(produce, show, on_error=show_error)
+
+    def on_data_changed(self, event):
+        """Обновляет календарь загрузки после изменения данных (событие хранилища);
+        несколько изменений подряд вызывают одну загрузку"""
+        if self._reload_job is None:
+            self._reload_job = self.after_idle(self._reload)
+
+    def _reload(self):
+        """Выполняет отложенную загрузку после изменения данных"""
+        self._reload_job = None
+        self.load_month()
+
+    def _show_month(self, month, days):
+        """Перекрашивает клетки календаря по данным месяца (дата ISO -> строка статистики)"""
+        self._cell_dates = {}
+        first_weekday, day_count = calendar.monthrange(month.year, month.month)
+        for index, (rectangle, day, value) in enumerate(self._cells):
+            number = index - first_weekday + 1
+            if not 1 <= number <= day_count:
+                self.canvas.itemconfigure(rectangle, fill="white")
+                self.canvas.itemconfigure(day, text="")
+                self.canvas.itemconfigure(value, text="")
+                continue
+
+            date = month.replace(day=number)
+            row = days.get(date.isoformat())
+            ratio = row[3] if row else 0.0
+            text_color = "white" if ratio > 0.5 else TEXT_COLOR
+            self.canvas.itemconfigure(rectangle, fill=_blend(EMPTY_COLOR, FULL_COLOR, ratio))
+            self.canvas.itemconfigure(day, text=str(number), fill=text_color)
+            self.canvas.itemconfigure(value, text=f"{ratio:.0%}" if row else "", fill=text_color)
+            for item in (rectangle, day, value):
+                self._cell_dates[item] = date
+
+        bookings = sum(row[1] for row in days.values())
+        hours = sum(row[2] for row in days.values()) / 60
+        self.status_label.config(
+            text=f"Бронирований за месяц: {bookings}, забронировано часов: {hours:.0f}. "
+                 f"Щелкните по дню, чтобы показать его бронирования"
+        )
+
+    def _on_day_click(self, event):
+        """Передает выбранный день обработчику (фильтр списка бронирований)"""
+        item = self.canvas.find_withtag("current")
+        date = self._cell_dates.get(item[0]) if item else None
+        if date is not None and self.on_day_selected:
+            self.on_day_selected(date)
@@ -0,0 +1,78 @@
+"""
+Модуль пошагового поиска: сужение предыдущего результата в памяти при дописывании запроса
+"""
+import re
+import unicodedata
+
+# Задержка поиска после последнего нажатия клавиши в миллисекундах
+SEARCH_DELAY_MS = 300
+
+# Максимальное количество строк результата, которое хранится для сужения в памяти
+NARROW_MAX_ROWS = 5000
+
+
+def search_words(text):
+    """Слова текста в нижнем регистре, как их выделяет токенизатор FTS5 unicode61.
+
+    Диакритические знаки удаляются только у латинских букв (ё и й остаются
+    отдельными буквами, как и в индексе базы данных).
+    """
+    folded = []
+    for char in text.lower():
+        if char < "\u0250":
+            char = "".join(part for part in unicodedata.normalize("NFD", char) if not unicodedata.combining(part))
+        folded.append(char)
+    return re.findall(r"\w+", "".join(folded))
+
+
+def _extends(words, previous_words):
+    """Проверяет, что запрос words получен дописыванием запроса previous_words"""
+    if not previous_words or len(words) < len(previous_words):
+        return False
+    last = len(previous_words) - 1
+    return words[:last] == previous_words[:last] and words[last].startswith(previous_words[last])
+
+
+class IncrementalSearch:
+    """Результат последнего поиска вместе с текстом строк.
+
+    Поиск в базе данных ищет каждое слово запроса как префикс, поэтому при
+    дописывании запроса новый результат - подмножество предыдущего и его
+    можно получить фильтрацией в памяти без запроса к базе.
+    """
+
+    def __init__(self, max_rows=NARROW_MAX_ROWS):
+        self.max_rows = max_rows
+        self.reset()
+
+    def reset(self):
+        """Забывает сохраненный результат (например, после изменения данных)"""
+        self._context = None
+        self._words = None
+        self._entries = None
+
+    def remember(self, query, rows, context=None):
+        """Сохраняет полный результат поиска; последний столбец строк - текст для поиска.
+
+        context - прочие условия выборки (например, период), при которых результат верен.
+        Возвращает строки без столбца текста.
+        """
+        entries = [(row[:-1], search_words(row[-1])) for row in rows]
+        if len(entries) <= self.max_rows:
+            self._context, self._words, self._entries = context, search_words(query), entries
+        else:
+            self.reset()
+        return [row for row, _ in entries]
+
+    def narrow(self, query, context=None):
+        """Возвращает строки для запроса, полученного дописыванием предыдущего, или None"""
+        words = search_words(query)
+        if self._entries is None or context != self._context or not _extends(words, self._words):
+            return None
+
+        self._entries = [
+            (row, tokens) for row, tokens in self._entries
+            if all(any(token.startswith(word) for token in tokens) for word in words)
+        ]
+        self._words = words
+        return [row for row, _ in self._entries]
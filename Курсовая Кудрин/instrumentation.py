@@ -0,0 +1,228 @@
+"""
+Модуль сбора статистики выполнения запросов к базе данных и журнала медленных запросов.
+
+Статистика включается передачей QueryStats в Database(stats=...) или через
+переменные окружения (см. stats_from_environment):
+    VR_DB_STATS     - путь к JSON-файлу, в который сохраняется статистика при закрытии
+    VR_DB_SLOW_LOG  - путь к журналу медленных запросов
+    VR_DB_SLOW_MS   - порог медленного запроса в миллисекундах (по умолчанию 100)
+
+Отметки времени запуска приложения (StartupTimer) дописываются в журнал,
+путь к которому задает переменная окружения VR_STARTUP_LOG.
+"""
+import functools
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+STATS_ENV_VAR = "VR_DB_STATS"
+SLOW_LOG_ENV_VAR = "VR_DB_SLOW_LOG"
+SLOW_MS_ENV_VAR = "VR_DB_SLOW_MS"
+STARTUP_LOG_ENV_VAR = "VR_STARTUP_LOG"
+
+# Операторы, для которых в журнал медленных запросов записывается план выполнения
+_EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")
+
+
+def _percentile(sorted_values, fraction):
+    """Перцентиль по методу ближайшего ранга для отсортированного списка"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class _MethodStats:
+    """Счетчики и выборка длительностей вызовов одного метода"""
+
+    __slots__ = ("calls", "errors", "total_ms", "max_ms", "samples")
+
+    def __init__(self, max_samples):
+        self.calls = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.samples = deque(maxlen=max_samples)
+
+    def summary(self):
+        """Сводка по методу в миллисекундах"""
+        samples = sorted(self.samples)
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "total_ms": round(self.total_ms, 3),
+            "mean_ms": round(self.total_ms / self.calls, 3) if self.calls else 0.0,
+            "p50_ms": round(_percentile(samples, 0.50), 3),
+            "p95_ms": round(_percentile(samples, 0.95), 3),
+            "p99_ms": round(_percentile(samples, 0.99), 3),
+            "max_ms": round(self.max_ms, 3),
+        }
+
+
+class QueryStats:
+    """Статистика вызовов методов Database и журнал медленных SQL-запросов"""
+
+    def __init__(self, slow_threshold_ms=100, slow_log_path=None, json_path=None, max_samples=10000):
+        self.slow_threshold_ms = slow_threshold_ms
+        self.slow_log_path = slow_log_path
+        self.json_path = json_path
+        self.max_samples = max_samples
+        self.explain = None
+        self._methods = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def trace(self, statement):
+        """Обработчик sqlite3 set_trace_callback: запоминает запросы текущего вызова"""
+        statements = getattr(self._local, "statements", None)
+        # Строки, начинающиеся с "--", - внутренние запросы триггеров и FTS5;
+        # при срабатывании триггеров исходный запрос передается повторно
+        if statements is None or statement.startswith("--"):
+            return
+        if statements and statements[-1][1] == statement:
+            return
+        statements.append((time.perf_counter(), statement))
+
+    def wrap(self, name, method):
+        """Оборачивает метод замером времени выполнения"""
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            # Запросы собирает только внешний вызов, вложенные вызовы лишь учитываются в статистике
+            outermost = getattr(self._local, "statements", None) is None
+            if outermost:
+                self._local.statements = []
+            failed = False
+            started = time.perf_counter()
+            try:
+                result = method(*args, **kwargs)
+                failed = isinstance(result, tuple) and len(result) == 2 and result[0] is False
+                return result
+            except BaseException:
+                failed = True
+                raise
+            finally:
+                finished = time.perf_counter()
+                statements = None
+                if outermost:
+                    statements, self._local.statements = self._local.statements, None
+                self.record(name, (finished - started) * 1000, failed)
+                if statements:
+                    self._log_slow_statements(name, statements, finished)
+        return wrapper
+
+    def record(self, name, duration_ms, failed=False):
+        """Учитывает один вызов метода"""
+        with self._lock:
+            stats = self._methods.get(name)
+            if stats is None:
+                stats = self._methods[name] = _MethodStats(self.max_samples)
+            stats.calls += 1
+            stats.errors += failed
+            stats.total_ms += duration_ms
+            stats.max_ms = max(stats.max_ms, duration_ms)
+            stats.samples.append(duration_ms)
+
+    def _log_slow_statements(self, method_name, statements, finished):
+        """Записывает в журнал запросы, выполнявшиеся дольше порога.
+
+        Длительность запроса оценивается как время до начала следующего запроса
+        (или до завершения метода), то есть включает получение результатов.
+        """
+        if not self.slow_log_path:
+            return
+
+        entries = []
+        for index, (started, statement) in enumerate(statements):
+            ended = statements[index + 1][0] if index + 1 < len(statements) else finished
+            duration_ms = (ended - started) * 1000
+            if duration_ms >= self.slow_threshold_ms:
+                entries.append((duration_ms, statement))
+
+        if not entries:
+            return
+
+        lines = []
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        for duration_ms, statement in entries:
+            lines.append(f"[{timestamp}] {method_name}: {duration_ms:.1f} мс")
+            lines.append(" ".join(statement.split()))
+            if self.explain and statement.lstrip().upper().startswith(_EXPLAINABLE):
+                try:
+                    for row in self.explain(statement):
+                        lines.append(f"    ПЛАН: {row[-1]}")
+                except sqlite3.Error as e:
+                    lines.append(f"    ПЛАН недоступен: {e}")
+            lines.append("")
+
+        with self._lock:
+            with open(self.slow_log_path, "a", encoding="utf-8") as log_file:
+                log_file.write("\n".join(lines) + "\n")
+
+    def summary(self):
+        """Сводка по всем методам: число вызовов, ошибки и перцентили длительности"""
+        with self._lock:
+            return {name: stats.summary() for name, stats in sorted(self._methods.items())}
+
+    def dump_json(self, path=None):
+        """Сохраняет сводку в JSON-файл (по умолчанию - в json_path)"""
+        path = path or self.json_path
+        if not path:
+            return
+        with open(path, "w", encoding="utf-8") as json_file:
+            json.dump(self.summary(), json_file, ensure_ascii=False, indent=2)
+
+
+def stats_from_environment():
+    """Создает QueryStats по переменным окружения или возвращает None, если сбор не включен"""
+    json_path = os.environ.get(STATS_ENV_VAR)
+    slow_log_path = os.environ.get(SLOW_LOG_ENV_VAR)
+    if not json_path and not slow_log_path:
+        return None
+    return QueryStats(
+        slow_threshold_ms=float(os.environ.get(SLOW_MS_ENV_VAR, 100)),
+        slow_log_path=slow_log_path,
+        json_path=json_path,
+    )
+
+
+class StartupTimer:
+    """Отметки времени запуска приложения в миллисекундах от создания объекта.
+
+    Главное окно отмечает этапы запуска (открытие базы данных, первая отрисовка,
+    загрузка данных первой вкладки - готовность к работе); отметки сохраняются
+    в журнал, если указан log_path.
+    """
+
+    def __init__(self, log_path=None):
+        self.log_path = log_path
+        self.marks = {}
+        self._started = time.perf_counter()
+
+    def mark(self, name):
+        """Запоминает время этапа (повторная отметка этапа не меняет его время)"""
+        if name not in self.marks:
+            self.marks[name] = (time.perf_counter() - self._started) * 1000
+        return self.marks[name]
+
+    def elapsed(self, name):
+        """Время этапа в миллисекундах или None, если этап еще не наступил"""
+        return self.marks.get(name)
+
+    def write_log(self, path=None):
+        """Дописывает отметки в журнал запуска (по умолчанию - в log_path)"""
+        path = path or self.log_path
+        if not path:
+            return
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        marks = ", ".join(f"{name}: {elapsed_ms:.1f} мс" for name, elapsed_ms in self.marks.items())
+        with open(path, "a", encoding="utf-8") as log_file:
+            log_file.write(f"[{timestamp}] {marks}\n")
+
+
+def startup_timer_from_environment():
+    """Создает StartupTimer с журналом из переменной окружения VR_STARTUP_LOG (если она задана)"""
+    return StartupTimer(log_path=os.environ.get(STARTUP_LOG_ENV_VAR))
@@ -6,20 +6,50 @@ from datetime import datetime
 
 # Импортируем модули приложения
 from database import Database
+from db_profiles import PROFILE_ENV_VAR
+from data_store import DataStore
+from change_watcher import ChangeWatcher
 from equipment import EquipmentFrame
 from booking import BookingFrame
+from timeline import TimelineFrame
+from heatmap import UtilizationFrame
 from ui_styles import configure_styles
 from data_generator import show_generator_dialog
+from instrumentation import stats_from_environment, startup_timer_from_environment
+
+# Интервал проверки окончания первой загрузки данных вкладки в миллисекундах
+STARTUP_POLL_MS = 10
+
+# Профиль базы данных программы: файл лаборатории находится на общем сетевом диске,
+# где WAL небезопасен (другой профиль можно выбрать переменной окружения VR_DB_PROFILE)
+APP_DB_PROFILE = "shared-drive"
 
 
 class VREquipmentApp(tk.Tk):
     """Основной класс приложения для учета и бронирования VR-оборудования"""
 
-    def __init__(self):
+    def __init__(self, db_name="vr_equipment.db", startup=None):
+        """startup - instrumentation.StartupTimer для отметок этапов запуска
+        (по умолчанию создается по переменной окружения VR_STARTUP_LOG)"""
+        self.startup = startup or startup_timer_from_environment()
         super().__init__()
 
-        # Инициализация базы данных
-        self.db = Database()
+        # Инициализация базы данных (пул соединений позволяет читать данные из фоновых потоков)
+        # Статистика запросов собирается, если она включена переменными окружения VR_DB_STATS / VR_DB_SLOW_LOG
+        self.db = Database(
+            db_name, pooled=True, profile=os.environ.get(PROFILE_ENV_VAR) or APP_DB_PROFILE,
+            stats=stats_from_environment()
+        )
+        self.startup.mark("database_opened")
+
+        # Разделы работают с данными через общее хранилище: изменение, сделанное в одном
+        # разделе, событием передается остальным
+        self.store = DataStore(self.db)
+
+        # Изменения, сделанные другими пользователями того же файла базы, раз в несколько
+        # секунд передаются открытым разделам
+        self.watcher = ChangeWatcher(self, self.store)
+        self.watcher.start()
 
         # Настройка основного окна
         self.title("Учет и бронирование VR-оборудования")
@@ -36,8 +66,9 @@ class VREquipmentApp(tk.Tk):
         # Создаем меню
         self._create_menu()
 
-        # Создаем и размещаем виджеты
+        # Создаем и размещаем виджеты (разделы создаются при первом открытии вкладки)
         self._create_widgets()
+        self.startup.mark("window_created")
 
         # Обработка закрытия окна
         self.protocol("WM_DELETE_WINDOW", self._on_close)
@@ -81,7 +112,7 @@ class VREquipmentApp(tk.Tk):
 
     def _show_data_generator(self):
         """Открывает окно генерации тестовых данных"""
-        show_generator_dialog(self, self.db)
+        show_generator_dialog(self, self.store)
 
     def _create_widgets(self):
         """Создание всех виджетов приложения"""
@@ -105,17 +136,39 @@ class VREquipmentApp(tk.Tk):
         self.datetime_label.pack(side=tk.RIGHT, padx=5)
         self._update_datetime()
 
-        # Создаем вкладки
+        # Создаем вкладки: раздел создается и загружает данные при первом открытии вкладки,
+        # поэтому при запуске запрашиваются только данные видимой вкладки и только после
+        # первой отрисовки окна
         self.notebook = ttk.Notebook(main_frame)
         self.notebook.pack(fill=tk.BOTH, expand=True, padx=5, pady=10)
-
-        # Вкладка "Оборудование"
-        self.equipment_frame = EquipmentFrame(self.notebook, self.db)
-        self.notebook.add(self.equipment_frame, text="Оборудование")
-
-        # Вкладка "Бронирование"
-        self.booking_frame = BookingFrame(self.notebook, self.db)
-        self.notebook.add(self.booking_frame, text="Бронирование")
+        self.notebook.bind("<<NotebookTabChanged>>", lambda event: self._build_tab(self.notebook.select()))
+        self._lazy_tabs = {}
+
+        self.equipment_frame = None
+        self.equipment_tab = self._add_tab(
+            "Оборудование", "equipment_frame", lambda parent: EquipmentFrame(parent, self.store)
+        )
+
+        self.booking_frame = None
+        self.booking_tab = self._add_tab(
+            "Бронирование", "booking_frame", lambda parent: BookingFrame(parent, self.store)
+        )
+
+        self.timeline_frame = None
+        self.timeline_tab = self._add_tab(
+            "Расписание дня", "timeline_frame", lambda parent: TimelineFrame(parent, self.store)
+        )
+
+        # Щелчок по дню календаря загрузки открывает его бронирования
+        self.utilization_frame = None
+        self.utilization_tab = self._add_tab(
+            "Загрузка по дням", "utilization_frame",
+            lambda parent: UtilizationFrame(parent, self.store, on_day_selected=self._show_bookings_for_date)
+        )
+
+        # Событие смены вкладки при запуске может прийти позже; первая вкладка создается
+        # в главном цикле в любом случае
+        self.after_idle(lambda: self._build_tab(self.notebook.select()))
 
         # Статусная строка
         status_frame = ttk.Frame(main_frame)
@@ -135,6 +188,51 @@ class VREquipmentApp(tk.Tk):
             width=10
         ).pack(side=tk.RIGHT, padx=5)
 
+    def _add_tab(self, title, attribute, create):
+        """Добавляет вкладку-заготовку; раздел create(контейнер) создается при первом
+        открытии вкладки и сохраняется в атрибуте attribute"""
+        container = ttk.Frame(self.notebook)
+        ttk.Label(container, text="Загрузка раздела...").pack(expand=True)
+        self.notebook.add(container, text=title)
+        self._lazy_tabs[str(container)] = (container, attribute, create)
+        return container
+
+    def _build_tab(self, tab):
+        """Создает раздел вкладки, если он еще не создан"""
+        entry = self._lazy_tabs.pop(str(tab), None)
+        if entry is None:
+            return
+        container, attribute, create = entry
+        first = not self.startup.elapsed("first_paint")
+
+        # Окно отрисовывается до первого запроса к базе данных
+        self.update_idletasks()
+        self.startup.mark("first_paint")
+
+        for child in container.winfo_children():
+            child.destroy()
+        frame = create(container)
+        frame.pack(fill=tk.BOTH, expand=True)
+        setattr(self, attribute, frame)
+        self._wait_for_tab_data(frame, attribute, first)
+
+    def _wait_for_tab_data(self, frame, attribute, first):
+        """Отмечает окончание первой загрузки данных раздела; загрузка первой открытой
+        вкладки - готовность приложения к работе"""
+        if frame.loader.busy:
+            self.after(STARTUP_POLL_MS, lambda: self._wait_for_tab_data(frame, attribute, first))
+            return
+        self.startup.mark(f"{attribute}_loaded")
+        if first:
+            self.startup.mark("interactive")
+            self.startup.write_log()
+
+    def _show_bookings_for_date(self, date):
+        """Переключается на вкладку бронирований с фильтром по указанной дате"""
+        self.notebook.select(self.booking_tab)
+        self._build_tab(self.booking_tab)
+        self.booking_frame.show_date(date)
+
     def _update_datetime(self):
         """Обновляет информацию о текущей дате и времени"""
         now = datetime.now()
@@ -158,7 +256,16 @@ class VREquipmentApp(tk.Tk):
         - Указание кабинета и ответственного лица
         - Управление существующими бронированиями
 
+        Раздел "Расписание дня":
+        - Занятость всего оборудования за выбранный день на шкале 08:00-21:00
+        - Изменение масштаба шкалы кнопками "+" и "−"
+
+        Раздел "Загрузка по дням":
+        - Календарь месяца, цвет дня показывает долю занятого времени оборудования
+        - Щелчок по дню показывает его бронирования в разделе "Бронирование"
+
         Дополнительные функции:
+        - Изменения, сделанные другими пользователями общей базы данных, появляются автоматически
         - Генерация тестовых данных доступна через меню "Инструменты" -> "Генерация тестовых данных"
         - Справочная информация доступна через меню "Справка" -> "Руководство пользователя"
         - Информация о программе доступна через меню "Файл" -> "О программе"
@@ -205,7 +312,12 @@ class VREquipmentApp(tk.Tk):
     def _on_close(self):
         """Обработчик закрытия приложения"""
         # Закрываем соединение с базой данных
+        if hasattr(self, 'watcher'):
+            self.watcher.stop()
         if hasattr(self, 'db'):
+            # Сохраняем статистику запросов, если она собиралась
+            if self.db.stats:
+                self.db.stats.dump_json()
             self.db.close()
 
         # Закрываем приложение
@@ -0,0 +1,339 @@
+"""
+Модуль версионных миграций схемы базы данных VR-оборудования.
+
+Текущая версия схемы хранится в PRAGMA user_version. Каждая миграция
+выполняется в отдельной транзакции вместе с обновлением номера версии,
+поэтому прерванное обновление не оставляет базу в промежуточном состоянии.
+"""
+from date_utils import to_iso_date, to_minutes
+
+
+def _create_base_tables(conn):
+    """Миграция 1: исходные таблицы оборудования и бронирования"""
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS equipment (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        model TEXT NOT NULL,
+        serial_number TEXT,
+        description TEXT,
+        purchase_date TEXT,
+        status TEXT DEFAULT 'Доступно'
+    )
+    ''')
+
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS booking (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        equipment_id INTEGER NOT NULL,
+        booking_date TEXT NOT NULL,
+        start_time TEXT NOT NULL,
+        end_time TEXT NOT NULL,
+        room TEXT NOT NULL,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        booked_by TEXT,
+        notes TEXT,
+        FOREIGN KEY (equipment_id) REFERENCES equipment (id) ON DELETE CASCADE
+    )
+    ''')
+
+
+def _convert_booking_dates(conn):
+    """Миграция 2: даты в формате ISO, время в минутах от полуночи и индексы.
+
+    Бронирования, дату или время которых не удалось разобрать, переносятся
+    в таблицу booking_unconverted вместо сохранения неверного времени.
+    """
+    conn.execute('''
+    CREATE TABLE booking_new (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        equipment_id INTEGER NOT NULL,
+        booking_date TEXT NOT NULL,
+        start_minute INTEGER NOT NULL,
+        end_minute INTEGER NOT NULL,
+        room TEXT NOT NULL,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        booked_by TEXT,
+        notes TEXT,
+        FOREIGN KEY (equipment_id) REFERENCES equipment (id) ON DELETE CASCADE
+    )
+    ''')
+
+    # Строки с нераспознанной датой или временем не переносятся, а сохраняются
+    # без изменений в booking_unconverted, чтобы их можно было исправить вручную
+    conn.execute('''
+    CREATE TABLE booking_unconverted (
+        id INTEGER PRIMARY KEY,
+        equipment_id INTEGER,
+        booking_date TEXT,
+        start_time TEXT,
+        end_time TEXT,
+        room TEXT,
+        created_at TEXT,
+        booked_by TEXT,
+        notes TEXT
+    )
+    ''')
+
+    rows = conn.execute('''
+        SELECT id, equipment_id, booking_date, start_time, end_time, room, created_at, booked_by, notes
+        FROM booking
+    ''').fetchall()
+
+    converted = []
+    unconverted = []
+    for row in rows:
+        booking_id, equipment_id, booking_date, start_time, end_time, room, created_at, booked_by, notes = row
+        iso_date = to_iso_date(booking_date)
+        start_minute = to_minutes(start_time)
+        end_minute = to_minutes(end_time)
+        if iso_date is None or start_minute is None or end_minute is None:
+            unconverted.append(row)
+            continue
+        converted.append((
+            booking_id, equipment_id, iso_date, start_minute, end_minute, room, created_at, booked_by, notes
+        ))
+
+    conn.executemany("INSERT INTO booking_unconverted VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", unconverted)
+    conn.executemany(
+        """INSERT INTO booking_new
+           (id, equipment_id, booking_date, start_minute, end_minute, room, created_at, booked_by, notes)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        converted
+    )
+
+    conn.execute("DROP TABLE booking")
+    conn.execute("ALTER TABLE booking_new RENAME TO booking")
+
+    conn.execute(
+        "CREATE INDEX idx_booking_equipment_date ON booking (equipment_id, booking_date, start_minute)"
+    )
+    conn.execute("CREATE INDEX idx_booking_date ON booking (booking_date)")
+
+
+def _add_sort_indexes(conn):
+    """Миграция 3: индексы в порядке вывода списков для постраничной выборки"""
+    conn.execute("CREATE INDEX idx_booking_order ON booking (booking_date DESC, start_minute, id)")
+    conn.execute("CREATE INDEX idx_equipment_name ON equipment (name, id)")
+
+
+def _add_full_text_search(conn):
+    """Миграция 4: полнотекстовый поиск FTS5 по оборудованию и бронированиям"""
+    # Оборудование индексируется по внешнему содержимому таблицы equipment
+    conn.execute('''
+    CREATE VIRTUAL TABLE equipment_fts USING fts5(
+        name, model, serial_number, description,
+        content='equipment', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    ''')
+    # В индекс бронирований включены название и модель оборудования и дата в формате интерфейса,
+    # поэтому он хранит собственную копию текста
+    conn.execute('''
+    CREATE VIRTUAL TABLE booking_fts USING fts5(
+        equipment, booking_date, room, booked_by, notes,
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    ''')
+
+    conn.execute('''
+    CREATE TRIGGER equipment_fts_insert AFTER INSERT ON equipment BEGIN
+        INSERT INTO equipment_fts (rowid, name, model, serial_number, description)
+        VALUES (new.id, new.name, new.model, new.serial_number, new.description);
+    END
+    ''')
+
+    conn.execute('''
+    CREATE TRIGGER equipment_fts_delete AFTER DELETE ON equipment BEGIN
+        INSERT INTO equipment_fts (equipment_fts, rowid, name, model, serial_number, description)
+        VALUES ('delete', old.id, old.name, old.model, old.serial_number, old.description);
+    END
+    ''')
+
+    conn.execute('''
+    CREATE TRIGGER equipment_fts_update AFTER UPDATE ON equipment BEGIN
+        INSERT INTO equipment_fts (equipment_fts, rowid, name, model, serial_number, description)
+        VALUES ('delete', old.id, old.name, old.model, old.serial_number, old.description);
+        INSERT INTO equipment_fts (rowid, name, model, serial_number, description)
+        VALUES (new.id, new.name, new.model, new.serial_number, new.description);
+    END
+    ''')
+
+    conn.execute('''
+    CREATE TRIGGER equipment_fts_update_bookings AFTER UPDATE OF name, model ON equipment BEGIN
+        UPDATE booking_fts SET equipment = new.name || ' ' || new.model
+        WHERE rowid IN (SELECT id FROM booking WHERE equipment_id = new.id);
+    END
+    ''')
+
+    conn.execute('''
+    CREATE TRIGGER booking_fts_insert AFTER INSERT ON booking BEGIN
+        INSERT INTO booking_fts (rowid, equipment, booking_date, room, booked_by, notes)
+        SELECT new.id, e.name || ' ' || e.model, strftime('%d.%m.%Y', new.booking_date),
+               new.room, new.booked_by, new.notes
+        FROM equipment e WHERE e.id = new.equipment_id;
+    END
+    ''')
+
+    conn.execute('''
+    CREATE TRIGGER booking_fts_delete AFTER DELETE ON booking BEGIN
+        DELETE FROM booking_fts WHERE rowid = old.id;
+    END
+    ''')
+
+    conn.execute('''
+    CREATE TRIGGER booking_fts_update AFTER UPDATE ON booking BEGIN
+        DELETE FROM booking_fts WHERE rowid = old.id;
+        INSERT INTO booking_fts (rowid, equipment, booking_date, room, booked_by, notes)
+        SELECT new.id, e.name || ' ' || e.model, strftime('%d.%m.%Y', new.booking_date),
+               new.room, new.booked_by, new.notes
+        FROM equipment e WHERE e.id = new.equipment_id;
+    END
+    ''')
+
+    # Индексируем уже существующие записи
+    conn.execute("INSERT INTO equipment_fts (equipment_fts) VALUES ('rebuild')")
+    conn.execute('''
+        INSERT INTO booking_fts (rowid, equipment, booking_date, room, booked_by, notes)
+        SELECT b.id, e.name || ' ' || e.model, strftime('%d.%m.%Y', b.booking_date), b.room, b.booked_by, b.notes
+        FROM booking b JOIN equipment e ON b.equipment_id = e.id
+    ''')
+
+
+def _add_utilization_index(conn):
+    """Миграция 5: покрывающий индекс по дате и времени бронирований для статистики по дням"""
+    conn.execute("CREATE INDEX idx_booking_day_time ON booking (booking_date, start_minute, end_minute)")
+
+
+def _add_change_log(conn):
+    """Миграция 6: журнал изменений оборудования и бронирований, который ведут триггеры.
+
+    Каждая вставка, изменение и удаление строки (в том числе каскадное удаление
+    бронирований) добавляет запись с возрастающим номером, поэтому другие копии
+    программы, работающие с тем же файлом базы, получают только изменения после
+    последнего прочитанного номера.
+    """
+    conn.execute('''
+    CREATE TABLE changes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        table_name TEXT NOT NULL,
+        row_id INTEGER NOT NULL,
+        operation TEXT NOT NULL
+    )
+    ''')
+
+    for table in ("equipment", "booking"):
+        for operation, row in (("INSERT", "new"), ("UPDATE", "new"), ("DELETE", "old")):
+            conn.execute(f'''
+            CREATE TRIGGER {table}_changes_{operation.lower()} AFTER {operation} ON {table} BEGIN
+                INSERT INTO changes (table_name, row_id, operation) VALUES ('{table}', {row}.id, '{operation.lower()}');
+            END
+            ''')
+
+
+def _add_bulk_load_switch(conn):
+    """Миграция 7: отключение построчных триггеров вставки бронирований при массовой загрузке.
+
+    Пока в транзакции массовой загрузки таблица bulk_load не пуста, триггеры вставки
+    не обновляют полнотекстовый индекс и журнал изменений: загрузка дополняет их
+    одним запросом на пакет (см. Database.add_bookings_bulk). Другие соединения
+    не видят незафиксированную запись в bulk_load, поэтому их вставки не затрагиваются.
+    """
+    conn.execute("CREATE TABLE bulk_load (active INTEGER NOT NULL)")
+
+    conn.execute("DROP TRIGGER booking_fts_insert")
+    conn.execute('''
+    CREATE TRIGGER booking_fts_insert AFTER INSERT ON booking
+    WHEN NOT EXISTS (SELECT 1 FROM bulk_load) BEGIN
+        INSERT INTO booking_fts (rowid, equipment, booking_date, room, booked_by, notes)
+        SELECT new.id, e.name || ' ' || e.model, strftime('%d.%m.%Y', new.booking_date),
+               new.room, new.booked_by, new.notes
+        FROM equipment e WHERE e.id = new.equipment_id;
+    END
+    ''')
+
+    conn.execute("DROP TRIGGER booking_changes_insert")
+    conn.execute('''
+    CREATE TRIGGER booking_changes_insert AFTER INSERT ON booking
+    WHEN NOT EXISTS (SELECT 1 FROM bulk_load) BEGIN
+        INSERT INTO changes (table_name, row_id, operation) VALUES ('booking', new.id, 'insert');
+    END
+    ''')
+
+
+def _add_bulk_delete_switch(conn):
+    """Миграция 8: отключение построчных триггеров удаления бронирований при массовой загрузке.
+
+    Отмена массовой загрузки удаляет добавленные пакеты (Database.delete_bookings_bulk);
+    пока таблица bulk_load не пуста, строки полнотекстового индекса удаляются одним
+    запросом на диапазон ID, а в журнал изменений записывается одна запись reload.
+    """
+    conn.execute("DROP TRIGGER booking_fts_delete")
+    conn.execute('''
+    CREATE TRIGGER booking_fts_delete AFTER DELETE ON booking
+    WHEN NOT EXISTS (SELECT 1 FROM bulk_load) BEGIN
+        DELETE FROM booking_fts WHERE rowid = old.id;
+    END
+    ''')
+
+    conn.execute("DROP TRIGGER booking_changes_delete")
+    conn.execute('''
+    CREATE TRIGGER booking_changes_delete AFTER DELETE ON booking
+    WHEN NOT EXISTS (SELECT 1 FROM bulk_load) BEGIN
+        INSERT INTO changes (table_name, row_id, operation) VALUES ('booking', old.id, 'delete');
+    END
+    ''')
+
+
+def _add_equipment_to_utilization_index(conn):
+    """Миграция 9: номер оборудования в индексе статистики по дням, чтобы учитывать
+    только бронирования доступного оборудования без обращения к таблице бронирований"""
+    conn.execute("DROP INDEX idx_booking_day_time")
+    conn.execute(
+        "CREATE INDEX idx_booking_day_time ON booking (booking_date, start_minute, end_minute, equipment_id)"
+    )
+
+
+# Список миграций по порядку: миграция с индексом i переводит схему в версию i + 1
+MIGRATIONS = [
+    _create_base_tables,
+    _convert_booking_dates,
+    _add_sort_indexes,
+    _add_full_text_search,
+    _add_utilization_index,
+    _add_change_log,
+    _add_bulk_load_switch,
+    _add_bulk_delete_switch,
+    _add_equipment_to_utilization_index,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def get_schema_version(conn):
+    """Возвращает текущую версию схемы базы данных"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """Применяет к базе все недостающие миграции и возвращает итоговую версию схемы"""
+    version = get_schema_version(conn)
+
+    if version > SCHEMA_VERSION:
+        raise RuntimeError(
+            f"Версия схемы базы данных ({version}) новее поддерживаемой программой ({SCHEMA_VERSION})"
+        )
+
+    for number in range(version + 1, SCHEMA_VERSION + 1):
+        if conn.in_transaction:
+            conn.commit()
+        try:
+            conn.execute("BEGIN")
+            MIGRATIONS[number - 1](conn)
+            conn.execute(f"PRAGMA user_version = {number}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    return get_schema_version(conn)
@@ -0,0 +1,108 @@
+"""
+Модуль кэша результатов запросов к базе данных VR-оборудования
+"""
+import threading
+from collections import OrderedDict
+
+
+def copy_result(value):
+    """Копия результата, которую вызывающий код может изменять, не затрагивая кэш:
+    копируются список строк и списки внутри кортежа (строки, всего)"""
+    if isinstance(value, list):
+        return list(value)
+    if isinstance(value, tuple):
+        return tuple(list(item) if isinstance(item, list) else item for item in value)
+    return value
+
+
+class ResultCache:
+    """LRU-кэш результатов методов чтения с инвалидацией по таблицам.
+
+    Каждая запись помнит таблицы, от которых зависит результат; изменение
+    таблицы удаляет только зависящие от нее записи. Размер кэша ограничен
+    числом записей и суммарным числом строк в результатах.
+    """
+
+    def __init__(self, max_entries=128, max_rows=200000):
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._rows = 0
+        # Номер поколения увеличивается при каждой инвалидации: результат, полученный
+        # до изменения данных, не должен попасть в кэш после него
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        """Кэш включен, если допускается хотя бы одна запись"""
+        return self.max_entries > 0
+
+    @property
+    def generation(self):
+        """Текущее поколение данных"""
+        return self._generation
+
+    @staticmethod
+    def _size(value):
+        """Размер результата в строках (для кортежа вида (строки, всего) - по вложенным спискам)"""
+        if isinstance(value, list):
+            return len(value)
+        if isinstance(value, tuple):
+            return max(1, sum(len(item) for item in value if isinstance(item, list)))
+        return 1
+
+    def get(self, key):
+        """Возвращает (найдено, значение) и отмечает запись как недавно использованную"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[1]
+
+    def put(self, key, tables, value, generation):
+        """Сохраняет результат, если с момента начала запроса данные не изменялись"""
+        size = self._size(value)
+        if size > self.max_rows:
+            return
+        with self._lock:
+            if generation != self._generation:
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._rows -= self._size(old[1])
+            self._entries[key] = (frozenset(tables), value)
+            self._rows += size
+            while len(self._entries) > self.max_entries or self._rows > self.max_rows:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._rows -= self._size(evicted)
+
+    def invalidate(self, tables=None):
+        """Удаляет записи, зависящие от указанных таблиц (None - все записи)"""
+        with self._lock:
+            self._generation += 1
+            self.invalidations += 1
+            if tables is None:
+                self._entries.clear()
+                self._rows = 0
+                return
+            tables = frozenset(tables)
+            for key in [key for key, (depends, _) in self._entries.items() if depends & tables]:
+                self._rows -= self._size(self._entries.pop(key)[1])
+
+    def stats(self):
+        """Счетчики кэша: попадания, промахи, инвалидации, число записей и строк"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+                "rows": self._rows,
+            }
@@ -1,5 +1,27 @@
+import asyncio
+import datetime
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
 import unittest
+from concurrent.futures import ThreadPoolExecutor
+from async_database import AsyncDatabase
+from background_loader import BackgroundLoader
+from change_watcher import ChangeWatcher
+from booking_model import BookingColumns, DayTimeline
+from data_generator import GENERATION_CANCELLED, DataGenerator
+from data_store import DataStore
 from database import Database
+from date_utils import to_minutes
+from db_profiles import PROFILE_ENV_VAR
+from incremental_search import IncrementalSearch
+from instrumentation import QueryStats, StartupTimer
+from migrations import SCHEMA_VERSION, get_schema_version
+from query_cache import ResultCache
+from virtual_tree import QuerySource, SeekSource
 
 
 class TestDatabase(unittest.TestCase):
@@ -23,10 +45,1024 @@ class TestDatabase(unittest.TestCase):
         self.assertEqual(len(result), 1)
         self.assertEqual(result[0][1], "Test VR")
 
+    def test_booking_stored_in_sortable_format(self):
+        # Тестируем хранение даты в формате ISO и времени в минутах
+        _, equipment_id = self.db.add_equipment("Test VR", "Test Model")
+        success, booking_id = self.db.add_booking(equipment_id, "05.02.2030", "09:30", "10:45", "101")
+        self.assertTrue(success)
+
+        self.db.cursor.execute(
+            "SELECT booking_date, start_minute, end_minute FROM booking WHERE id=?", (booking_id,)
+        )
+        self.assertEqual(self.db.cursor.fetchone(), ("2030-02-05", 570, 645))
+
+        success, details = self.db.get_booking_details(booking_id)
+        self.assertTrue(success)
+        self.assertEqual(details[2:5], ("05.02.2030", "09:30", "10:45"))
+
+    def test_booking_conflicts(self):
+        # Тестируем проверку пересечения бронирований, включая вложенные интервалы
+        _, equipment_id = self.db.add_equipment("Test VR", "Test Model")
+        self.assertTrue(self.db.add_booking(equipment_id, "05.02.2030", "10:00", "11:00", "101")[0])
+        self.assertFalse(self.db.add_booking(equipment_id, "05.02.2030", "09:00", "12:00", "102")[0])
+        self.assertTrue(self.db.add_booking(equipment_id, "05.02.2030", "11:00", "12:00", "102")[0])
+
+        success, available = self.db.get_available_equipment("05.02.2030", "10:30", "10:45")
+        self.assertTrue(success)
+        self.assertEqual(available, [])
+
+    def test_bookings_sorted_by_date(self):
+        # Тестируем сортировку бронирований по дате, а не по строке ДД.ММ.ГГГГ
+        _, equipment_id = self.db.add_equipment("Test VR", "Test Model")
+        self.db.add_booking(equipment_id, "31.01.2030", "10:00", "11:00", "101")
+        self.db.add_booking(equipment_id, "01.02.2030", "10:00", "11:00", "101")
+
+        success, bookings = self.db.get_all_bookings()
+        self.assertTrue(success)
+        self.assertEqual([booking[3] for booking in bookings], ["01.02.2030", "31.01.2030"])
+
+    def test_add_equipment_many(self):
+        # Тестируем пакетное добавление оборудования
+        success, results = self.db.add_equipment_many([("VR 1", "M1"), ("VR 2", "M2", "SN-2")])
+        self.assertTrue(success)
+        self.assertTrue(all(row_success for row_success, _ in results))
+
+        success, equipment = self.db.get_all_equipment()
+        self.assertEqual(sorted(row[0] for row in equipment), [equipment_id for _, equipment_id in results])
+
+    def test_failed_write_leaves_no_open_transaction(self):
+        # Тестируем откат неявной транзакции после ошибки одиночной вставки
+        success, _ = self.db.add_equipment(None, "Model")
+        self.assertFalse(success)
+        self.assertFalse(self.db.conn.in_transaction)
+        success, results = self.db.add_equipment_many([("VR", "Model")])
+        self.assertTrue(success)
+        self.assertTrue(results[0][0])
+
+    def test_add_bookings_many_checks_conflicts(self):
+        # Тестируем пакетное добавление с конфликтами в базе и внутри пакета
+        _, equipment_id = self.db.add_equipment("Test VR", "Test Model")
+        self.db.add_booking(equipment_id, "05.02.2030", "10:00", "11:00", "101")
+
+        success, results = self.db.add_bookings_many([
+            (equipment_id, "05.02.2030", "10:30", "11:30", "102"),  # пересечение с базой
+            (equipment_id, "05.02.2030", "12:00", "13:00", "102"),
+            (equipment_id, "05.02.2030", "12:30", "13:30", "103"),  # пересечение внутри пакета
+            (equipment_id, "2030-02-06", "12:30", "13:30", "103", "Иванов И.И.", "Заметка"),
+            (equipment_id, "некорректно", "12:30", "13:30", "103"),
+        ])
+        self.assertTrue(success)
+        self.assertEqual([row_success for row_success, _ in results], [False, True, False, True, False])
+
+        success, details = self.db.get_booking_details(results[3][1])
+        self.assertEqual(details[2], "06.02.2030")
+        self.assertEqual(details[7:9], ("Иванов И.И.", "Заметка"))
+        self.assertEqual(len(self.db.get_all_bookings()[1]), 3)
+
+        # ID строкой проверяется по тем же бронированиям, что и числовой
+        success, results = self.db.add_bookings_many([(str(equipment_id), "05.02.2030", "10:15", "10:45", "104")])
+        self.assertEqual(results, [(False, "Оборудование уже забронировано на указанное время")])
+
+        # Пересекающиеся старые записи: длинное бронирование не должно заслоняться коротким
+        self.db.cursor.executemany(
+            "INSERT INTO booking (equipment_id, booking_date, start_minute, end_minute, room) VALUES (?, ?, ?, ?, ?)",
+            [(equipment_id, "2030-02-07", 540, 720, "101"), (equipment_id, "2030-02-07", 570, 600, "101")]
+        )
+        self.db.conn.commit()
+        success, results = self.db.add_bookings_many([(equipment_id, "07.02.2030", "11:00", "11:30", "105")])
+        self.assertFalse(results[0][0])
+
+    def test_availability_index_follows_changes(self):
+        # Тестируем согласованность индекса занятости с запросом к базе
+        _, first_id = self.db.add_equipment("VR 1", "M1")
+        _, second_id = self.db.add_equipment("VR 2", "M2")
+        _, booking_id = self.db.add_booking(first_id, "05.02.2030", "10:00", "11:00", "101")
+
+        def available_ids(start_time, end_time):
+            success, equipment = self.db.get_available_equipment("05.02.2030", start_time, end_time)
+            self.assertTrue(success)
+            expected = self.db._query_available_equipment("2030-02-05", *map(to_minutes, (start_time, end_time)))
+            self.assertEqual(equipment, expected)
+            return [row[0] for row in equipment]
+
+        self.assertEqual(available_ids("09:00", "12:00"), [second_id])
+
+        self.db.update_booking(booking_id, second_id, "05.02.2030", "10:00", "11:00", "101")
+        self.assertEqual(available_ids("10:30", "10:45"), [first_id])
+        self.assertEqual(available_ids("11:00", "12:00"), [first_id, second_id])
+
+        self.db.add_bookings_many([(first_id, "05.02.2030", "11:00", "12:00", "102")])
+        self.assertEqual(available_ids("11:30", "12:00"), [second_id])
+
+        self.db.delete_booking(str(booking_id))
+        self.assertEqual(available_ids("10:00", "11:00"), [first_id, second_id])
+
+        # Редактируемое бронирование не мешает самому себе
+        success, equipment = self.db.get_available_equipment(
+            "05.02.2030", "11:00", "11:30", exclude_booking_id=booking_id + 1
+        )
+        self.assertEqual([row[0] for row in equipment], [first_id, second_id])
+
+    def test_keyset_pagination_matches_full_list(self):
+        # Тестируем постраничную выборку: страницы в сумме дают полный список в том же порядке
+        self.db.add_equipment_many([(f"VR {i}", "M") for i in range(5)])
+        bookings = [
+            (equipment_id, f"{day:02d}.03.2030", f"{hour:02d}:00", f"{hour + 1:02d}:00", "101")
+            for equipment_id in range(1, 6) for day in (1, 2, 3) for hour in (9, 10)
+        ]
+        self.db.add_bookings_many(bookings)
+
+        pages, cursor = [], None
+        while True:
+            success, (rows, cursor) = self.db.get_bookings_page(limit=7, cursor=cursor)
+            self.assertTrue(success)
+            pages.append(rows)
+            if cursor is None:
+                break
+
+        self.assertEqual([len(rows) for rows in pages], [7, 7, 7, 7, 2])
+        all_bookings = self.db.get_all_bookings()[1]
+        self.assertEqual([row for rows in pages for row in rows], all_bookings)
+        self.assertEqual([row for rows in self.db.iter_all_bookings(chunk_size=4) for row in rows], all_bookings)
+
+        equipment = [row for rows in self.db.iter_all_equipment(chunk_size=2) for row in rows]
+        self.assertEqual(equipment, self.db.get_all_equipment()[1])
+
+    def test_full_text_search(self):
+        # Тестируем полнотекстовый поиск с префиксами и синхронизацию индекса триггерами
+        _, quest_id = self.db.add_equipment("Oculus Quest", "Pro", "SN-82741", "Автономная гарнитура")
+        _, vive_id = self.db.add_equipment("HTC Vive", "Elite", "SN-11111")
+        _, booking_id = self.db.add_booking(quest_id, "05.02.2030", "10:00", "11:00", "Кабинет A-101",
+                                            "Иванов И.И.", "Урок по 3D-моделированию")
+        self.db.add_booking(vive_id, "06.02.2030", "10:00", "11:00", "Класс C-303", "Петров П.П.")
+
+        self.assertEqual([row[0] for row in self.db.search_equipment("ocul")[1]], [quest_id])
+        self.assertEqual([row[0] for row in self.db.search_equipment("SN-827")[1]], [quest_id])
+        self.assertEqual(self.db.search_equipment("   ")[1], [])
+
+        self.assertEqual([row[0] for row in self.db.search_bookings("иван моделир")[1]], [booking_id])
+        self.assertEqual([row[0] for row in self.db.search_bookings("quest 05.02")[1]], [booking_id])
+        self.assertEqual(len(self.db.search_bookings("2030", order="date")[1]), 2)
+
+        # Изменение названия оборудования и бронирования отражается в индексе
+        self.db.update_equipment(quest_id, "Meta Quest", "Pro")
+        self.assertEqual([row[0] for row in self.db.search_bookings("meta")[1]], [booking_id])
+        self.db.update_booking(booking_id, quest_id, "05.02.2030", "10:00", "11:00", "Кабинет A-101", "Сидоров С.С.")
+        self.assertEqual(self.db.search_bookings("иван")[1], [])
+
+        self.db.delete_booking(booking_id)
+        self.assertEqual(self.db.search_bookings("meta")[1], [])
+
+    def test_get_bookings_filters_in_database(self):
+        # Тестируем фильтр по периоду, поиск и подсчет подходящих бронирований
+        _, quest_id = self.db.add_equipment("Oculus Quest", "Pro")
+        _, vive_id = self.db.add_equipment("HTC Vive", "Elite")
+        self.db.add_bookings_many([
+            (equipment_id, f"0{day}.02.2030", "10:00", "11:00", "101")
+            for equipment_id in (quest_id, vive_id) for day in (1, 2, 3)
+        ])
+
+        success, (rows, total) = self.db.get_bookings("02.02.2030", "2030-02-03")
+        self.assertTrue(success)
+        self.assertEqual(total, 4)
+        self.assertEqual([row[3] for row in rows], ["03.02.2030", "03.02.2030", "02.02.2030", "02.02.2030"])
+
+        rows, total = self.db.get_bookings(date_from="02.02.2030", search="quest", limit=1)[1]
+        self.assertEqual((len(rows), total), (1, 2))
+        self.assertEqual(rows[0][1:4], ("Oculus Quest", "Pro", "03.02.2030"))
+
+        self.assertEqual(self.db.get_bookings()[1][0], self.db.get_all_bookings()[1])
+        self.assertEqual(self.db.get_bookings(search="!!!")[1], ([], 0))
+        self.assertFalse(self.db.get_bookings("31.02.2030")[0])
+
+    def test_incremental_search_matches_database(self):
+        # Тестируем сужение результата поиска в памяти: совпадает с полнотекстовым поиском в базе
+        _, quest_id = self.db.add_equipment("Oculus Quest", "Pro", "SN-82741", "Автономная гарнитура")
+        _, vive_id = self.db.add_equipment("HTC Vive", "Elite")
+        self.db.add_bookings_many([
+            (quest_id, "05.02.2030", "10:00", "11:00", "Кабинет A-101", "Иванов И.И.", "Урок"),
+            (vive_id, "05.02.2030", "10:00", "11:00", "Класс C-303", "Иванова А.А.", "Ёлка, café"),
+            (vive_id, "06.02.2030", "10:00", "11:00", "Кабинет A-102", "Петров П.П."),
+        ])
+
+        search = IncrementalSearch()
+        rows, _ = self.db.get_bookings(search="ив", with_text=True)[1]
+        self.assertEqual(len(search.remember("ив", rows)), 2)
+
+        for query in ("иван", "иванова ёлк", "иванова ёлка 05"):
+            self.assertEqual(search.narrow(query), self.db.get_bookings(search=query)[1][0])
+        self.assertIsNone(search.narrow("иванов"))
+        search.remember("иванова", self.db.get_bookings(search="иванова", with_text=True)[1][0])
+        self.assertEqual(search.narrow("иванова cafe"), self.db.get_bookings(search="иванова cafe")[1][0])
+
+        search.remember("sn", self.db.search_equipment("sn", with_text=True)[1])
+        self.assertEqual([row[0] for row in search.narrow("sn 827")], [quest_id])
+        self.assertIsNone(search.narrow("sn 827", context="другой период"))
+
+    def test_query_source_pages_match_full_list(self):
+        # Тестируем постраничную загрузку бронирований со смещением для виртуального списка
+        _, equipment_id = self.db.add_equipment("Test VR", "Test Model")
+        self.db.add_bookings_many([
+            (equipment_id, f"{day:02d}.02.2030", f"{hour:02d}:00", f"{hour + 1:02d}:00", "101")
+            for day in range(1, 6) for hour in (9, 10, 11)
+        ])
+        all_bookings = self.db.get_all_bookings()[1]
+
+        def fetch(offset, limit):
+            success, result = self.db.get_bookings(limit=limit, offset=offset, count=False)
+            return success, result[0]
+
+        source = QuerySource(fetch, len(all_bookings), page_size=4, max_pages=2)
+        self.assertEqual(source.rows(3, 7), all_bookings[3:10])
+        self.assertEqual(source.rows(13, 10), all_bookings[13:])
+        self.assertEqual(source.rows(0, 15), all_bookings)
+
+        # Удаление строки: последующие страницы загружаются заново со сдвигом
+        self.db.delete_booking(all_bookings[9][0])
+        self.assertTrue(source.remove(all_bookings[9][0]))
+        del all_bookings[9]
+        self.assertEqual(source.count(), 14)
+        self.assertEqual(source.rows(0, 15), all_bookings)
+
+        # Строка вне загруженных страниц (или вне результата запроса) не меняет количество
+        self.assertFalse(source.remove(999))
+        self.assertEqual(source.count(), 14)
+
+        changed = all_bookings[-1][:6] + ("202", "Петров П.П.")
+        self.assertTrue(source.update(changed))
+        self.assertEqual(source.get(changed[0]), changed)
+
+    def test_day_snapshot_matches_available_equipment(self):
+        # Тестируем снимок занятости за день: тот же результат, что и запрос к базе
+        ids = [self.db.add_equipment(f"VR {number}", "Model")[1] for number in range(3)]
+        _, first_booking = self.db.add_booking(ids[0], "05.02.2030", "10:00", "12:00", "101")
+        self.db.add_booking(ids[1], "05.02.2030", "11:00", "11:30", "101")
+        self.db.add_booking(ids[2], "06.02.2030", "10:00", "12:00", "101")
+
+        success, snapshot = self.db.get_day_snapshot("05.02.2030")
+        self.assertTrue(success)
+        for start, end in (("09:00", "10:00"), ("09:00", "10:30"), ("11:15", "11:45"), ("12:00", "13:00")):
+            expected = self.db.get_available_equipment("05.02.2030", start, end)[1]
+            self.assertEqual(snapshot.get_available(to_minutes(start), to_minutes(end)), expected)
+        self.assertEqual(
+            [item[0] for item in snapshot.get_available(600, 700, exclude_id=first_booking)], [ids[0], ids[2]]
+        )
+
+        # Снимок не меняется после изменения базы
+        self.db.add_booking(ids[2], "05.02.2030", "08:00", "09:00", "101")
+        self.assertEqual(len(snapshot.get_available(480, 540)), 3)
+        self.assertEqual(self.db.get_day_snapshot("31.02.2030"), (False, "Некорректная дата бронирования"))
+
+    def test_day_timeline_visible_bookings(self):
+        # Тестируем выборку бронирований видимой части временной шкалы дня
+        ids = [self.db.add_equipment(f"VR {number}", "Model")[1] for number in range(3)]
+        for equipment_id, start, end in ((ids[0], "09:00", "10:00"), (ids[0], "12:00", "13:00"),
+                                         (ids[1], "10:30", "11:30"), (ids[2], "18:00", "20:00")):
+            self.db.add_booking(equipment_id, "05.02.2030", start, end, "101")
+        self.db.add_booking(ids[1], "06.02.2030", "10:00", "11:00", "101")
+
+        success, bookings = self.db.get_day_bookings("05.02.2030")
+        self.assertTrue(success)
+        timeline = DayTimeline(self.db.get_all_equipment()[1], bookings)
+        self.assertEqual(timeline.row_count(), 3)
+        self.assertEqual(timeline.booking_count(), 4)
+
+        visible = timeline.visible(0, 2, to_minutes("10:00"), to_minutes("12:30"))
+        self.assertEqual([(row, booking[2]) for row, booking in visible], [(0, 720), (1, 630)])
+        self.assertEqual(timeline.visible(2, 10, 480, 1260)[0][1][1], ids[2])
+        self.assertEqual(timeline.visible(0, 3, 1200, 1260), [])
+
+    def test_daily_utilization(self):
+        # Тестируем загрузку оборудования по дням месяца: время учитывается в пределах 08:00-21:00
+        ids = [self.db.add_equipment(f"VR {number}", "Model")[1] for number in range(2)]
+        self.db.add_booking(ids[0], "05.02.2030", "07:00", "09:00", "101")
+        self.db.add_booking(ids[1], "05.02.2030", "10:00", "12:30", "101")
+        self.db.add_booking(ids[0], "28.02.2030", "08:00", "21:00", "101")
+        self.db.add_booking(ids[0], "01.03.2030", "10:00", "11:00", "101")
+
+        success, days = self.db.get_daily_utilization("2030-02")
+        self.assertTrue(success)
+        self.assertEqual([row[:3] for row in days], [("2030-02-05", 2, 210), ("2030-02-28", 1, 780)])
+        self.assertAlmostEqual(days[0][3], 210 / (2 * 780))
+        self.assertAlmostEqual(days[1][3], 0.5)
+
+        self.assertEqual(self.db.get_daily_utilization("15.12.2030"), (True, []))
+        self.assertEqual(self.db.get_daily_utilization("2030-13")[0], False)
+
+        # Оборудование на обслуживании не учитывается ни в числителе, ни в знаменателе
+        self.db.add_booking(ids[1], "28.02.2030", "08:00", "21:00", "101")
+        self.assertAlmostEqual(self.db.get_daily_utilization("2030-02")[1][1][3], 1.0)
+        self.db.update_equipment(ids[1], "VR 1", "Model", status="На обслуживании")
+        success, days = self.db.get_daily_utilization("2030-02")
+        self.assertEqual(days[1][:3], ("2030-02-28", 1, 780))
+        self.assertAlmostEqual(days[1][3], 1.0)
+
+    def test_booking_columns_match_query_results(self):
+        # Тестируем компактный список бронирований: исходные строки и выборку за период
+        _, equipment_id = self.db.add_equipment("Test VR", "Test Model")
+        self.db.add_bookings_many([
+            (equipment_id, f"{day:02d}.02.2030", f"{hour:02d}:30", f"{hour + 1:02d}:00", "101", "Иванов")
+            for day in range(1, 8) for hour in (9, 14)
+        ])
+        all_bookings = self.db.get_all_bookings()[1]
+        columns = BookingColumns(all_bookings, date_index=3)
+        self.assertEqual(columns.rows(0, 100), all_bookings)
+
+        period = (datetime.date(2030, 2, 3), datetime.date(2030, 2, 5))
+        self.assertEqual(columns.between(*period).rows(0, 100), self.db.get_bookings(*period)[1][0])
+        self.assertEqual(columns.between(None, period[0]).count(), 6)
+        self.assertEqual(columns.between(datetime.date(2031, 1, 1)).count(), 0)
+
+        equipment_bookings = BookingColumns(self.db.get_equipment_bookings(equipment_id)[1])
+        self.assertEqual(equipment_bookings.get(all_bookings[0][0]), (
+            all_bookings[0][0], "07.02.2030", "09:30", "10:00", "101", "Иванов"
+        ))
+        self.assertTrue(equipment_bookings.remove(all_bookings[0][0]))
+        self.assertIsNone(equipment_bookings.get(all_bookings[0][0]))
+        self.assertEqual(equipment_bookings.count(), 13)
+
+    def test_equipment_bookings_pages(self):
+        # Тестируем постраничную загрузку истории бронирований и количество бронирований
+        _, equipment_id = self.db.add_equipment("Test VR", "Test Model")
+        self.db.add_bookings_many([
+            (equipment_id, f"{day:02d}.02.2030", f"{hour:02d}:00", f"{hour:02d}:30", "101")
+            for day in range(1, 6) for hour in (9, 10, 11)
+        ])
+        expected = self.db.get_equipment_bookings(equipment_id)[1]
+
+        def fetch(cursor, limit):
+            return self.db.get_equipment_bookings_page(equipment_id, limit, cursor)
+
+        source = SeekSource(fetch, len(expected), page_size=4)
+        self.assertEqual(source.rows(0, 2), expected[:2])
+        self.assertEqual(source.loaded.count(), 4)
+        self.assertEqual(source.rows(5, 20), expected[5:])
+        self.assertEqual(source.count(), 15)
+
+        success, (rows, cursor) = self.db.get_equipment_bookings_page(
+            equipment_id, 2, date_from="02.02.2030", date_to="02.02.2030"
+        )
+        self.assertEqual((rows, self.db.get_equipment_bookings_page(equipment_id, 2, cursor)[1][0]),
+                         (expected[9:11], expected[11:13]))
+        self.assertEqual(self.db.get_equipment_booking_stats(equipment_id, "03.02.2030"), (True, (15, 9, 6, 3)))
+
     def tearDown(self):
         # Закрываем соединение с тестовой базой данных
         self.db.close()
 
 
+class TestMigrations(unittest.TestCase):
+    def setUp(self):
+        # Создаем базу в старом формате (без версии схемы)
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, "legacy.db")
+        conn = sqlite3.connect(self.db_path)
+        conn.executescript('''
+            CREATE TABLE equipment (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, model TEXT NOT NULL,
+                serial_number TEXT, description TEXT, purchase_date TEXT, status TEXT DEFAULT 'Доступно'
+            );
+            CREATE TABLE booking (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, equipment_id INTEGER NOT NULL,
+                booking_date TEXT NOT NULL, start_time TEXT NOT NULL, end_time TEXT NOT NULL,
+                room TEXT NOT NULL, created_at TEXT DEFAULT CURRENT_TIMESTAMP, booked_by TEXT, notes TEXT
+            );
+            INSERT INTO equipment (name, model) VALUES ('Legacy VR', 'V1');
+            INSERT INTO booking (equipment_id, booking_date, start_time, end_time, room)
+            VALUES (1, '13.04.2025', '10:00', '11:30', '101'), (1, '2025-04-14', '08:15', '09:00', '102');
+        ''')
+        conn.commit()
+        conn.close()
+
+    def test_legacy_rows_converted(self):
+        # Тестируем перевод существующих бронирований в новый формат
+        db = Database(self.db_path)
+        try:
+            self.assertEqual(get_schema_version(db.conn), SCHEMA_VERSION)
+
+            db.cursor.execute("SELECT booking_date, start_minute, end_minute FROM booking ORDER BY id")
+            self.assertEqual(db.cursor.fetchall(), [("2025-04-13", 600, 690), ("2025-04-14", 495, 540)])
+
+            db.cursor.execute("SELECT name FROM sqlite_master WHERE type='index' AND tbl_name='booking'")
+            indexes = {row[0] for row in db.cursor.fetchall()}
+            self.assertIn("idx_booking_equipment_date", indexes)
+            self.assertIn("idx_booking_date", indexes)
+
+            # Новые записи продолжают нумерацию после перенесенных
+            success, booking_id = db.add_booking(1, "15.04.2025", "10:00", "11:00", "101")
+            self.assertTrue(success)
+            self.assertEqual(booking_id, 3)
+        finally:
+            db.close()
+
+    def test_unparseable_rows_kept_aside(self):
+        # Тестируем, что бронирование с нераспознанным временем не получает неверное время
+        conn = sqlite3.connect(self.db_path)
+        conn.execute(
+            "INSERT INTO booking (equipment_id, booking_date, start_time, end_time, room) "
+            "VALUES (1, '15.04.2025', 'утро', '11:00', '103')"
+        )
+        conn.commit()
+        conn.close()
+
+        db = Database(self.db_path)
+        try:
+            self.assertEqual(len(db.get_all_bookings()[1]), 2)
+            db.cursor.execute("SELECT id, start_time, room FROM booking_unconverted")
+            self.assertEqual(db.cursor.fetchall(), [(3, "утро", "103")])
+        finally:
+            db.close()
+
+    def test_migrations_applied_once(self):
+        # Тестируем повторное открытие уже обновленной базы
+        Database(self.db_path).close()
+        db = Database(self.db_path)
+        try:
+            success, bookings = db.get_all_bookings()
+            self.assertTrue(success)
+            self.assertEqual(len(bookings), 2)
+        finally:
+            db.close()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+
+class TestConnectionPool(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db = Database(os.path.join(self.temp_dir.name, "pooled.db"), pooled=True)
+
+    def test_methods_work_from_worker_threads(self):
+        # Тестируем параллельную запись и чтение из нескольких потоков
+        _, equipment_id = self.db.add_equipment("Test VR", "Test Model")
+
+        def book(day):
+            success, _ = self.db.add_booking(equipment_id, f"{day:02d}.03.2030", "10:00", "11:00", "101")
+            self.assertTrue(self.db.get_all_bookings()[0])
+            return success, threading.get_ident()
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(book, range(1, 29)))
+
+        self.assertTrue(all(success for success, _ in results))
+        self.assertEqual(len(self.db.get_all_bookings()[1]), 28)
+        self.assertGreater(self.db._pool.size, 1)
+
+    def test_finished_threads_connections_closed(self):
+        # Тестируем, что соединения завершившихся потоков не накапливаются
+        self.db.get_all_equipment()
+        for _ in range(20):
+            thread = threading.Thread(target=self.db.get_all_equipment)
+            thread.start()
+            thread.join()
+        self.assertLessEqual(self.db._pool.size, 2)
+
+    def test_transaction_rolls_back_on_error(self):
+        # Тестируем откат транзакции, открытой через контекстный менеджер
+        with self.assertRaises(ValueError):
+            with self.db.transaction() as cursor:
+                cursor.execute("INSERT INTO equipment (name, model) VALUES ('VR', 'M')")
+                raise ValueError
+
+        with self.db.connection() as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM equipment").fetchone()[0], 0)
+
+    def test_memory_database_shared_between_threads(self):
+        # Тестируем базу в памяти в режиме пула
+        with Database(":memory:", pooled=True) as db:
+            db.add_equipment("Test VR", "Test Model")
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                success, equipment = executor.submit(db.get_all_equipment).result()
+            self.assertTrue(success)
+            self.assertEqual(len(equipment), 1)
+
+    def tearDown(self):
+        self.db.close()
+        self.temp_dir.cleanup()
+
+
+class TestProfiles(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, "profiles.db")
+
+    def test_interactive_profile_uses_wal(self):
+        # Тестируем настройки профиля по умолчанию
+        with Database(self.db_path) as db:
+            self.assertEqual(db.profile, "interactive")
+            self.assertEqual(db.conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+            self.assertEqual(db.conn.execute("PRAGMA foreign_keys").fetchone()[0], 1)
+
+    def test_reporting_profile_is_read_only(self):
+        # Тестируем профиль отчетов: схема создается, но запись запрещена
+        with Database(self.db_path, profile="reporting") as db:
+            self.assertTrue(db.get_all_equipment()[0])
+            success, _ = db.add_equipment("Test VR", "Test Model")
+            self.assertFalse(success)
+
+    def test_profile_from_environment(self):
+        # Тестируем выбор профиля через переменную окружения
+        os.environ[PROFILE_ENV_VAR] = "bulk-load"
+        try:
+            with Database(self.db_path) as db:
+                self.assertEqual(db.profile, "bulk-load")
+                self.assertEqual(db.conn.execute("PRAGMA synchronous").fetchone()[0], 0)
+        finally:
+            del os.environ[PROFILE_ENV_VAR]
+
+        with self.assertRaises(ValueError):
+            Database(self.db_path, profile="unknown")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+
+class TestInstrumentation(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.slow_log_path = os.path.join(self.temp_dir.name, "slow.log")
+        self.json_path = os.path.join(self.temp_dir.name, "stats.json")
+        self.stats = QueryStats(slow_threshold_ms=0, slow_log_path=self.slow_log_path, json_path=self.json_path)
+        self.db = Database(":memory:", stats=self.stats)
+
+    def test_method_latency_recorded(self):
+        # Тестируем учет вызовов методов и сохранение статистики в JSON
+        _, equipment_id = self.db.add_equipment("Test VR", "Test Model")
+        for _ in range(3):
+            self.db.get_all_bookings()
+        self.db.add_booking(equipment_id, "некорректно", "10:00", "11:00", "101")
+
+        self.stats.dump_json()
+        with open(self.json_path, encoding="utf-8") as json_file:
+            summary = json.load(json_file)
+
+        self.assertEqual(summary["get_all_bookings"]["calls"], 3)
+        self.assertEqual(summary["add_booking"]["errors"], 1)
+        self.assertLessEqual(summary["get_all_bookings"]["p50_ms"], summary["get_all_bookings"]["p99_ms"])
+
+    def test_slow_queries_logged_with_plan(self):
+        # Тестируем журнал медленных запросов с планом выполнения
+        self.db.add_equipment("Test VR", "Test Model")
+        self.db.get_all_bookings()
+
+        with open(self.slow_log_path, encoding="utf-8") as log_file:
+            log = log_file.read()
+        self.assertIn("get_all_bookings", log)
+        self.assertIn("ПЛАН:", log)
+
+    def test_startup_timer(self):
+        # Тестируем отметки этапов запуска и журнал запуска
+        log_path = os.path.join(self.temp_dir.name, "startup.log")
+        startup = StartupTimer(log_path=log_path)
+        first = startup.mark("first_paint")
+        self.assertEqual(startup.mark("first_paint"), first)
+        self.assertIsNone(startup.elapsed("interactive"))
+        self.assertGreaterEqual(startup.mark("interactive"), first)
+
+        startup.write_log()
+        with open(log_path, encoding="utf-8") as log_file:
+            self.assertIn("first_paint:", log_file.read())
+
+    def tearDown(self):
+        self.db.close()
+        self.temp_dir.cleanup()
+
+
+class TestAsyncDatabase(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, "async.db")
+
+    def test_concurrent_clients(self):
+        # Тестируем параллельные запросы: из одинаковых бронирований проходит только одно
+        async def scenario():
+            async with AsyncDatabase(self.db_path) as db:
+                _, equipment_id = await db.add_equipment("Test VR", "Test Model")
+                results = await asyncio.gather(*(
+                    db.add_booking(equipment_id, "05.02.2030", "10:00", "11:00", f"Кабинет {i}")
+                    for i in range(10)
+                ))
+                available = await asyncio.gather(*(
+                    db.get_available_equipment("05.02.2030", "10:30", "11:30") for _ in range(10)
+                ))
+                chunks = [chunk async for chunk in db.iter_all_bookings(chunk_size=1)]
+                return results, available, chunks
+
+        results, available, chunks = asyncio.run(scenario())
+        self.assertEqual(sum(success for success, _ in results), 1)
+        self.assertTrue(all(equipment == (True, []) for equipment in available))
+        self.assertEqual(len(chunks), 1)
+
+    def test_writer_methods_use_write_thread(self):
+        # Тестируем выбор потока записи для всех методов записи, а не только add_/update_/delete_
+        db = AsyncDatabase(self.db_path)
+        try:
+            self.assertIs(db._executor_for("prune_changes"), db._writer)
+            self.assertIs(db._executor_for("add_bookings_bulk"), db._writer)
+            self.assertIs(db._executor_for("get_changes"), db._readers)
+        finally:
+            asyncio.run(db.close())
+
+    def test_requires_pooled_database(self):
+        # Тестируем отказ работать с базой без пула соединений
+        with Database(self.db_path) as db:
+            with self.assertRaises(ValueError):
+                AsyncDatabase(db=db)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, "cache.db")
+        self.db = Database(self.db_path)
+
+    def test_repeated_reads_hit_cache(self):
+        # Тестируем попадания в кэш и инвалидацию только зависящих от таблицы результатов
+        _, equipment_id = self.db.add_equipment("Test VR", "Test Model")
+        self.db.get_all_equipment()
+        self.db.get_all_bookings()
+        self.db.get_all_bookings()
+        self.assertEqual(self.db.cache.stats()["hits"], 1)
+
+        self.db.add_booking(equipment_id, "05.02.2030", "10:00", "11:00", "101")
+        success, bookings = self.db.get_all_bookings()
+        self.assertEqual(len(bookings), 1)
+        self.db.get_all_equipment()
+        self.assertEqual(self.db.cache.stats()["hits"], 2)
+
+    def test_external_changes_detected(self):
+        # Тестируем обнаружение изменений, сделанных другим соединением
+        _, equipment_id = self.db.add_equipment("Test VR", "Test Model")
+        self.assertEqual(len(self.db.get_available_equipment("05.02.2030", "10:00", "11:00")[1]), 1)
+        self.assertEqual(self.db.count_bookings(), (True, 0))
+
+        with Database(self.db_path) as other:
+            other.add_booking(equipment_id, "05.02.2030", "10:00", "11:00", "101")
+
+        self.assertEqual(self.db.count_bookings(), (True, 1))
+        self.assertEqual(self.db.get_available_equipment("05.02.2030", "10:00", "11:00"), (True, []))
+
+    def test_cache_hits_skip_change_counter(self):
+        # Тестируем, что попадание в кэш без внешних изменений не читает журнал изменений
+        _, equipment_id = self.db.add_equipment("Test VR", "Test Model")
+        self.db.count_bookings()
+        statements = []
+        self.db.conn.set_trace_callback(statements.append)
+        try:
+            self.assertEqual(self.db.count_bookings(), (True, 0))
+            self.assertEqual(self.db.count_bookings(), (True, 0))
+        finally:
+            self.db.conn.set_trace_callback(None)
+        self.assertFalse([statement for statement in statements if "sqlite_sequence" in statement])
+
+        # Внешнее изменение, сделанное до записи, учитывается этой записью
+        with Database(self.db_path) as other:
+            other.add_booking(equipment_id, "05.02.2030", "10:00", "11:00", "101")
+        self.db.add_equipment("Second VR", "Test Model")
+        self.assertEqual(self.db.count_bookings(), (True, 1))
+
+    def test_external_changes_seen_by_new_threads(self):
+        # Тестируем, что соединение нового потока пула не возвращает устаревший результат
+        pooled = Database(self.db_path, pooled=True)
+        uncached = Database(self.db_path, cache_size=0)
+        try:
+            _, equipment_id = pooled.add_equipment("Test VR", "Test Model")
+            self.assertEqual(pooled.count_bookings(), (True, 0))
+            self.assertEqual(len(uncached.get_available_equipment("05.02.2030", "10:00", "11:00")[1]), 1)
+            self.db.add_booking(equipment_id, "05.02.2030", "10:00", "11:00", "101")
+
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                self.assertEqual(executor.submit(pooled.count_bookings).result(), (True, 1))
+            self.assertEqual(uncached.get_available_equipment("05.02.2030", "10:00", "11:00"), (True, []))
+        finally:
+            pooled.close()
+            uncached.close()
+
+    def test_tuple_results_copied_and_sized(self):
+        # Тестируем, что изменение списка из результата (строки, всего) не портит кэш
+        _, equipment_id = self.db.add_equipment("Test VR", "Test Model")
+        self.db.add_booking(equipment_id, "05.02.2030", "10:00", "11:00", "101")
+        self.db.add_booking(equipment_id, "05.02.2030", "12:00", "13:00", "101")
+        self.db.get_bookings()[1][0].clear()
+        self.db.get_bookings()[1][0].clear()
+        self.assertEqual(len(self.db.get_bookings()[1][0]), 2)
+        self.assertEqual(self.db.cache.stats()["rows"], 2)
+
+        cache = ResultCache(max_rows=3)
+        cache.put("a", ["booking"], ([1, 2, 3, 4], 4), cache.generation)
+        self.assertEqual(cache.get("a"), (False, None))
+
+    def test_lru_eviction(self):
+        # Тестируем вытеснение давно не использованных записей
+        cache = ResultCache(max_entries=2, max_rows=3)
+        cache.put("a", ["equipment"], [1], cache.generation)
+        cache.put("b", ["equipment"], [2], cache.generation)
+        cache.get("a")
+        cache.put("c", ["booking"], [3], cache.generation)
+        self.assertEqual(cache.get("b"), (False, None))
+        self.assertEqual(cache.get("a"), (True, [1]))
+
+        cache.put("d", ["booking"], [4, 5, 6], cache.generation)
+        self.assertEqual(cache.stats()["entries"], 1)
+
+        generation = cache.generation
+        cache.invalidate(["booking"])
+        cache.put("e", ["booking"], [7], generation)
+        self.assertEqual(cache.stats()["entries"], 0)
+
+    def tearDown(self):
+        self.db.close()
+        self.temp_dir.cleanup()
+
+
+class _FakeWidget:
+    """Заменяет виджет Tk: запланированные after() вызовы выполняются вручную"""
+
+    def __init__(self):
+        self.jobs = {}
+
+    def after(self, delay, callback):
+        job = len(self.jobs) + 1
+        self.jobs[job] = callback
+        return job
+
+    def after_cancel(self, job):
+        self.jobs.pop(job, None)
+
+    def run_pending(self):
+        jobs, self.jobs = self.jobs, {}
+        for callback in jobs.values():
+            callback()
+
+
+class TestBackgroundLoader(unittest.TestCase):
+    def pump(self, widget, loader):
+        for _ in range(500):
+            if not loader.busy:
+                return
+            time.sleep(0.01)
+            widget.run_pending()
+        self.fail("Загрузка не завершилась")
+
+    def test_chunks_delivered_in_main_thread(self):
+        # Тестируем передачу порций, завершение и ошибки загрузки
+        widget = _FakeWidget()
+        loader = BackgroundLoader(widget)
+        chunks, done, errors = [], [], []
+
+        def produce(cancelled):
+            yield threading.current_thread()
+            yield 2
+
+        loader.start(produce, chunks.append, lambda: done.append(True), errors.append)
+        self.pump(widget, loader)
+        self.assertIsNot(chunks[0], threading.current_thread())
+        self.assertEqual(chunks[1:], [2])
+        self.assertEqual(done, [True])
+
+        def failing(cancelled):
+            raise RuntimeError("database is locked")
+            yield
+
+        loader.start(failing, chunks.append, on_error=errors.append)
+        self.pump(widget, loader)
+        self.assertEqual(errors, ["database is locked"])
+
+    def test_restart_cancels_previous_load(self):
+        # Тестируем, что порции отмененной загрузки не обрабатываются
+        widget = _FakeWidget()
+        loader = BackgroundLoader(widget)
+        release = threading.Event()
+        stopped = threading.Event()
+        chunks = []
+
+        def slow(cancelled):
+            release.wait()
+            stopped.set()
+            yield "old"
+
+        loader.start(slow, chunks.append)
+        loader.start(lambda cancelled: iter(["new"]), chunks.append)
+        self.pump(widget, loader)
+
+        release.set()
+        stopped.wait(5)
+        time.sleep(0.05)
+        widget.run_pending()
+        loader._poll()
+        self.assertEqual(chunks, ["new"])
+
+
+class TestDataStore(unittest.TestCase):
+    def setUp(self):
+        self.db = Database(":memory:")
+        self.store = DataStore(self.db)
+        self.events = []
+        self.store.subscribe(self.events.append)
+
+    def test_equipment_list_updated_in_place(self):
+        # Тестируем события изменений и сохранение порядка списка без повторной загрузки
+        _, first_id = self.store.add_equipment("Б-шлем", "Model")
+        self.assertEqual([row[0] for row in self.store.equipment_rows()], [first_id])
+
+        _, second_id = self.store.add_equipment("А-шлем", "Model")
+        self.store.update_equipment(first_id, "В-шлем", "Model", status="В ремонте")
+        self.assertEqual(
+            self.store.equipment_rows(),
+            [(second_id, "А-шлем", "Model", "", "Доступно"), (first_id, "В-шлем", "Model", "", "В ремонте")]
+        )
+        self.assertEqual(self.store.equipment_rows(), self.db.get_all_equipment()[1])
+        self.assertEqual(
+            [(event.table, event.added, event.updated) for event in self.events],
+            [("equipment", {first_id}, set()), ("equipment", {second_id}, set()), ("equipment", set(), {first_id})]
+        )
+
+    def test_delete_equipment_publishes_removed_bookings(self):
+        # Тестируем, что удаление оборудования сообщает и об удалении его прошедших бронирований
+        _, equipment_id = self.store.add_equipment("Test VR", "Test Model")
+        _, booking_id = self.store.add_booking(equipment_id, "05.02.2020", "10:00", "11:00", "101")
+        failed, _ = self.store.add_booking(equipment_id, "05.02.2020", "10:30", "11:30", "102")
+        self.assertFalse(failed)
+        self.assertEqual([event.added for event in self.events], [{equipment_id}, {booking_id}])
+        del self.events[:]
+
+        self.store.delete_equipment(equipment_id)
+        self.assertEqual(
+            [(event.table, event.removed) for event in self.events],
+            [("equipment", {equipment_id}), ("booking", {booking_id})]
+        )
+        self.assertEqual(self.store.equipment_rows(), [])
+
+    def tearDown(self):
+        self.db.close()
+
+
+class TestChangeWatcher(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        db_path = os.path.join(self.temp_dir.name, "shared.db")
+        self.db = Database(db_path)
+        self.other = Database(db_path)
+        self.store = DataStore(self.db)
+        self.events = []
+        self.store.subscribe(self.events.append)
+        self.watcher = ChangeWatcher(_FakeWidget(), self.store)
+        self.watcher.start()
+
+    def test_external_changes_published(self):
+        # Тестируем передачу изменений другого соединения без повторения собственных
+        self.assertFalse(self.watcher.check())
+        _, equipment_id = self.store.add_equipment("Test VR", "Test Model")
+        _, booking_id = self.other.add_booking(equipment_id, "05.02.2020", "10:00", "11:00", "101")
+        self.other.update_equipment(equipment_id, "Test VR 2", "Test Model")
+        del self.events[:]
+
+        self.assertTrue(self.watcher.check())
+        self.assertEqual(
+            [(event.table, event.added, event.updated) for event in self.events],
+            [("equipment", set(), {equipment_id}), ("booking", {booking_id}, set())]
+        )
+        self.assertEqual(self.store.equipment_rows()[0][1], "Test VR 2")
+        self.assertFalse(self.watcher.check())
+
+        # Каскадное удаление бронирований тоже попадает в журнал
+        del self.events[:]
+        self.other.delete_equipment(equipment_id)
+        self.assertTrue(self.watcher.check())
+        self.assertEqual(
+            [(event.table, event.removed) for event in self.events],
+            [("equipment", {equipment_id}), ("booking", {booking_id})]
+        )
+
+    def test_own_bulk_load_not_reported(self):
+        # Тестируем пропуск записей reload всех пакетов собственной массовой загрузки
+        _, equipment_id = self.store.add_equipment("Test VR", "Test Model")
+        for day in (1, 2):
+            self.db.add_bookings_bulk([(equipment_id, f"2020-02-0{day}", 600, 660, "101", "", "")])
+        self.store.publish("booking", reload=True)
+        _, other_id = self.other.add_equipment("Other VR", "Test Model")
+        del self.events[:]
+
+        self.assertTrue(self.watcher.check())
+        self.assertEqual([(event.table, event.added, event.reload) for event in self.events],
+                         [("equipment", {other_id}, False)])
+
+        # Откат генерации: оборудование удаляется одной транзакцией
+        self.assertEqual(self.db.delete_equipment_many([equipment_id, other_id]), (True, [equipment_id, other_id]))
+        self.assertEqual(self.db.get_all_equipment(), (True, []))
+
+    def test_pruned_log_reloads(self):
+        # Тестируем перезагрузку, если непрочитанные записи журнала удалены
+        self.other.add_equipment("Test VR", "Test Model")
+        self.other.add_equipment("Test VR", "Test Model")
+        self.other.prune_changes(1)
+        self.assertTrue(self.watcher.check())
+        self.assertTrue(all(event.reload for event in self.events))
+
+    def tearDown(self):
+        self.watcher.stop()
+        self.db.close()
+        self.other.close()
+        self.temp_dir.cleanup()
+
+
+class TestDataGenerator(unittest.TestCase):
+    def setUp(self):
+        self.db = Database(":memory:")
+        self.start = datetime.date(2030, 2, 1)
+
+    def _generate(self, db, count, seed=7):
+        generator = DataGenerator(db, seed=seed)
+        self.assertEqual(generator.generate_random_equipment(5), 5)
+        return generator.generate_bulk_bookings(count, self.start, batch_size=100)
+
+    def test_bulk_bookings_exact_and_without_conflicts(self):
+        # Тестируем точное количество, отсутствие пересечений и поисковый индекс
+        _, equipment_id = self.db.add_equipment("Test VR", "Test Model")
+        self.db.add_booking(equipment_id, "01.02.2030", "10:00", "11:00", "101")
+        success, result = self._generate(self.db, 777)
+        self.assertTrue(success)
+        self.assertEqual(result.bookings, 777)
+
+        self.db.cursor.execute("SELECT COUNT(*) FROM booking")
+        self.assertEqual(self.db.cursor.fetchone()[0], 778)
+        self.db.cursor.execute("SELECT COUNT(*) FROM booking_fts")
+        self.assertEqual(self.db.cursor.fetchone()[0], 778)
+        self.db.cursor.execute('''
+            SELECT COUNT(*) FROM booking a JOIN booking b
+            ON a.equipment_id = b.equipment_id AND a.booking_date = b.booking_date AND a.id < b.id
+            AND a.start_minute < b.end_minute AND b.start_minute < a.end_minute
+        ''')
+        self.assertEqual(self.db.cursor.fetchone()[0], 0)
+
+        # Массовая загрузка записывается в журнал изменений одной записью
+        self.db.cursor.execute("SELECT operation, COUNT(*) FROM changes WHERE table_name = 'booking' GROUP BY operation")
+        self.assertEqual(dict(self.db.cursor.fetchall()), {"insert": 1, "reload": 8})
+
+    def test_bulk_bookings_skip_rows_booked_after_planning(self):
+        # Тестируем, что бронирования, добавленные после чтения расписания дня, не дублируются
+        generator = DataGenerator(self.db, seed=7)
+        generator.generate_random_equipment(3)
+        for equipment_id, *_ in self.db.get_all_equipment()[1]:
+            self.db.add_booking(equipment_id, "01.02.2030", "08:00", "21:00", "101")
+        # Расписание дня прочитано до появления этих бронирований
+        self.db.get_day_bookings = lambda day: (True, [])
+
+        success, result = generator.generate_bulk_bookings(200, self.start, batch_size=50)
+        self.assertTrue(success)
+        self.assertEqual(result.bookings, 200)
+        self.assertEqual(self.db.count_bookings(), (True, 203))
+        self.db.cursor.execute('''
+            SELECT COUNT(*) FROM booking a JOIN booking b
+            ON a.equipment_id = b.equipment_id AND a.booking_date = b.booking_date AND a.id < b.id
+            AND a.start_minute < b.end_minute AND b.start_minute < a.end_minute
+        ''')
+        self.assertEqual(self.db.cursor.fetchone()[0], 0)
+        self.db.cursor.execute("SELECT COUNT(*) FROM booking_fts")
+        self.assertEqual(self.db.cursor.fetchone()[0], 203)
+
+    def test_cancelled_generation_rolled_back(self):
+        # Тестируем удаление уже добавленных пакетов при отмене генерации
+        _, equipment_id = self.db.add_equipment("Test VR", "Test Model")
+        _, booking_id = self.db.add_booking(equipment_id, "01.02.2030", "10:00", "11:00", "101")
+        cancelled = threading.Event()
+        progress = []
+
+        def on_progress(added, total):
+            progress.append(added)
+            if added >= 300:
+                cancelled.set()
+
+        generator = DataGenerator(self.db, seed=7)
+        generator.generate_random_equipment(5)
+        self.assertEqual(
+            generator.generate_bulk_bookings(1000, self.start, batch_size=100, progress=on_progress,
+                                             cancelled=cancelled),
+            (False, GENERATION_CANCELLED)
+        )
+        self.assertEqual(progress, [100, 200, 300, 0])
+        self.assertEqual([row[0] for row in self.db.get_all_bookings()[1]], [booking_id])
+        self.db.cursor.execute("SELECT rowid FROM booking_fts")
+        self.assertEqual(self.db.cursor.fetchall(), [(booking_id,)])
+
+    def test_same_seed_same_data(self):
+        # Тестируем воспроизводимость данных при одинаковом зерне
+        other = Database(":memory:")
+        try:
+            self._generate(self.db, 300)
+            self._generate(other, 300)
+            query = "SELECT equipment_id, booking_date, start_minute, end_minute, room, booked_by, notes FROM booking"
+            self.assertEqual(self.db.conn.execute(query).fetchall(), other.conn.execute(query).fetchall())
+        finally:
+            other.close()
+
+    def tearDown(self):
+        self.db.close()
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
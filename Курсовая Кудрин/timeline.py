@@ -0,0 +1,344 @@
+"""
+Модуль временной шкалы (диаграммы Ганта) бронирований оборудования за день
+"""
+import datetime
+import tkinter as tk
+from tkinter import ttk, messagebox
+from tkcalendar import DateEntry
+
+from background_loader import BackgroundLoader
+from booking_model import DayTimeline
+from date_utils import DAY_END_MINUTE, DAY_START_MINUTE, minutes_to_time
+from ui_styles import PRIMARY_COLOR, LIGHT_GREY, TEXT_COLOR, FONT_FAMILY, FONT_SIZE_SMALL
+
+# Размеры шкалы в пикселях
+ROW_HEIGHT = 28
+LABEL_WIDTH = 220
+HEADER_HEIGHT = 24
+BAR_PADDING = 4
+
+# Масштабы шкалы: ширина одного часа в пикселях
+HOUR_WIDTHS = (60, 90, 120, 180, 240, 360)
+
+# Минимальная ширина полосы бронирования, на которой выводится подпись
+TEXT_MIN_WIDTH = 40
+
+
+class _ItemPool:
+    """Переиспользуемые элементы холста одного вида: лишние элементы скрываются, а не удаляются"""
+
+    def __init__(self, canvas, create):
+        """create() создает элемент и возвращает кортеж ID его частей"""
+        self.canvas = canvas
+        self.create = create
+        self.items = []
+        self.shown = 0
+
+    def take(self, count):
+        """Возвращает count элементов, создавая недостающие; состояние меняется только у элементов,
+        которые становятся видимыми или скрытыми"""
+        while len(self.items) < count:
+            self.items.append(self.create())
+        for index in range(min(count, self.shown), max(count, self.shown)):
+            for part in self.items[index]:
+                self.canvas.itemconfigure(part, state=tk.NORMAL if index < count else tk.HIDDEN)
+        self.shown = count
+        return self.items[:count]
+
+
+class TimelineFrame(ttk.Frame):
+    """Класс для отображения раздела 'Расписание дня': одна строка на оборудование,
+    одна полоса на бронирование в интервале 08:00-21:00.
+
+    На холсте рисуется только видимая часть шкалы; элементы холста создаются
+    один раз и переиспользуются при прокрутке и изменении масштаба, поэтому
+    число элементов не зависит от количества бронирований за день.
+    """
+
+    def __init__(self, parent, db):
+        super().__init__(parent)
+        self.parent = parent
+        self.db = db
+        self.timeline = DayTimeline([], [])
+        self.zoom = 1
+
+        self._hour_items = []
+        self._item_bookings = {}
+        self._render_job = None
+        self._reload_job = None
+
+        # Данные дня загружаются в фоне, если база данных использует пул соединений
+        self.loader = BackgroundLoader(self, threaded=db.pooled)
+
+        # После изменения данных в любом разделе данные загружаются заново
+        db.subscribe(self.on_data_changed)
+
+        # Создаем и размещаем элементы интерфейса
+        self._create_widgets()
+
+        # Загружаем данные при инициализации
+        self.load_timeline()
+
+    def _create_widgets(self):
+        """Создает все виджеты для раздела расписания"""
+        # Верхняя панель с выбором даты и масштаба
+        control_frame = ttk.Frame(self)
+        control_frame.pack(fill=tk.X, padx=10, pady=10)
+
+        ttk.Label(
+            control_frame,
+            text="Расписание оборудования на день",
+            style="Header.TLabel"
+        ).pack(side=tk.LEFT, padx=5)
+
+        ttk.Button(control_frame, text="Обновить", command=self.load_timeline).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(control_frame, text="+", width=3, command=lambda: self.set_zoom(self.zoom + 1)).pack(side=tk.RIGHT)
+        ttk.Button(control_frame, text="−", width=3, command=lambda: self.set_zoom(self.zoom - 1)).pack(side=tk.RIGHT)
+        ttk.Label(control_frame, text="Масштаб:").pack(side=tk.RIGHT, padx=5)
+
+        ttk.Button(control_frame, text="▶", width=3, command=lambda: self.shift_date(1)).pack(side=tk.RIGHT, padx=5)
+        self.date_entry = DateEntry(control_frame, width=12, locale='ru_RU', date_pattern='dd.MM.yyyy')
+        self.date_entry.pack(side=tk.RIGHT)
+        self.date_entry.bind("<<DateEntrySelected>>", lambda event: self.load_timeline())
+        ttk.Button(control_frame, text="◀", width=3, command=lambda: self.shift_date(-1)).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(control_frame, text="Сегодня", command=self.show_today).pack(side=tk.RIGHT, padx=5)
+
+        # Шкала: заголовок с часами, названия оборудования и холст с полосами бронирований
+        chart_frame = ttk.Frame(self)
+        chart_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        chart_frame.columnconfigure(1, weight=1)
+        chart_frame.rowconfigure(1, weight=1)
+
+        canvas_options = {"background": "white", "highlightthickness": 0, "yscrollincrement": ROW_HEIGHT}
+        self.header_canvas = tk.Canvas(chart_frame, height=HEADER_HEIGHT, **canvas_options)
+        self.label_canvas = tk.Canvas(chart_frame, width=LABEL_WIDTH, **canvas_options)
+        self.canvas = tk.Canvas(chart_frame, **canvas_options)
+        self.header_canvas.grid(row=0, column=1, sticky=tk.EW)
+        self.label_canvas.grid(row=1, column=0, sticky=tk.NS)
+        self.canvas.grid(row=1, column=1, sticky=tk.NSEW)
+
+        vertical_scrollbar = ttk.Scrollbar(chart_frame, orient="vertical", command=self._yview)
+        horizontal_scrollbar = ttk.Scrollbar(chart_frame, orient="horizontal", command=self._xview)
+        vertical_scrollbar.grid(row=1, column=2, sticky=tk.NS)
+        horizontal_scrollbar.grid(row=2, column=1, sticky=tk.EW)
+        self.canvas.configure(yscrollcommand=vertical_scrollbar.set, xscrollcommand=horizontal_scrollbar.set)
+
+        # Переиспользуемые элементы холстов: полосы фона строк, названия оборудования и бронирования
+        self._stripes = _ItemPool(self.canvas, self._create_stripe)
+        self._labels = _ItemPool(self.label_canvas, self._create_label)
+        self._bars = _ItemPool(self.canvas, self._create_bar)
+
+        # Линии и подписи часов создаются один раз, при смене масштаба меняются только координаты
+        for hour in range(DAY_START_MINUTE // 60, DAY_END_MINUTE // 60 + 1):
+            line = self.canvas.create_line(0, 0, 0, 0, fill=LIGHT_GREY)
+            label = self.header_canvas.create_text(
+                0, HEADER_HEIGHT // 2, text=f"{hour:02d}:00", anchor=tk.W,
+                fill=TEXT_COLOR, font=(FONT_FAMILY, FONT_SIZE_SMALL)
+            )
+            self._hour_items.append((hour, line, label))
+
+        for widget in (self.canvas, self.label_canvas):
+            widget.bind("<MouseWheel>", self._on_mouse_wheel)
+            widget.bind("<Button-4>", lambda event: self._yview("scroll", -3, "units"))
+            widget.bind("<Button-5>", lambda event: self._yview("scroll", 3, "units"))
+        self.canvas.bind("<Shift-MouseWheel>", self._on_shift_mouse_wheel)
+        self.canvas.bind("<Configure>", lambda event: self._schedule_render())
+        self.canvas.tag_bind("bar", "<Enter>", self._on_bar_enter)
+        self.canvas.tag_bind("bar", "<Leave>", lambda event: self._update_status())
+
+        # Информация внизу
+        info_frame = ttk.Frame(self)
+        info_frame.pack(fill=tk.X, padx=10, pady=5)
+
+        self.status_label = ttk.Label(info_frame, text="")
+        self.status_label.pack(side=tk.LEFT, padx=5)
+
+    def load_timeline(self):
+        """Загружает оборудование и бронирования выбранного дня (один запрос по индексу даты)"""
+        booking_date = self.date_entry.get_date()
+
+        def produce(cancelled):
+            yield self.db.get_all_equipment(), self.db.get_day_bookings(booking_date)
+
+        def show(chunk):
+            (equipment_success, equipment), (bookings_success, bookings) = chunk
+            if not equipment_success or not bookings_success:
+                show_error(bookings if equipment_success else equipment)
+                return
+            self.timeline = DayTimeline(equipment, bookings)
+            self._update_layout()
+            self._update_status()
+
+        def show_error(message):
+            self.status_label.config(text="Не удалось загрузить расписание")
+            messagebox.showerror("Ошибка", f"Не удалось загрузить данные: {message}")
+
+        self.status_label.config(text="Загрузка расписания...")
+        self.loader.start(produce, show, on_error=show_error)
+
+    def on_data_changed(self, event):
+        """Загружает расписание заново после изменения данных (событие хранилища);
+        несколько изменений подряд вызывают одну загрузку"""
+        if self._reload_job is None:
+            self._reload_job = self.after_idle(self._reload)
+
+    def _reload(self):
+        """Выполняет отложенную загрузку после изменения данных"""
+        self._reload_job = None
+        self.load_timeline()
+
+    def shift_date(self, days):
+        """Переходит на несколько дней вперед или назад"""
+        self.date_entry.set_date(self.date_entry.get_date() + datetime.timedelta(days=days))
+        self.load_timeline()
+
+    def show_today(self):
+        """Переходит к сегодняшнему дню"""
+        self.date_entry.set_date(datetime.date.today())
+        self.load_timeline()
+
+    def set_zoom(self, zoom):
+        """Изменяет масштаб шкалы, сохраняя положение середины видимой части"""
+        zoom = max(0, min(zoom, len(HOUR_WIDTHS) - 1))
+        if zoom == self.zoom:
+            return
+        width = self.canvas.winfo_width()
+        center_minute = self._x_to_minute(self.canvas.canvasx(width / 2))
+        self.zoom = zoom
+        self._update_layout()
+        fraction = (self._minute_to_x(center_minute) - width / 2) / self._total_width()
+        self._xview("moveto", max(0.0, fraction))
+
+    def _hour_width(self):
+        """Ширина одного часа в пикселях при текущем масштабе"""
+        return HOUR_WIDTHS[self.zoom]
+
+    def _total_width(self):
+        """Ширина всей шкалы в пикселях"""
+        return (DAY_END_MINUTE - DAY_START_MINUTE) * self._hour_width() / 60
+
+    def _minute_to_x(self, minute):
+        """Координата x для времени в минутах от полуночи"""
+        return (minute - DAY_START_MINUTE) * self._hour_width() / 60
+
+    def _x_to_minute(self, x):
+        """Время в минутах от полуночи для координаты x"""
+        return DAY_START_MINUTE + x * 60 / self._hour_width()
+
+    def _update_layout(self):
+        """Пересчитывает размеры шкалы после загрузки данных или смены масштаба"""
+        width = self._total_width()
+        height = max(1, self.timeline.row_count() * ROW_HEIGHT)
+        self.canvas.configure(scrollregion=(0, 0, width, height))
+        self.header_canvas.configure(scrollregion=(0, 0, width, HEADER_HEIGHT))
+        self.label_canvas.configure(scrollregion=(0, 0, LABEL_WIDTH, height))
+
+        for hour, line, label in self._hour_items:
+            x = self._minute_to_x(hour * 60)
+            self.canvas.coords(line, x, 0, x, height)
+            self.header_canvas.coords(label, x + 3, HEADER_HEIGHT // 2)
+
+        self.label_canvas.yview_moveto(self.canvas.yview()[0])
+        self.header_canvas.xview_moveto(self.canvas.xview()[0])
+        self._render()
+
+    def _yview(self, *args):
+        """Вертикальная прокрутка холста шкалы вместе с названиями оборудования"""
+        self.canvas.yview(*args)
+        self.label_canvas.yview_moveto(self.canvas.yview()[0])
+        self._schedule_render()
+        return "break"
+
+    def _xview(self, *args):
+        """Горизонтальная прокрутка холста шкалы вместе с заголовком часов"""
+        self.canvas.xview(*args)
+        self.header_canvas.xview_moveto(self.canvas.xview()[0])
+        self._schedule_render()
+
+    def _on_mouse_wheel(self, event):
+        """Прокрутка колесом мыши (Windows и macOS)"""
+        amount = -(event.delta // 120) if abs(event.delta) >= 120 else -event.delta
+        return self._yview("scroll", 3 * amount, "units")
+
+    def _on_shift_mouse_wheel(self, event):
+        """Горизонтальная прокрутка колесом мыши с нажатой клавишей Shift"""
+        amount = -(event.delta // 120) if abs(event.delta) >= 120 else -event.delta
+        self._xview("scroll", 3 * amount, "units")
+        return "break"
+
+    def _schedule_render(self):
+        """Откладывает перерисовку до простоя, чтобы объединить события прокрутки"""
+        if self._render_job is None:
+            self._render_job = self.after_idle(self._render)
+
+    def _render(self):
+        """Показывает видимую часть шкалы, переиспользуя элементы холстов"""
+        if self._render_job is not None:
+            self.after_cancel(self._render_job)
+            self._render_job = None
+
+        left, top = self.canvas.canvasx(0), self.canvas.canvasy(0)
+        width, height = self.canvas.winfo_width(), self.canvas.winfo_height()
+        first_row = int(top // ROW_HEIGHT)
+        last_row = min(self.timeline.row_count(), int((top + height) // ROW_HEIGHT) + 1)
+        rows = range(first_row, last_row)
+
+        # Полосы фона каждой второй строки и названия оборудования
+        stripes = [row for row in rows if row % 2]
+        for (item,), row in zip(self._stripes.take(len(stripes)), stripes):
+            self.canvas.coords(item, 0, row * ROW_HEIGHT, self._total_width(), (row + 1) * ROW_HEIGHT)
+        for (item,), row in zip(self._labels.take(len(rows)), rows):
+            equipment = self.timeline.equipment[row]
+            self.label_canvas.coords(item, 8, row * ROW_HEIGHT + ROW_HEIGHT // 2)
+            self.label_canvas.itemconfigure(
+                item, text=equipment[1], fill=TEXT_COLOR if equipment[-1] == "Доступно" else "gray"
+            )
+
+        # Полосы бронирований, пересекающие видимый интервал времени
+        bars = self.timeline.visible(first_row, last_row, self._x_to_minute(left), self._x_to_minute(left + width))
+        self._item_bookings = {}
+        for (rectangle, text), (row, booking) in zip(self._bars.take(len(bars)), bars):
+            _, _, start_minute, end_minute, room, _ = booking
+            x1 = self._minute_to_x(max(start_minute, DAY_START_MINUTE))
+            x2 = self._minute_to_x(min(end_minute, DAY_END_MINUTE))
+            y = row * ROW_HEIGHT
+            self.canvas.coords(rectangle, x1, y + BAR_PADDING, x2, y + ROW_HEIGHT - BAR_PADDING)
+            self.canvas.coords(text, x1 + 4, y + ROW_HEIGHT // 2)
+            self.canvas.itemconfigure(text, text=room if x2 - x1 >= TEXT_MIN_WIDTH else "")
+            self._item_bookings[rectangle] = self._item_bookings[text] = booking
+
+    def _create_stripe(self):
+        """Создает полосу фона строки (под линиями часов и бронированиями)"""
+        item = self.canvas.create_rectangle(0, 0, 0, 0, fill="#f8fafc", outline="", tags=("stripe",))
+        self.canvas.tag_lower("stripe")
+        return (item,)
+
+    def _create_label(self):
+        """Создает подпись строки с названием оборудования"""
+        return (self.label_canvas.create_text(0, 0, anchor=tk.W, font=(FONT_FAMILY, FONT_SIZE_SMALL)),)
+
+    def _create_bar(self):
+        """Создает полосу бронирования с подписью"""
+        rectangle = self.canvas.create_rectangle(0, 0, 0, 0, fill=PRIMARY_COLOR, outline="white", tags=("bar",))
+        text = self.canvas.create_text(
+            0, 0, anchor=tk.W, fill="white", font=(FONT_FAMILY, FONT_SIZE_SMALL), tags=("bar",)
+        )
+        return rectangle, text
+
+    def _on_bar_enter(self, event):
+        """Показывает сведения о бронировании под указателем мыши"""
+        item = self.canvas.find_withtag("current")
+        booking = self._item_bookings.get(item[0]) if item else None
+        if booking is None:
+            return
+        booking_id, _, start_minute, end_minute, room, booked_by = booking
+        self.status_label.config(
+            text=f"Бронирование {booking_id}: {minutes_to_time(start_minute)}-{minutes_to_time(end_minute)}, "
+                 f"кабинет {room}, {booked_by or 'не указано'}"
+        )
+
+    def _update_status(self):
+        """Обновляет информацию о количестве оборудования и бронирований за день"""
+        self.status_label.config(
+            text=f"Оборудование: {self.timeline.row_count()}, бронирований за день: {self.timeline.booking_count()}"
+        )
@@ -0,0 +1,408 @@
+"""
+Модуль виртуализированного списка на основе ttk.Treeview для больших таблиц
+"""
+import tkinter as tk
+from tkinter import ttk, messagebox
+
+
+class ListSource:
+    """Источник строк из списка в памяти"""
+
+    def __init__(self, rows=()):
+        self.data = rows if isinstance(rows, list) else list(rows)
+
+    def count(self):
+        """Количество строк"""
+        return len(self.data)
+
+    def extend(self, rows):
+        """Добавляет строки в конец списка"""
+        self.data.extend(rows)
+
+    def rows(self, offset, limit):
+        """Строки с offset по offset + limit"""
+        return self.data[offset:offset + limit]
+
+    def get(self, row_id):
+        """Строка по ID или None"""
+        for row in self.data:
+            if row[0] == row_id:
+                return row
+        return None
+
+    def update(self, row):
+        """Заменяет строку с тем же ID; возвращает False, если строки нет"""
+        for index, current in enumerate(self.data):
+            if current[0] == row[0]:
+                self.data[index] = row
+                return True
+        return False
+
+    def remove(self, row_id):
+        """Удаляет строку по ID; возвращает False, если строки нет"""
+        for index, current in enumerate(self.data):
+            if current[0] == row_id:
+                del self.data[index]
+                return True
+        return False
+
+
+class QuerySource:
+    """Источник строк, загружающий страницы из базы данных по мере прокрутки.
+
+    fetch(offset, limit) возвращает (успех, строки) - как методы Database;
+    total - общее количество строк, first_page - уже загруженная первая страница.
+    """
+
+    def __init__(self, fetch, total, page_size=200, max_pages=20, first_page=None):
+        self.fetch = fetch
+        self.total = total
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self._pages = {}
+        if first_page is not None:
+            self._pages[0] = first_page[:page_size]
+
+    def count(self):
+        """Количество строк"""
+        return self.total
+
+    def rows(self, offset, limit):
+        """Строки с offset по offset + limit (загружает недостающие страницы)"""
+        if limit <= 0 or offset >= self.total:
+            return []
+        first_page = offset // self.page_size
+        last_page = (min(offset + limit, self.total) - 1) // self.page_size
+
+        rows = []
+        for number in range(first_page, last_page + 1):
+            rows.extend(self._page(number))
+        start = offset - first_page * self.page_size
+        return rows[start:start + limit]
+
+    def get(self, row_id):
+        """Строка по ID из загруженных страниц или None"""
+        for page in self._pages.values():
+            for row in page:
+                if row[0] == row_id:
+                    return row
+        return None
+
+    def update(self, row):
+        """Заменяет строку с тем же ID в загруженных страницах; возвращает False, если строка не загружена"""
+        for page in self._pages.values():
+            for index, current in enumerate(page):
+                if current[0] == row[0]:
+                    page[index] = row
+                    return True
+        return False
+
+    def remove(self, row_id):
+        """Учитывает удаление строки: страницы, начиная с той, где была строка, загрузятся заново.
+
+        Возвращает False, если строки нет в загруженных страницах: неизвестно, входит ли
+        она в результат запроса, поэтому количество строк не изменяется.
+        """
+        for number, page in list(self._pages.items()):
+            if any(current[0] == row_id for current in page):
+                self.total = max(0, self.total - 1)
+                for stale in [stale for stale in self._pages if stale >= number]:
+                    del self._pages[stale]
+                return True
+        return False
+
+    def _page(self, number):
+        """Страница из кэша или из базы данных; давно не использованные страницы вытесняются"""
+        page = self._pages.pop(number, None)
+        if page is None:
+            success, page = self.fetch(number * self.page_size, self.page_size)
+            if not success:
+                raise RuntimeError(page)
+            page = list(page)
+        self._pages[number] = page
+        while len(self._pages) > self.max_pages:
+            del self._pages[next(iter(self._pages))]
+        return page
+
+
+class SeekSource:
+    """Источник строк, дозагружающий следующие страницы по мере прокрутки (keyset-пагинация).
+
+    fetch(cursor, limit) возвращает (успех, (строки, токен следующей страницы или None)) -
+    как Database.get_equipment_bookings_page; total - общее количество строк. Страницы
+    загружаются только по порядку и не вытесняются: загруженные строки накапливаются
+    в loaded (объект с методами count(), rows() и extend(), по умолчанию ListSource),
+    а переход в конец списка загружает все недостающие строки одним запросом.
+    """
+
+    def __init__(self, fetch, total, page_size=200, loaded=None, first_page=None, cursor=None):
+        """first_page и cursor - уже загруженная первая страница и токен следующей"""
+        self.fetch = fetch
+        self.total = total
+        self.page_size = page_size
+        self.loaded = loaded if loaded is not None else ListSource()
+        self._cursor = None
+        self._exhausted = False
+        if first_page is not None:
+            self._add_page(first_page, cursor)
+
+    def count(self):
+        """Количество строк"""
+        return self.loaded.count() if self._exhausted else self.total
+
+    def rows(self, offset, limit):
+        """Строки с offset по offset + limit (загружает недостающие страницы)"""
+        end = min(offset + limit, self.total)
+        while self.loaded.count() < end and not self._exhausted:
+            success, result = self.fetch(self._cursor, max(self.page_size, end - self.loaded.count()))
+            if not success:
+                raise RuntimeError(result)
+            self._add_page(*result)
+        return self.loaded.rows(offset, limit)
+
+    def _add_page(self, rows, cursor):
+        """Добавляет загруженную страницу"""
+        self.loaded.extend(rows)
+        self._cursor = cursor
+        self._exhausted = cursor is None
+
+
+class VirtualTreeview(ttk.Frame):
+    """Список с полосой прокрутки, создающий элементы Treeview только для видимых строк.
+
+    Строки запрашиваются у источника (ListSource, QuerySource, SeekSource или любого объекта
+    с методами count() и rows(offset, limit)); первым значением строки должен быть
+    ее ID, он же используется как идентификатор элемента Treeview. При обновлении
+    элементы сопоставляются по ID, поэтому изменяются только строки, которые
+    действительно изменились. Сам Treeview доступен как атрибут tree: на нем
+    настраиваются заголовки, столбцы, теги и обработчики событий.
+    """
+
+    def __init__(self, parent, columns, row_tags=None, buffer=2, **tree_options):
+        """
+        row_tags(row) возвращает теги строки (например, ('past',)),
+        buffer - количество строк, создаваемых сверх видимых
+        """
+        super().__init__(parent)
+        self.row_tags = row_tags
+        self.buffer = buffer
+        self.source = ListSource()
+        self.offset = 0
+
+        self._rows = []
+        self._visible = tree_options.get("height", 10)
+        self._height = None
+        self._selected_id = None
+        self._render_job = None
+
+        self.tree = ttk.Treeview(self, columns=columns, show='headings', **tree_options)
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.yview)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(fill=tk.BOTH, expand=True)
+
+        self.tree.bind("<Configure>", self._on_resize)
+        self.tree.bind("<<TreeviewSelect>>", self._on_select, add="+")
+        self.tree.bind("<MouseWheel>", self._on_mouse_wheel)
+        self.tree.bind("<Button-4>", lambda event: self._scroll_units(-3))
+        self.tree.bind("<Button-5>", lambda event: self._scroll_units(3))
+        self.tree.bind("<Up>", lambda event: self._move_selection(-1))
+        self.tree.bind("<Down>", lambda event: self._move_selection(1))
+        self.tree.bind("<Prior>", lambda event: self._move_selection(-self._visible))
+        self.tree.bind("<Next>", lambda event: self._move_selection(self._visible))
+        self.tree.bind("<Home>", lambda event: self._move_selection(-self.source.count()))
+        self.tree.bind("<End>", lambda event: self._move_selection(self.source.count()))
+
+    def set_source(self, source, keep_position=False):
+        """Устанавливает новый источник строк и перерисовывает список"""
+        self.source = source
+        if not keep_position:
+            self.offset = 0
+            self._selected_id = None
+        self.refresh()
+
+    def refresh(self):
+        """Перерисовывает видимые строки"""
+        self._clamp_offset()
+        self._render()
+
+    def update_row(self, row, sort_key=None):
+        """Обновляет одну строку без перезагрузки списка.
+
+        Возвращает False, если строки нет в источнике или (при заданном sort_key)
+        изменилось ее место в сортировке - тогда список нужно загрузить заново.
+        """
+        current = self.source.get(row[0])
+        if current is None or (sort_key and sort_key(current) != sort_key(row)):
+            return False
+        self.source.update(row)
+        self._render()
+        return True
+
+    def remove_row(self, row_id):
+        """Удаляет одну строку без перезагрузки списка; возвращает False, если строки нет в источнике"""
+        if not self.source.remove(row_id):
+            return False
+        self.refresh()
+        return True
+
+    def count(self):
+        """Общее количество строк в источнике"""
+        return self.source.count()
+
+    def selected_row(self):
+        """Данные выбранной строки или None"""
+        selection = self.tree.selection()
+        if not selection:
+            return None
+        index = self.tree.index(selection[0])
+        return self._rows[index] if index < len(self._rows) else None
+
+    def yview(self, *args):
+        """Обработчик полосы прокрутки: moveto и scroll в единицах строк и страниц"""
+        if not args:
+            return
+        if args[0] == "moveto":
+            self._scroll_to(int(float(args[1]) * self.source.count()))
+        elif args[0] == "scroll":
+            amount = int(args[1])
+            self._scroll_to(self.offset + (amount * self._visible if args[2] == "pages" else amount))
+
+    def _scroll_units(self, amount):
+        """Прокрутка на указанное количество строк"""
+        self._scroll_to(self.offset + amount)
+        return "break"
+
+    def _on_mouse_wheel(self, event):
+        """Прокрутка колесом мыши (Windows и macOS)"""
+        if abs(event.delta) >= 120:
+            return self._scroll_units(-3 * (event.delta // 120))
+        return self._scroll_units(-event.delta)
+
+    def _scroll_to(self, offset):
+        """Переходит к строке offset; перерисовка откладывается до простоя, чтобы объединить события"""
+        previous = self.offset
+        self.offset = offset
+        self._clamp_offset()
+        if self.offset != previous and self._render_job is None:
+            self._render_job = self.after_idle(self._render)
+
+    def _clamp_offset(self):
+        """Ограничивает первую видимую строку границами источника"""
+        self.offset = max(0, min(self.offset, self.source.count() - self._visible))
+
+    def _on_resize(self, event):
+        """Пересчитывает количество видимых строк при изменении размера"""
+        self._height = event.height
+        self._measure()
+
+    def _measure(self):
+        """Определяет количество видимых строк по высоте списка и первой строки"""
+        children = self.tree.get_children()
+        bbox = self.tree.bbox(children[0]) if children and self._height else None
+        if not bbox:
+            return
+        _, top, _, row_height = bbox
+        visible = max(1, (self._height - top) // row_height)
+        if visible != self._visible:
+            self._visible = visible
+            self.refresh()
+
+    def _render(self):
+        """Показывает строки начиная с offset, переиспользуя существующие элементы Treeview"""
+        if self._render_job is not None:
+            self.after_cancel(self._render_job)
+            self._render_job = None
+
+        try:
+            rows = self.source.rows(self.offset, self._visible + self.buffer)
+        except RuntimeError as e:
+            messagebox.showerror("Ошибка", f"Не удалось загрузить данные: {e}")
+            self.source = ListSource()
+            self.offset = 0
+            rows = []
+
+        self._apply_rows(rows)
+        self._rows = rows
+        selected_item = str(self._selected_id) if self._selected_id is not None else None
+        if selected_item is not None and not self.tree.exists(selected_item):
+            selected_item = None
+
+        # Выделение следует за строкой, а не за элементом Treeview
+        if selected_item is not None:
+            if self.tree.selection() != (selected_item,):
+                self.tree.selection_set(selected_item)
+            self.tree.focus(selected_item)
+        elif self.tree.selection():
+            self.tree.selection_remove(*self.tree.selection())
+
+        self.tree.yview_moveto(0)
+        self._update_scrollbar()
+        self._measure()
+
+    def _apply_rows(self, rows):
+        """Приводит элементы Treeview к списку строк: удаляет, добавляет, перемещает и изменяет
+        только отличающиеся элементы"""
+        wanted = {str(row[0]) for row in rows}
+        children = self.tree.get_children()
+        stale = [item for item in children if item not in wanted]
+        if stale:
+            self.tree.delete(*stale)
+        current = {row[0]: row for row in self._rows}
+        children = [item for item in children if item in wanted]
+
+        for index, row in enumerate(rows):
+            item = str(row[0])
+            tags = self.row_tags(row) if self.row_tags else ()
+            if index < len(children) and children[index] == item:
+                if current.get(row[0]) != row:
+                    self.tree.item(item, values=row, tags=tags)
+                continue
+
+            if item in children:
+                # Строка уже показана, но на другом месте
+                children.remove(item)
+                self.tree.move(item, '', index)
+                if current.get(row[0]) != row:
+                    self.tree.item(item, values=row, tags=tags)
+            else:
+                self.tree.insert('', index, iid=item, values=row, tags=tags)
+            children.insert(index, item)
+
+    def _update_scrollbar(self):
+        """Положение ползунка соответствует видимой части всего списка"""
+        total = self.source.count()
+        if total <= self._visible:
+            self.scrollbar.set(0, 1)
+        else:
+            self.scrollbar.set(self.offset / total, min(1.0, (self.offset + self._visible) / total))
+
+    def _on_select(self, event):
+        """Запоминает ID выбранной строки"""
+        row = self.selected_row()
+        if row is not None:
+            self._selected_id = row[0]
+
+    def _move_selection(self, delta):
+        """Перемещает выделение клавишами с прокруткой списка"""
+        total = self.source.count()
+        if not total:
+            return "break"
+
+        row = self.selected_row()
+        current = self.offset + self._rows.index(row) if row is not None else self.offset - 1
+        target = max(0, min(total - 1, current + delta))
+
+        if target < self.offset:
+            self.offset = target
+        elif target >= self.offset + self._visible:
+            self.offset = target - self._visible + 1
+        self._clamp_offset()
+        self._render()
+
+        index = target - self.offset
+        if 0 <= index < len(self._rows):
+            self._selected_id = self._rows[index][0]
+            item = self.tree.get_children()[index]
+            self.tree.selection_set(item)
+            self.tree.focus(item)
+        return "break"